@@ -5,8 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.settings import settings
-from app.auth.utils import authenticate_user, get_password_hash, get_current_active_user
-from app.core.security import create_access_token
+from app.auth.utils import authenticate_user, get_password_hash_async, get_current_active_user
+from app.core.security import create_access_token, build_token_claims
 from app.models import User as UserModel, UserRoleEnum
 from app.schemas.users import UserCreate, UserResponse, Token, TokenData
 from app.crud.users import get_user_by_email, create_user as create_user_db
@@ -58,7 +58,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db), cu
         )
     
     # Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Create the user
     user = await create_user_db(
@@ -128,7 +128,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         try:
             access_token = create_access_token(
-                data={"sub": user.email, "user_id": str(user.id), "token_type": "access"}, 
+                data=build_token_claims(db_user, "access"), 
                 expires_delta=access_token_expires
             )
             
@@ -136,7 +136,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
             # In production, refresh tokens should have longer expiration
             refresh_token_expires = timedelta(days=7)  # 7 days for refresh token
             refresh_token = create_access_token(
-                data={"sub": user.email, "user_id": str(user.id), "token_type": "refresh"}, 
+                data=build_token_claims(db_user, "refresh"), 
                 expires_delta=refresh_token_expires
             )
         except Exception as e:
@@ -203,17 +203,25 @@ async def refresh_token(refresh_token: str, db: AsyncSession = Depends(get_db)):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # Role, status or taman changes since this token was issued revoke it
+        if payload.get("tv", 0) != (user.token_version or 0):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
         # Create new access token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         new_access_token = create_access_token(
-            data={"sub": user.email, "user_id": str(user.id), "token_type": "access"}, 
+            data=build_token_claims(user, "access"), 
             expires_delta=access_token_expires
         )
         
         # Create new refresh token for next refresh
         refresh_token_expires = timedelta(days=7)
         new_refresh_token = create_access_token(
-            data={"sub": user.email, "user_id": str(user.id), "token_type": "refresh"}, 
+            data=build_token_claims(user, "refresh"), 
             expires_delta=refresh_token_expires
         )
         
@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import json
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.schemas.koleksi_tumbuhan import (
     KoleksiTumbuhanCreate, 
     KoleksiTumbuhanUpdate, 
@@ -19,6 +19,7 @@ from app.crud.koleksi_tumbuhan import (
     update_koleksi_tumbuhan,
     delete_koleksi_tumbuhan
 )
+from app.services.suggestions import suggestion_service
 from app.utils.geo_masking import mask_coordinates, PRECISION_LEVELS
 from app.utils.logging_config import get_logger
 from sqlalchemy import text, func
@@ -43,10 +44,17 @@ async def read_koleksis_tumbuhan(
     status_endemik: Optional[StatusEndemikEnum] = None,
     genus: Optional[str] = None,
     spesies: Optional[str] = None,
+    fuzzy: bool = False,
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get list of plant collections with advanced filtering, pagination, and search"""
+    """
+    Get list of plant collections with advanced filtering, pagination, and search.
+    
+    With `fuzzy=true`, `q` matches scientific, national and local names by
+    trigram similarity and `genus`/`spesies` tolerate misspellings; results
+    are ordered by similarity unless `sort` is given.
+    """
     skip = (page - 1) * size
     limit = size
 
@@ -75,13 +83,33 @@ async def read_koleksis_tumbuhan(
     if status_endemik:
         filters.append(KoleksiTumbuhanModel.status_endemik == status_endemik)
         
+    # Both the ILIKE and the pg_trgm similarity operators (`%`, `%>`) are
+    # served by the trigram indexes on these columns
     if genus:
-        filters.append(KoleksiTumbuhanModel.genus.ilike(f"%{genus}%"))
+        if fuzzy:
+            filters.append(KoleksiTumbuhanModel.genus.op("%")(genus))
+        else:
+            filters.append(KoleksiTumbuhanModel.genus.ilike(f"%{genus}%"))
         
     if spesies:
-        filters.append(KoleksiTumbuhanModel.spesies.ilike(f"%{spesies}%"))
-        
-    if q:
+        if fuzzy:
+            filters.append(KoleksiTumbuhanModel.spesies.op("%")(spesies))
+        else:
+            filters.append(KoleksiTumbuhanModel.spesies.ilike(f"%{spesies}%"))
+    
+    name_columns = (
+        KoleksiTumbuhanModel.nama_ilmiah,
+        KoleksiTumbuhanModel.nama_umum_nasional,
+        KoleksiTumbuhanModel.nama_lokal_daerah
+    )
+    if q and fuzzy:
+        filters.append(or_(*(column.op("%>")(q) for column in name_columns)))
+        if not sort:
+            query = query.order_by(
+                func.greatest(*(func.word_similarity(q, column) for column in name_columns)).desc(),
+                KoleksiTumbuhanModel.id
+            )
+    elif q:
         filters.append(
             or_(
                 KoleksiTumbuhanModel.nama_ilmiah.ilike(f"%{q}%"),
@@ -143,7 +171,7 @@ async def read_koleksis_tumbuhan(
 async def read_koleksi_tumbuhan(
     koleksi_id: int, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific plant collection by ID"""
     logger.info(f"Fetching plant collection with ID {koleksi_id} for user: {current_user.email}")
@@ -208,7 +236,7 @@ async def update_koleksi_tumbuhan(
 async def read_koleksi_media(
     koleksi_id: int, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get media associated with a plant collection"""
     logger.info(f"Fetching media for plant collection ID {koleksi_id} for user: {current_user.email}")
@@ -235,7 +263,7 @@ async def read_koleksi_media(
 async def read_koleksi_relations(
     koleksi_id: int, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get related collections and articles for a plant collection"""
     logger.info(f"Fetching relations for plant collection ID {koleksi_id} for user: {current_user.email}")
@@ -255,7 +283,7 @@ async def read_koleksi_relations(
 async def suggest_koleksi(
     q: str, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get plant collection suggestions based on search query"""
     logger.info(f"Getting suggestions for query: '{q}' for user: {current_user.email}")
@@ -263,15 +291,25 @@ async def suggest_koleksi(
     if len(q) < 2:
         return []
     
+    # The typeahead index only holds published collections, so staff, who
+    # are offered every status, are always served from the database
+    staff = current_user.role in ["super_admin", "admin_taman"]
+    if suggestion_service.engine.ready and not staff:
+        return suggestion_service.engine.suggest(
+            q, limit=10, entity_types=("koleksi",), fields=("nama_ilmiah",)
+        )
+    
     from app.models import KoleksiTumbuhan as KoleksiTumbuhanModel
     from sqlalchemy.future import select
     
-    # Search in nama_ilmiah, nama_umum_nasional, and nama_lokal_daerah
-    result = await db.execute(
+    query = (
         select(KoleksiTumbuhanModel.nama_ilmiah)
         .filter(KoleksiTumbuhanModel.nama_ilmiah.ilike(f"%{q}%"))
         .limit(10)
     )
+    if not staff:
+        query = query.filter(KoleksiTumbuhanModel.status == StatusPublikasiEnum.published)
+    result = await db.execute(query)
     
     suggestions = [row[0] for row in result]
     
@@ -283,7 +321,7 @@ async def suggest_koleksi(
 async def read_koleksi_stats(
     group_by: str, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get plant collection statistics grouped by specified field"""
     logger.info(f"Getting stats grouped by '{group_by}' for user: {current_user.email}")
@@ -328,7 +366,7 @@ async def read_koleksi_map_clusters(
     taman_kehati_id: Optional[int] = None,
     zoom: int = 10, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get plant collection clustering for map visualization"""
     logger.info(f"Getting map clusters for taman {taman_kehati_id}, zoom: {zoom}, user: {current_user.email}")
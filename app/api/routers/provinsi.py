@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from ...database import get_db
+from ...database import get_read_db
 from ...schemas.taman_kehati import (
     ProvinsiResponse, 
     KabupatenKotaResponse, 
@@ -25,7 +25,7 @@ logger = get_logger(__name__)
 @router.get("/provinsi", response_model=List[ProvinsiResponse])
 async def read_provinsi(
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of all provinces"""
     logger.info(f"Fetching provinces - user: {current_user.email}")
@@ -38,7 +38,7 @@ async def read_provinsi(
 async def read_kabupaten_kota(
     provinsi_id: int,
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of kabupaten/kota filtered by provinsi"""
     logger.info(f"Fetching kabupaten-kota for provinsi {provinsi_id} - user: {current_user.email}")
@@ -51,7 +51,7 @@ async def read_kabupaten_kota(
 async def read_kecamatan(
     kabupaten_kota_id: int,
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of kecamatan filtered by kabupaten/kota"""
     logger.info(f"Fetching kecamatan for kabupaten-kota {kabupaten_kota_id} - user: {current_user.email}")
@@ -64,7 +64,7 @@ async def read_kecamatan(
 async def read_desa(
     kecamatan_id: int,
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of desa filtered by kecamatan"""
     logger.info(f"Fetching desa for kecamatan {kecamatan_id} - user: {current_user.email}")
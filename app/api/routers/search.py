@@ -1,18 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
-from app.schemas.search import SearchBase, SearchResponse, SearchResult, SuggestBase, SuggestResponse
-from app.auth.utils import get_current_active_user, get_current_super_admin
+from app.database import get_db, get_read_db
+from app.schemas.search import (
+    FacetBucket,
+    SearchBase,
+    SearchEntityEnum,
+    SearchModeEnum,
+    SearchResponse,
+    SearchResult,
+    SuggestBase,
+    SuggestResponse,
+    ZeroResultQuery,
+)
+from app.auth.utils import get_current_active_user, get_current_admin, get_current_super_admin
+from app.settings import settings
 from app.utils.logging_config import get_logger
 from sqlalchemy import text
-from app.models import TamanKehati, KoleksiTumbuhan, Artikel, SearchIndex
+from app.models import TamanKehati, KoleksiTumbuhan, Artikel, SearchIndex, SearchQueryStats
+from app.search.query import (
+    InvalidCursor,
+    InvalidFacet,
+    InvalidGeoFilter,
+    PUBLIC_DISTANCE_PRECISION_M,
+    build_search_query,
+    collect_facets,
+    encode_cursor,
+    parse_facets,
+    parse_geo_filter,
+)
+from app.services.query_log import query_log
+from app.services.search_cache import (
+    lookup as cache_lookup,
+    normalize_query,
+    search_cache,
+    visibility_class,
+)
+from app.services.search_reindex import ReindexAlreadyRunning, search_reindexer
+from app.services.suggestions import suggestion_service
 from sqlalchemy.orm import selectinload
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+
+def _geo_precision(visibility: str) -> float:
+    """
+    Non-staff spatial searches are coarsened to PUBLIC_DISTANCE_PRECISION_M
+    (see app/search/query.py), so that neither distances, scores, cursors nor
+    repeated small searches pinpoint sensitive koleksi locations
+    """
+    return 0 if visibility == "staff" else PUBLIC_DISTANCE_PRECISION_M
+
+
+def _display_distance(row) -> Optional[float]:
+    distance = getattr(row, "distance_m", None)
+    return None if distance is None else round(distance, 1)
+
+
 @router.get("/", response_model=SearchResponse,
              summary="Full-text search",
              description="Search across entities with Indonesian tokenizer",
@@ -25,6 +73,7 @@ logger = get_logger(__name__)
                                  "query": "bambu",
                                  "entity": "all",
                                  "total": 2,
+                                 "next_cursor": None,
                                  "results": [
                                      {
                                          "id": 1,
@@ -48,92 +97,101 @@ logger = get_logger(__name__)
              })
 async def search_entities(
     q: str,
-    entity: str = "all",  # "all", "taman", "koleksi", "artikel"
-    limit: int = 20,
+    entity: SearchEntityEnum = SearchEntityEnum.all,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    mode: SearchModeEnum = Query(SearchModeEnum.fulltext, description="fuzzy: typo-tolerant matching on names"),
+    highlight: bool = Query(False, description="Return snippets with matched terms wrapped in <mark>"),
+    facets: Optional[str] = Query(
+        None, description="Comma-separated facet counts to return: entity_type, taman, provinsi, status_endemik"
+    ),
+    lat: Optional[float] = Query(None, description="Only match taman/koleksi within radius_m of lat/lng"),
+    lng: Optional[float] = Query(None),
+    radius_m: Optional[float] = Query(None),
+    bbox: Optional[str] = Query(None, description="Only match taman/koleksi inside min_lng,min_lat,max_lng,max_lat"),
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Full-text search across entities with Indonesian tokenizer"""
-    logger.info(f"Search request - query: '{q}', entity: {entity}, limit: {limit}, user: {current_user.email}")
+    """Full-text search across taman, koleksi and artikel, ranked together with Indonesian tokenizer"""
+    started = time.perf_counter()
+    logger.info(f"Search request - query: '{q}', entity: {entity}, mode: {mode.value}, limit: {limit}, user: {current_user.email}")
+    
+    visibility = visibility_class(current_user)
+    try:
+        facet_names = parse_facets(facets)
+        geo = parse_geo_filter(lat, lng, radius_m, bbox, precision_m=_geo_precision(visibility))
+    except (InvalidFacet, InvalidGeoFilter) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     if len(q) < 2:
         return SearchResponse(query=q, entity=entity, total=0, results=[])
     
-    results = []
-    
-    # Search using FTS with Indonesian configuration
-    if entity in ["all", "taman"]:
-        # Search in taman_kehati table
-        taman_query = text("""
-            SELECT 
-                taman_kehati.id,
-                nama_resmi as title,
-                alamat as snippet,
-                ts_rank(to_tsvector('indonesian', searchable_text), websearch_to_tsquery('indonesian', :query)) as score
-            FROM taman_kehati
-            JOIN search_index ON taman_kehati.id = search_index.taman_kehati_id
-            WHERE to_tsvector('indonesian', searchable_text) @@ websearch_to_tsquery('indonesian', :query)
-            AND status = 'published'
-            ORDER BY score DESC
-            LIMIT :limit
-        """)
-        
-        taman_result = await db.execute(
-            taman_query,
-            {"query": q, "limit": limit}
+    cache_key = (
+        "search", normalize_query(q), entity.value, mode.value, limit, cursor, highlight, facet_names, geo,
+        visibility
+    )
+    cached = cache_lookup("search", cache_key)
+    if cached is not None:
+        total, results, next_cursor, facet_buckets, facets_estimated = cached
+        if cursor is None:
+            query_log.record("search", q, entity.value, total, started)
+        return SearchResponse(
+            query=q, entity=entity, total=total, results=results, next_cursor=next_cursor,
+            facets=facet_buckets, facets_estimated=facets_estimated
+        )
+    generation = search_cache.generation
+    
+    try:
+        sql, params = build_search_query(
+            q, entity.value, limit, cursor, mode=mode.value, highlight=highlight,
+            facets=facet_names, facet_sample_size=settings.SEARCH_FACET_SAMPLE_SIZE, geo=geo,
+            precision_m=_geo_precision(visibility)
         )
-        
-        for row in taman_result:
-            results.append(SearchResult(
-                id=row.id,
-                entity_type="taman",
-                title=row.title,
-                snippet=row.snippet[:100] + "..." if len(row.snippet) > 100 else row.snippet,
-                score=float(row.score)
-            ))
-    
-    if entity in ["all", "koleksi"]:
-        # Search in koleksi_tumbuhan table
-        koleksi_query = text("""
-            SELECT 
-                koleksi_tumbuhan.id,
-                nama_ilmiah as title,
-                COALESCE(bentuk_pohon, '') || ' ' || COALESCE(bentuk_daun, '') as snippet,
-                ts_rank(to_tsvector('indonesian', searchable_text), websearch_to_tsquery('indonesian', :query)) as score
-            FROM koleksi_tumbuhan
-            JOIN search_index ON koleksi_tumbuhan.id = search_index.koleksi_tumbuhan_id
-            WHERE to_tsvector('indonesian', searchable_text) @@ websearch_to_tsquery('indonesian', :query)
-            AND status = 'published'
-            ORDER BY score DESC
-            LIMIT :limit
-        """)
-        
-        koleksi_result = await db.execute(
-            koleksi_query,
-            {"query": q, "limit": limit}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    rows = (await db.execute(text(sql), params)).all()
+    total = rows[0].total if rows else 0
+    facet_buckets, facets_estimated = None, False
+    if facet_names:
+        counts, facets_estimated = collect_facets(rows[0].facets if rows else None, total)
+        facet_buckets = {
+            name: [FacetBucket(**bucket) for bucket in counts.get(name, [])] for name in facet_names
+        }
+    rows = [row for row in rows if row.row_id is not None]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].row_id)
+    
+    results = [
+        SearchResult(
+            id=row.id,
+            entity_type=row.entity_type,
+            title=row.title,
+            snippet=row.snippet if highlight or len(row.snippet) <= 100 else row.snippet[:100] + "...",
+            score=row.score,
+            distance_m=_display_distance(row)
         )
-        
-        for row in koleksi_result:
-            results.append(SearchResult(
-                id=row.id,
-                entity_type="koleksi",
-                title=row.title,
-                snippet=row.snippet[:100] + "..." if len(row.snippet) > 100 else row.snippet,
-                score=float(row.score)
-            ))
-    
-    # Sort all results by score and limit to specified number
-    results.sort(key=lambda x: x.score, reverse=True)
-    results = results[:limit]
+        for row in rows
+    ]
+    search_cache.set(cache_key, (total, results, next_cursor, facet_buckets, facets_estimated), generation)
     
     response = SearchResponse(
         query=q,
         entity=entity,
-        total=len(results),
-        results=results
+        total=total,
+        results=results,
+        next_cursor=next_cursor,
+        facets=facet_buckets,
+        facets_estimated=facets_estimated
     )
     
-    logger.info(f"Search completed successfully, returned {len(results)} results")
+    # Later pages of the same search are not logged again
+    if cursor is None:
+        query_log.record("search", q, entity.value, total, started)
+    logger.info(f"Search completed successfully, returned {len(results)} of {total} results")
     return response
 
 
@@ -141,14 +199,29 @@ async def search_entities(
 async def search_suggest(
     q: str,
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get search suggestions"""
+    started = time.perf_counter()
     logger.info(f"Search suggestions request - query: '{q}', user: {current_user.email}")
     
     if len(q) < 2:
         return SuggestResponse(suggestions=[])
     
+    cache_key = ("suggest", normalize_query(q), visibility_class(current_user))
+    cached = cache_lookup("suggest", cache_key)
+    if cached is not None:
+        query_log.record("suggest", q, None, len(cached), started)
+        return SuggestResponse(suggestions=cached)
+    generation = search_cache.generation
+    
+    if suggestion_service.engine.ready:
+        suggestions = suggestion_service.engine.suggest(q, limit=10)
+        search_cache.set(cache_key, suggestions, generation)
+        query_log.record("suggest", q, None, len(suggestions), started)
+        return SuggestResponse(suggestions=suggestions)
+    
+    # Typeahead index still loading: fall back to the database
     suggestions = []
     
     # Get suggestions from taman_kehati names
@@ -177,61 +250,90 @@ async def search_suggest(
     
     # Remove duplicates while preserving order
     unique_suggestions = list(dict.fromkeys(suggestions))[:10]
+    search_cache.set(cache_key, unique_suggestions, generation)
+    query_log.record("suggest", q, None, len(unique_suggestions), started)
     
     logger.info(f"Search suggestions completed, returned {len(unique_suggestions)} suggestions")
     return SuggestResponse(suggestions=unique_suggestions)
 
 
-@router.post("/reindex", response_model=dict)
+@router.get("/zero-results", response_model=List[ZeroResultQuery])
+async def read_zero_result_queries(
+    limit: int = Query(50, ge=1, le=500),
+    current_user=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Searches of the last 30 days that returned nothing, most frequent first
+    (admin only). Refreshed from the query log every few minutes.
+    """
+    from sqlalchemy.future import select
+    
+    result = await db.execute(
+        select(SearchQueryStats)
+        .filter(SearchQueryStats.endpoint == "search", SearchQueryStats.zero_results > 0)
+        .order_by(SearchQueryStats.zero_results.desc(), SearchQueryStats.query)
+        .limit(limit)
+    )
+    return [
+        ZeroResultQuery(
+            query=stats.query,
+            searches=stats.searches,
+            zero_results=stats.zero_results,
+            last_searched_at=stats.last_searched_at
+        )
+        for stats in result.scalars().all()
+    ]
+
+
+@router.post("/reindex", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def reindex_search(
-    current_user=Depends(get_current_super_admin),
-    db: AsyncSession = Depends(get_db)
+    current_user=Depends(get_current_super_admin)
 ):
-    """Rebuild search index (super_admin only)"""
-    logger.info(f"Reindexing search started by super_admin: {current_user.email}")
+    """
+    Start a background rebuild of the search index (super_admin only).
+    
+    The index is rebuilt into a shadow table and swapped in atomically, so
+    search keeps working meanwhile. Poll GET /reindex/{job_id} for progress.
+    """
+    logger.info(f"Reindexing search requested by super_admin: {current_user.email}")
     
     try:
-        # Clear existing search index
-        await db.execute(text("DELETE FROM search_index"))
-        
-        # Rebuild from taman_kehati
-        taman_result = await db.execute(text("""
-            INSERT INTO search_index (taman_kehati_id, searchable_text, entity_type, updated_at)
-            SELECT 
-                id,
-                CONCAT_WS(' ', COALESCE(nama_resmi, ''), COALESCE(alamat, ''), COALESCE(deskripsi, '')) as searchable_text,
-                'taman' as entity_type,
-                updated_at
-            FROM taman_kehati
-        """))
-        
-        # Rebuild from koleksi_tumbuhan
-        koleksi_result = await db.execute(text("""
-            INSERT INTO search_index (koleksi_tumbuhan_id, searchable_text, entity_type, updated_at)
-            SELECT 
-                id,
-                CONCAT_WS(' ', 
-                    COALESCE(nama_ilmiah, ''), 
-                    COALESCE(nama_umum_nasional, ''), 
-                    COALESCE(nama_lokal_daerah, ''),
-                    COALESCE(bentuk_pohon, ''),
-                    COALESCE(bentuk_daun, ''),
-                    COALESCE(bentuk_bunga, ''),
-                    COALESCE(bentuk_buah, '')
-                ) as searchable_text,
-                'koleksi' as entity_type,
-                updated_at
-            FROM koleksi_tumbuhan
-        """))
-        
-        await db.commit()
-        
-        logger.info("Search index rebuilt successfully")
-        return {"message": "Search index rebuilt successfully", "status": "completed"}
-    except Exception as e:
-        await db.rollback()
-        logger.error(f"Search reindex failed: {str(e)}")
+        job = await search_reindexer.start(requested_by=current_user.email)
+    except ReindexAlreadyRunning:
+        running = search_reindexer.current()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Reindex failed: {str(e)}"
-        )
\ No newline at end of file
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "A search reindex is already running",
+                "job_id": running.id if running else None
+            }
+        )
+    
+    logger.info(f"Search reindex job {job.id} started")
+    return job.progress()
+
+
+@router.get("/reindex/{job_id}", response_model=dict)
+async def get_reindex_job(
+    job_id: str,
+    current_user=Depends(get_current_super_admin)
+):
+    """Progress of a search reindex job: rows done/total, rate and ETA (super_admin only)"""
+    job = search_reindexer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reindex job not found")
+    return job.progress()
+
+
+@router.delete("/reindex/{job_id}", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_reindex_job(
+    job_id: str,
+    current_user=Depends(get_current_super_admin)
+):
+    """Cancel a running search reindex job; the live index is left untouched (super_admin only)"""
+    job = search_reindexer.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reindex job not found")
+    logger.info(f"Search reindex job {job_id} cancellation requested by {current_user.email}")
+    return job.progress()
@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import json
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.schemas.taman_kehati import (
     TamanKehatiCreate, 
     TamanKehatiUpdate, 
     TamanKehatiResponse,
     TamanKehatiGeoResponse,
-    TamanKehatiStatsResponse
+    TamanKehatiStatsResponse,
+    TamanKehatiBatchStatsResponse
 )
 from app.auth.utils import get_current_active_user, get_current_admin
 from app.crud.taman_kehati import (
@@ -19,6 +20,7 @@ from app.crud.taman_kehati import (
     update_taman_kehati,
     delete_taman_kehati
 )
+from app.services.taman_stats import MAX_STATS_BATCH, get_taman_stats
 from app.utils.geo_masking import mask_coordinates
 from app.utils.logging_config import get_logger
 from app.models import StatusPublikasiEnum
@@ -36,7 +38,7 @@ async def read_tamans_kehati(
     status: Optional[StatusPublikasiEnum] = None,
     provinsi_id: Optional[int] = None,
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of all Taman Kehati with pagination, filtering, and search"""
     # Convert page/size to skip/limit for now (will implement proper pagination later)
@@ -109,11 +111,40 @@ async def read_tamans_kehati(
     logger.info(f"Successfully returned {len(tamans)} Taman Kehati records")
     return [TamanKehatiResponse.from_orm(t) for t in tamans]
 
+# Declared before /{taman_id} so "stats" is not taken for an ID
+@router.get("/stats", response_model=List[TamanKehatiBatchStatsResponse])
+async def read_tamans_kehati_stats(
+    ids: str = Query(..., description=f"Comma-separated Taman Kehati IDs, at most {MAX_STATS_BATCH}"),
+    current_user=Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get statistics of many Taman Kehati at once, e.g. for the admin listing page"""
+    try:
+        taman_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not taman_ids or len(taman_ids) > MAX_STATS_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {MAX_STATS_BATCH} ids are required"
+        )
+    logger.info(f"Fetching stats of {len(taman_ids)} Taman Kehati for user: {current_user.email}")
+    
+    stats = await get_taman_stats(db, taman_ids)
+    # Unknown IDs are left out
+    return [
+        TamanKehatiBatchStatsResponse(taman_kehati_id=taman_id, **stats[taman_id].dict())
+        for taman_id in dict.fromkeys(taman_ids) if taman_id in stats
+    ]
+
 @router.get("/{taman_id}", response_model=TamanKehatiResponse)
 async def read_taman_kehati(
     taman_id: int, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific Taman Kehati by ID"""
     logger.info(f"Fetching Taman Kehati with ID {taman_id} for user: {current_user.email}")
@@ -143,7 +174,7 @@ async def read_taman_kehati(
 async def read_taman_kehati_geo(
     taman_id: int, 
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get Taman Kehati geometry as GeoJSON FeatureCollection"""
     logger.info(f"Fetching Taman Kehati geometry with ID {taman_id} for user: {current_user.email}")
@@ -226,27 +257,15 @@ async def read_taman_kehati_stats(
     current_user=Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get Taman Kehati statistics"""
+    """Get Taman Kehati statistics: koleksi and artikel counts, views over the last 7 and 30 days"""
     logger.info(f"Fetching Taman Kehati stats with ID {taman_id} for user: {current_user.email}")
     
-    # Count collections for this taman
-    from app.models import KoleksiTumbuhan
-    from sqlalchemy import func
-    
-    koleksi_result = await db.execute(
-        select(func.count(KoleksiTumbuhan.id))
-        .filter(KoleksiTumbuhan.taman_kehati_id == taman_id)
-    )
-    koleksi_count = koleksi_result.scalar_one_or_none() or 0
-    
-    # For now, hardcoding the other stats - in a real implementation, 
-    # you would need to implement article counting and view counting
-    stats = TamanKehatiStatsResponse(
-        koleksi_count=koleksi_count,
-        artikel_count=0,  # Placeholder
-        views_7d=0,  # Placeholder
-        views_30d=0  # Placeholder
-    )
+    stats = (await get_taman_stats(db, [taman_id])).get(taman_id)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Taman Kehati not found"
+        )
     
     logger.info(f"Successfully returned stats for Taman Kehati {taman_id}: {stats}")
     return stats
@@ -258,7 +277,7 @@ async def read_tamans_near(
     lng: float, 
     radius_m: float = 10000,  # 10km default
     current_user=Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Find Taman Kehati near the given coordinates within radius (in meters)"""
     logger.info(f"Finding Taman Kehati near lat:{lat}, lng:{lng}, radius:{radius_m}m - user: {current_user.email}")
@@ -73,8 +73,8 @@ async def create_user(
         )
     
     # Hash the password
-    from app.auth.utils import get_password_hash
-    hashed_password = get_password_hash(user.password)
+    from app.auth.utils import get_password_hash_async
+    hashed_password = await get_password_hash_async(user.password)
     
     # Create the user
     db_user = await create_user_db(
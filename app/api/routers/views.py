@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from datetime import datetime, timedelta
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 
 from app.database import get_db
-from app.schemas.views import ViewTrackCreate, ViewSeriesQuery, ViewSeriesResponse, ViewSeriesDataPoint, TopViewsQuery, TopViewsResponse, TopView
-from app.auth.utils import get_current_active_user, get_current_admin
+from app.schemas.views import ViewTrackCreate, ViewTrackBatchResponse, ViewSeriesQuery, ViewSeriesResponse, ViewSeriesDataPoint, TopViewsQuery, TopViewsResponse, TopView, TrendingResponse
+from app.auth.utils import get_current_active_user, get_current_admin, get_current_super_admin
 from app.utils.logging_config import get_logger
+from app.services.page_view_partitions import retention_start
+from app.services.taman_stats import invalidate_all_taman_stats
+from app.services.trending import MAX_TRENDING, trending_koleksi
+from app.services.view_ingest import view_ingestor
+from app.services.view_rollups import rebuild_rollups, rollup_params, rollup_source_sql
+from app.services.view_uniques import rebuild_unique_sketches, unique_series
+from app.settings import settings
 from sqlalchemy import text, select, func, and_, or_
 from app.models import PageViews, TamanKehati, KoleksiTumbuhan, Artikel
 import json
@@ -14,58 +22,105 @@ import json
 router = APIRouter()
 logger = get_logger(__name__)
 
+view_batch_adapter = TypeAdapter(List[ViewTrackCreate])
+
 @router.post("/track", response_model=dict,
+             status_code=status.HTTP_202_ACCEPTED,
              summary="Track page view",
              description="Track page views (public endpoint - no auth required)",
              responses={
-                 200: {
-                     "description": "View tracked successfully",
+                 202: {
+                     "description": "View accepted; it is written to the database in the next batch",
                      "content": {
                          "application/json": {
                              "example": {
-                                 "message": "View tracked successfully",
-                                 "status": "success"
+                                 "message": "View accepted",
+                                 "status": "accepted"
                              }
                          }
                      }
                  }
              })
-async def track_view(
-    view_track: ViewTrackCreate,
-    db: AsyncSession = Depends(get_db)
-):
+async def track_view(view_track: ViewTrackCreate):
     """
     Track page views (public endpoint - no auth required)
-    This endpoint does not require authentication to allow tracking from public pages
+    This endpoint does not require authentication to allow tracking from public pages.
+    Views are queued and written in batches by the view ingestor.
     """
-    logger.info(f"Tracking view - page_type: {view_track.page_type}, entity: taman={view_track.taman_kehati_id}, koleksi={view_track.koleksi_tumbuhan_id}")
-    
     # Validate that at least one entity ID is provided
     if not view_track.taman_kehati_id and not view_track.koleksi_tumbuhan_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Either taman_kehati_id or koleksi_tumbuhan_id must be provided"
         )
-    
-    # Create page view record
-    from app.models import PageViews as PageViewsModel
-    from uuid import uuid4
-    
-    page_view = PageViewsModel(
-        taman_kehati_id=view_track.taman_kehati_id,
-        koleksi_tumbuhan_id=view_track.koleksi_tumbuhan_id,
-        page_type=view_track.page_type,
-        ip_address=view_track.ip_address,
-        user_agent=view_track.user_agent,
-        referrer=view_track.referrer,
-        session_id=view_track.session_id
+
+    view = view_track.dict()
+    if view_ingestor.submit(view):
+        trending_koleksi.record(view)
+    return {"message": "View accepted", "status": "accepted"}
+
+
+@router.post("/track/batch", response_model=ViewTrackBatchResponse,
+             status_code=status.HTTP_202_ACCEPTED,
+             summary="Track a batch of page views",
+             description="Track up to VIEW_BATCH_MAX_EVENTS page views in one request (public endpoint - no auth required). "
+                         "The body is a JSON array of track events; any content type is accepted so the endpoint "
+                         "can be called with navigator.sendBeacon.")
+async def track_view_batch(request: Request):
+    """
+    Track a batch of page views, e.g. a session's worth flushed with navigator.sendBeacon.
+    sendBeacon sends strings as text/plain, so the body is parsed as JSON whatever its content type.
+    Events without a taman_kehati_id or koleksi_tumbuhan_id are skipped and counted as rejected.
+    """
+    body = await request.body()
+    if len(body) > settings.VIEW_BATCH_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch body exceeds {settings.VIEW_BATCH_MAX_BYTES} bytes"
+        )
+    try:
+        events = view_batch_adapter.validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False, include_input=False)
+        )
+    if len(events) > settings.VIEW_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.VIEW_BATCH_MAX_EVENTS} events per batch"
+        )
+
+    views = [event.dict() for event in events if event.taman_kehati_id or event.koleksi_tumbuhan_id]
+    accepted = view_ingestor.submit_many(views)
+    for view in views[:accepted]:
+        trending_koleksi.record(view)
+    return ViewTrackBatchResponse(accepted=accepted, rejected=len(events) - accepted)
+
+
+def _date_range(range: str):
+    end_date = datetime.now(timezone.utc)
+    if range == "30d":
+        return end_date - timedelta(days=30), end_date
+    # '7d', and the default for custom ranges
+    return end_date - timedelta(days=7), end_date
+
+
+@router.get("/trending", response_model=TrendingResponse)
+async def get_trending(
+    taman_kehati_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=MAX_TRENDING)
+):
+    """
+    Most viewed published koleksi over the last TRENDING_WINDOW_SECONDS, across
+    all taman or of one taman (public endpoint - no auth required).
+    Served from memory; refreshed every TRENDING_SYNC_SECONDS.
+    """
+    return TrendingResponse(
+        results=trending_koleksi.top(taman_kehati_id, limit),
+        window_seconds=trending_koleksi.window_seconds,
+        refreshed_at=trending_koleksi.refreshed_at
     )
-    
-    db.add(page_view)
-    await db.commit()
-    
-    logger.info(f"Successfully tracked view for page_type: {view_track.page_type}")
-    return {"message": "View tracked successfully", "status": "success"}
 
 
 @router.get("/series", response_model=ViewSeriesResponse)
@@ -74,11 +129,16 @@ async def get_view_series(
     id: int,
     range: str = "7d",  # '7d', '30d', 'custom'
     interval: str = "day",  # 'day', 'week', 'month'
+    metric: str = "views",  # 'views', 'unique'
     current_user=Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get view series data for analytics"""
-    logger.info(f"Getting view series - entity: {entity}, id: {id}, range: {range}, interval: {interval}, user: {current_user.email}")
+    """
+    Get view series data for analytics, read from the page-view rollups.
+    With metric=unique, counts are estimated unique visitors (about 2.3%
+    standard error) and total is the unique visitors over the whole range.
+    """
+    logger.info(f"Getting view series - entity: {entity}, id: {id}, range: {range}, interval: {interval}, metric: {metric}, user: {current_user.email}")
     
     # Validate entity parameter
     valid_entities = ["taman", "koleksi", "artikel"]
@@ -87,78 +147,40 @@ async def get_view_series(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid entity: {entity}. Valid options: {valid_entities}"
         )
+    valid_intervals = ["day", "week", "month"]
+    if interval not in valid_intervals:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid interval: {interval}. Valid options: {valid_intervals}"
+        )
+    
+    valid_metrics = ["views", "unique"]
+    if metric not in valid_metrics:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid metric: {metric}. Valid options: {valid_metrics}"
+        )
     
-    # Determine date range
-    end_date = datetime.utcnow()
-    if range == "7d":
-        start_date = end_date - timedelta(days=7)
-    elif range == "30d":
-        start_date = end_date - timedelta(days=30)
-    else:
-        # For custom range, we'll use the last 7 days as default
-        start_date = end_date - timedelta(days=7)
+    start_date, end_date = _date_range(range)
     
-    # Build query based on entity
-    date_trunc_expr = f"DATE_TRUNC('{interval}', created_at)"
+    if metric == "unique":
+        series, total = await unique_series(db, entity, id, start_date, end_date, interval)
+        data_points = [ViewSeriesDataPoint(date=date.isoformat(), count=count) for date, count in series]
+        logger.info(f"Successfully returned unique visitor series with {len(data_points)} data points")
+        return ViewSeriesResponse(data=data_points, total=total)
     
-    base_query = text(f"""
+    # Views of an artikel are those with page_type 'artikel-<id>'
+    query = text(f"""
         SELECT 
-            {date_trunc_expr} as date,
-            COUNT(*) as count
-        FROM page_views
-        WHERE 
-            created_at >= :start_date 
-            AND created_at <= :end_date
+            DATE_TRUNC('{interval}', bucket) as date,
+            SUM(views) as count
+        FROM {rollup_source_sql()} AS v
+        GROUP BY 1
+        ORDER BY 1
     """)
+    params = {"entity_type": entity, "entity_id": id, **rollup_params(start_date, end_date)}
     
-    params = {"start_date": start_date, "end_date": end_date}
-    
-    if entity == "taman":
-        base_query = text(f"""
-            SELECT 
-                {date_trunc_expr} as date,
-                COUNT(*) as count
-            FROM page_views
-            WHERE 
-                taman_kehati_id = :entity_id
-                AND created_at >= :start_date 
-                AND created_at <= :end_date
-            GROUP BY {date_trunc_expr}
-            ORDER BY {date_trunc_expr}
-        """)
-        params["entity_id"] = id
-    elif entity == "koleksi":
-        base_query = text(f"""
-            SELECT 
-                {date_trunc_expr} as date,
-                COUNT(*) as count
-            FROM page_views
-            WHERE 
-                koleksi_tumbuhan_id = :entity_id
-                AND created_at >= :start_date 
-                AND created_at <= :end_date
-            GROUP BY {date_trunc_expr}
-            ORDER BY {date_trunc_expr}
-        """)
-        params["entity_id"] = id
-    elif entity == "artikel":
-        # For artikel, we might need to join with artikel table if needed
-        # For now, we'll just query page views with a specific page type
-        base_query = text(f"""
-            SELECT 
-                {date_trunc_expr} as date,
-                COUNT(*) as count
-            FROM page_views
-            WHERE 
-                page_type = :page_type
-                AND created_at >= :start_date 
-                AND created_at <= :end_date
-            GROUP BY {date_trunc_expr}
-            ORDER BY {date_trunc_expr}
-        """)
-        params["page_type"] = f"artikel-{id}"
-    
-    result = await db.execute(base_query, params)
+    result = await db.execute(query, params)
     rows = result.fetchall()
     
     # Convert to response format
@@ -186,7 +208,7 @@ async def get_top_views(
     current_user=Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get top viewed items"""
+    """Get top viewed items, read from the page-view rollups"""
     logger.info(f"Getting top views - entity: {entity}, taman_kehati_id: {taman_kehati_id}, range: {range}, limit: {limit}, user: {current_user.email}")
     
     # Validate entity parameter
@@ -197,71 +219,33 @@ async def get_top_views(
             detail=f"Invalid entity: {entity}. Valid options: {valid_entities}"
         )
     
-    # Determine date range
-    end_date = datetime.utcnow()
-    if range == "7d":
-        start_date = end_date - timedelta(days=7)
-    elif range == "30d":
-        start_date = end_date - timedelta(days=30)
-    else:
-        # Default to 7 days
-        start_date = end_date - timedelta(days=7)
+    start_date, end_date = _date_range(range)
     
     results = []
     
     if entity == "koleksi":
-        # Query top collections
+        # Query top collections, optionally of one taman
+        taman_join = ""
+        params = {"entity_type": "koleksi", "limit": limit, **rollup_params(start_date, end_date)}
+        if taman_kehati_id:
+            taman_join = "JOIN koleksi_tumbuhan kt ON kt.id = v.entity_id AND kt.taman_kehati_id = :taman_id"
+            params["taman_id"] = taman_kehati_id
         query = text(f"""
             SELECT 
-                koleksi_tumbuhan_id as id,
-                COUNT(*) as view_count
-            FROM page_views
-            WHERE 
-                koleksi_tumbuhan_id IS NOT NULL
-                AND created_at >= :start_date 
-                AND created_at <= :end_date
+                v.entity_id as id,
+                SUM(v.views) as view_count
+            FROM {rollup_source_sql(entity_id=False)} AS v
+            {taman_join}
+            GROUP BY v.entity_id
+            ORDER BY view_count DESC
+            LIMIT :limit
         """)
         
-        params = {"start_date": start_date, "end_date": end_date}
-        
-        if taman_kehati_id:
-            query = text(f"""
-                SELECT 
-                    pv.koleksi_tumbuhan_id as id,
-                    COUNT(*) as view_count
-                FROM page_views pv
-                JOIN koleksi_tumbuhan kt ON pv.koleksi_tumbuhan_id = kt.id
-                WHERE 
-                    pv.koleksi_tumbuhan_id IS NOT NULL
-                    AND kt.taman_kehati_id = :taman_id
-                    AND pv.created_at >= :start_date 
-                    AND pv.created_at <= :end_date
-                GROUP BY pv.koleksi_tumbuhan_id
-                ORDER BY view_count DESC
-                LIMIT :limit
-            """)
-            params["taman_id"] = taman_kehati_id
-            params["limit"] = limit
-        else:
-            query = text(f"""
-                SELECT 
-                    koleksi_tumbuhan_id as id,
-                    COUNT(*) as view_count
-                FROM page_views
-                WHERE 
-                    koleksi_tumbuhan_id IS NOT NULL
-                    AND created_at >= :start_date 
-                    AND created_at <= :end_date
-                GROUP BY koleksi_tumbuhan_id
-                ORDER BY view_count DESC
-                LIMIT :limit
-            """)
-            params["limit"] = limit
-        
         result = await db.execute(query, params)
         rows = result.fetchall()
         
         # Get titles for the top collections
+        koleksi_titles = {}
         if rows:
             ids = [row.id for row in rows]
             koleksi_result = await db.execute(
@@ -281,4 +265,28 @@ async def get_top_views(
     
     response = TopViewsResponse(results=results)
     logger.info(f"Successfully returned top {len(results)} viewed {entity} items")
-    return response
\ No newline at end of file
+    return response
+
+
+@router.post("/rollups/rebuild", response_model=dict)
+async def rebuild_view_rollups(
+    days: int = Query(30, ge=1, le=366),
+    current_user=Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Recompute the page-view rollups and unique-visitor sketches of the last
+    ``days`` days from page_views (super_admin only). Needed only for views that did not go through
+    POST /track, e.g. imported or backfilled rows. Days whose page_views
+    partitions were removed by retention are left as they are.
+    """
+    logger.info(f"Page view rollup rebuild of {days} days requested by super_admin: {current_user.email}")
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=days)
+    retained_from = retention_start(end_date, settings.PAGE_VIEW_RETENTION_MONTHS)
+    if retained_from is not None:
+        start_date = max(start_date, retained_from)
+    start, end = await rebuild_rollups(db, start_date, end_date)
+    await rebuild_unique_sketches(db, start, end)
+    invalidate_all_taman_stats()
+    return {"message": "Page view rollups rebuilt", "start": start.isoformat(), "end": end.isoformat()}
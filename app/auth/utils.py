@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
@@ -6,12 +8,18 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
 from sqlalchemy.future import select
 
-from ..database import get_db
+from ..database import AsyncSessionLocal, get_db
 from app.settings import settings
 from ..models import User as UserModel, UserRoleEnum
 from ..schemas.users import UserResponse
+from ..utils.cache import TTLCache
+from ..utils.logging_config import get_logger
+from ..utils.metrics import registry
+
+logger = get_logger(__name__)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -44,6 +52,45 @@ class UserInDB(BaseModel):
     class Config:
         from_attributes = True
 
+# Users resolved from access tokens, keyed by the token subject (email).
+# Local writes invalidate entries immediately; changes made through another
+# worker are picked up once the entry expires after USER_CACHE_TTL_SECONDS.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+registry.gauge("auth_user_cache_hits", "get_current_user cache hits").set_function(lambda: user_cache.hits)
+registry.gauge("auth_user_cache_misses", "get_current_user cache misses").set_function(lambda: user_cache.misses)
+
+def invalidate_cached_user(*emails: Optional[str]):
+    """Drop cached users so their next request reloads them from the database"""
+    for email in emails:
+        if email:
+            user_cache.pop(email)
+
+# Minimum token_version still accepted per user id for self-contained access
+# tokens. Entries only need to outlive the access tokens they reject.
+revoked_token_versions = TTLCache(maxsize=100000, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def revoke_user_tokens(user_id: str, min_token_version: int):
+    """Reject this worker's self-contained access tokens older than min_token_version"""
+    revoked_token_versions.set(str(user_id), min_token_version)
+
+def _user_from_claims(payload: dict) -> Optional[UserInDB]:
+    """Build the user from a self-contained access token, or None if it has no authorization claims"""
+    if payload.get("role") is None or payload.get("user_id") is None:
+        return None
+    
+    min_token_version = revoked_token_versions.get(payload["user_id"])
+    if min_token_version is not None and payload.get("tv", 0) < min_token_version:
+        return None
+    
+    return UserInDB(
+        id=payload["user_id"],
+        email=payload["sub"],
+        nama=payload.get("nama") or "",
+        role=payload["role"],
+        is_active=payload.get("is_active", True),
+        taman_kehati_id=payload.get("taman_kehati_id")
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
     # Truncate password to 72 bytes if longer to prevent bcrypt errors
@@ -56,14 +103,81 @@ def get_password_hash(password: str) -> str:
     truncated_password = password[:72] if len(password.encode('utf-8')) > 72 else password
     return pwd_context.hash(truncated_password)
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event
+# loop. Work is admitted only while fewer than PASSWORD_HASH_MAX_PENDING hashes
+# are running or queued; beyond that callers get an immediate 429 instead of
+# waiting behind a login storm.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_hashes = 0
+_rehash_tasks = set()
+
+password_hash_rejections = registry.counter(
+    "auth_password_hash_rejections_total", "Password hash requests rejected because the hash pool was full"
+)
+registry.gauge(
+    "auth_password_hash_pending", "Password hashes running or queued on the hash pool"
+).set_function(lambda: _pending_hashes)
+
+async def _run_password_hashing(func, *args):
+    global _pending_hashes
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        password_hash_rejections.inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending_hashes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hash pool; raises 429 when the pool is full"""
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hash pool; raises 429 when the pool is full"""
+    return await _run_password_hashing(get_password_hash, password)
+
+async def _rehash_password(user_id, plain_password: str, old_hash: str):
+    """Upgrade a deprecated hash in the background with its own session"""
+    try:
+        new_hash = await get_password_hash_async(plain_password)
+        async with AsyncSessionLocal() as session:
+            # Only replace the hash that was verified, never a newer password
+            await session.execute(
+                update(UserModel)
+                .where(UserModel.id == user_id, UserModel.password == old_hash)
+                .values(password=new_hash)
+            )
+            await session.commit()
+    except HTTPException:
+        # Hash pool is busy; the upgrade is retried on the next login
+        pass
+    except Exception as e:
+        logger.warning(f"Password rehash failed for user {user_id}: {str(e)}")
+
+def schedule_password_rehash(user_id, plain_password: str, old_hash: str):
+    task = asyncio.create_task(_rehash_password(user_id, plain_password, old_hash))
+    _rehash_tasks.add(task)
+    task.add_done_callback(_rehash_tasks.discard)
+
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[UserInDB]:
     """Authenticate a user by email and password"""
     result = await db.execute(select(UserModel).filter(UserModel.email == email))
     user = result.scalars().first()
     
-    if not user or not verify_password(password, user.password):
+    if not user or not await verify_password_async(password, user.password):
         return None
     
+    if pwd_context.needs_update(user.password):
+        schedule_password_rehash(user.id, password, user.password)
+    
     # Handle the role field properly - it could be an enum or string from the database
     role_value = user.role.value if hasattr(user.role, 'value') else user.role
     
@@ -106,6 +220,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     except JWTError:
         raise credentials_exception
     
+    if settings.AUTH_SELF_CONTAINED_TOKENS and payload.get("role") is not None:
+        # Authorize from signed claims without touching the database
+        user_from_claims = _user_from_claims(payload)
+        if user_from_claims is None:
+            raise credentials_exception
+        return user_from_claims
+    
+    cached_user = user_cache.get(token_data.email)
+    if cached_user is not None:
+        return cached_user
+    
     result = await db.execute(select(UserModel).filter(UserModel.email == token_data.email))
     user = result.scalars().first()
     
@@ -115,7 +240,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     # Handle the role field properly - it could be an enum or string from the database
     role_value = user.role.value if hasattr(user.role, 'value') else user.role
     
-    return UserInDB(
+    user_in_db = UserInDB(
         id=str(user.id),
         email=user.email,
         nama=user.nama,
@@ -123,6 +248,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         is_active=user.is_active,
         taman_kehati_id=user.taman_kehati_id
     )
+    user_cache.set(token_data.email, user_in_db)
+    return user_in_db
 
 async def get_current_active_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
     """Get the current active user"""
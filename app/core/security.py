@@ -41,4 +41,35 @@ def verify_token(token: str) -> dict:
     Raises:
         JWTError: If token is invalid or expired
     """
-    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
\ No newline at end of file
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+def build_token_claims(user, token_type: str = "access") -> dict:
+    """
+    Build the claims for a user's access or refresh token
+    
+    Args:
+        user: User model instance
+        token_type: "access" or "refresh"
+    
+    Returns:
+        Claims dictionary to pass to create_access_token. Every token carries
+        the user's token_version ("tv"); with AUTH_SELF_CONTAINED_TOKENS access
+        tokens also carry the role, taman and status used for authorization.
+    """
+    claims = {
+        "sub": user.email,
+        "user_id": str(user.id),
+        "token_type": token_type,
+        "tv": user.token_version or 0,
+    }
+    
+    if settings.AUTH_SELF_CONTAINED_TOKENS and token_type == "access":
+        claims.update({
+            "nama": user.nama,
+            "role": user.role.value if hasattr(user.role, 'value') else user.role,
+            "taman_kehati_id": user.taman_kehati_id,
+            "is_active": bool(user.is_active),
+        })
+    
+    return claims
@@ -10,6 +10,8 @@ from app.models import Artikel as ArtikelModel, Media, TamanKehati, User as User
 from app.schemas.artikel import ArtikelCreate, ArtikelUpdate, ArtikelResponse
 from app.utils.logging_config import get_logger
 from app.audit.utils import log_audit_entry
+from app.services.search_indexer import search_indexer
+from app.services.taman_stats import invalidate_taman_stats
 
 logger = get_logger(__name__)
 
@@ -166,6 +168,8 @@ async def create_artikel(
 
     await db.commit()
     await db.refresh(db_artikel)
+    search_indexer.mark_dirty("artikel", db_artikel.id)
+    invalidate_taman_stats(db_artikel.taman_kehati_id)
     logger.info(f"Successfully created Artikel with ID: {db_artikel.id}")
     return db_artikel
 
@@ -234,6 +238,8 @@ async def update_artikel(
 
     await db.commit()
     await db.refresh(db_artikel)
+    search_indexer.mark_dirty("artikel", db_artikel.id)
+    invalidate_taman_stats(old_data["taman_kehati_id"], db_artikel.taman_kehati_id)
 
     # Log audit entry
     await log_audit_entry(
@@ -304,6 +310,8 @@ async def delete_artikel(
     )
 
     await db.commit()
+    search_indexer.mark_dirty("artikel", artikel_id)
+    invalidate_taman_stats(old_data["taman_kehati_id"])
     logger.info(f"Successfully deleted Artikel with ID: {artikel_id}")
     return True
 
@@ -352,6 +360,7 @@ async def publish_artikel(
 
     await db.commit()
     await db.refresh(db_artikel)
+    search_indexer.mark_dirty("artikel", db_artikel.id)
 
     # Log audit entry
     await log_audit_entry(
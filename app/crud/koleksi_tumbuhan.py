@@ -5,6 +5,9 @@ from app.models import KoleksiTumbuhan as KoleksiTumbuhanModel
 from app.schemas.koleksi_tumbuhan import KoleksiTumbuhanCreate, KoleksiTumbuhanUpdate
 from typing import List, Optional
 
+from app.services.search_indexer import search_indexer
+from app.services.taman_stats import invalidate_taman_stats
+
 async def get_koleksi_tumbuhan(db: AsyncSession, koleksi_id: int) -> Optional[KoleksiTumbuhanModel]:
     """Get a plant collection by ID"""
     result = await db.execute(
@@ -41,6 +44,8 @@ async def create_koleksi_tumbuhan(db: AsyncSession, koleksi: KoleksiTumbuhanCrea
     db.add(db_koleksi)
     await db.commit()
     await db.refresh(db_koleksi)
+    search_indexer.mark_dirty("koleksi", db_koleksi.id)
+    invalidate_taman_stats(db_koleksi.taman_kehati_id)
     return db_koleksi
 
 async def update_koleksi_tumbuhan(db: AsyncSession, koleksi_id: int, koleksi: KoleksiTumbuhanUpdate) -> Optional[KoleksiTumbuhanModel]:
@@ -53,12 +58,15 @@ async def update_koleksi_tumbuhan(db: AsyncSession, koleksi_id: int, koleksi: Ko
     if not db_koleksi:
         return None
     
+    previous_taman_id = db_koleksi.taman_kehati_id
     update_data = koleksi.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_koleksi, field, value)
     
     await db.commit()
     await db.refresh(db_koleksi)
+    search_indexer.mark_dirty("koleksi", db_koleksi.id)
+    invalidate_taman_stats(previous_taman_id, db_koleksi.taman_kehati_id)
     return db_koleksi
 
 async def delete_koleksi_tumbuhan(db: AsyncSession, koleksi_id: int) -> bool:
@@ -71,6 +79,9 @@ async def delete_koleksi_tumbuhan(db: AsyncSession, koleksi_id: int) -> bool:
     if not db_koleksi:
         return False
     
+    taman_id = db_koleksi.taman_kehati_id
     await db.delete(db_koleksi)
     await db.commit()
+    search_indexer.mark_dirty("koleksi", koleksi_id)
+    invalidate_taman_stats(taman_id)
     return True
\ No newline at end of file
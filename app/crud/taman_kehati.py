@@ -20,6 +20,7 @@ from typing import List, Optional
 from uuid import UUID
 from app.utils.logging_config import get_logger
 from app.audit.utils import log_audit_entry
+from app.services.search_indexer import search_indexer
 
 logger = get_logger(__name__)
 
@@ -93,6 +94,7 @@ async def create_taman_kehati(
     
     await db.commit()
     await db.refresh(db_taman)
+    search_indexer.mark_dirty("taman", db_taman.id)
     logger.info(f"Successfully created Taman Kehati with ID: {db_taman.id}")
     return db_taman
 
@@ -143,6 +145,7 @@ async def update_taman_kehati(
     
     await db.commit()
     await db.refresh(db_taman)
+    search_indexer.mark_dirty("taman", db_taman.id)
     
     # Log audit entry
     await log_audit_entry(
@@ -215,6 +218,7 @@ async def delete_taman_kehati(
     )
     
     await db.commit()
+    search_indexer.mark_dirty("taman", taman_id)
     logger.info(f"Successfully deleted Taman Kehati with ID: {taman_id}")
     return True
 
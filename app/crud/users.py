@@ -9,6 +9,10 @@ from typing import List, Optional
 from uuid import UUID
 from app.utils.logging_config import get_logger
 from app.audit.utils import log_audit_entry
+from app.auth.utils import invalidate_cached_user, revoke_user_tokens
+
+# Changing any of these revokes the tokens already issued to the user
+TOKEN_REVOKING_FIELDS = ("email", "password", "role", "is_active", "taman_kehati_id")
 
 async def get_user(db: AsyncSession, user_id: UUID) -> Optional[UserModel]:
     """Get a user by ID"""
@@ -127,10 +131,18 @@ async def update_user(
         "taman_kehati_id": user.taman_kehati_id
     }
     
+    old_email = user.email
+    revoke_tokens = False
     for field, value in kwargs.items():
         if hasattr(user, field):
+            current = getattr(user, field)
+            if field in TOKEN_REVOKING_FIELDS and getattr(current, 'value', current) != getattr(value, 'value', value):
+                revoke_tokens = True
             setattr(user, field, value)
     
+    if revoke_tokens:
+        user.token_version = (user.token_version or 0) + 1
+    
     # Capture new data for audit
     new_data = {
         "id": str(user.id),
@@ -143,6 +155,10 @@ async def update_user(
     
     await db.commit()
     await db.refresh(user)
+    # Role, status and taman changes must apply to the user's next request
+    invalidate_cached_user(old_email, user.email)
+    if revoke_tokens:
+        revoke_user_tokens(str(user.id), user.token_version)
     
     # Log audit entry
     await log_audit_entry(
@@ -201,4 +217,6 @@ async def delete_user(
     )
     
     await db.commit()
+    invalidate_cached_user(old_data["email"])
+    revoke_user_tokens(old_data["id"], (user.token_version or 0) + 1)
     return True
\ No newline at end of file
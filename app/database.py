@@ -1,12 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from geoalchemy2 import Geometry
-from typing import AsyncGenerator
+from fastapi import Request
+from collections import OrderedDict
+from typing import AsyncGenerator, List, Optional
+import asyncio
+import hashlib
+import math
 import os
+import time
 from dotenv import load_dotenv
 from .models import Base
 from .utils.logging_config import get_logger
+from .utils.db_metrics import InstrumentedAsyncQueuePool, instrument_engine
 
 logger = get_logger(__name__)
 
@@ -34,31 +42,44 @@ if not raw_database_url:
     """
     raise ValueError(error_msg)
 
-# Ensure we always use the async driver (psycopg v3) for async operations
-if not "+psycopg" in raw_database_url:
-    if "://" in raw_database_url and "+" not in raw_database_url.split("://")[0]:
-        # Convert to psycopg async driver
-        parts = raw_database_url.split("://", 1)
-        raw_database_url = f"{parts[0]}+psycopg://{parts[1]}"
+def _ensure_async_driver(url: str) -> str:
+    """Ensure we always use the async driver (psycopg v3) for async operations"""
+    if not "+psycopg" in url:
+        if "://" in url and "+" not in url.split("://")[0]:
+            # Convert to psycopg async driver
+            parts = url.split("://", 1)
+            url = f"{parts[0]}+psycopg://{parts[1]}"
+    return url
 
-DATABASE_URL = raw_database_url
+
+def _engine_options(application_name: str, pool_name: str) -> dict:
+    """Pool and connection settings shared by the primary and replica engines"""
+    return dict(
+        echo=os.getenv("DB_ECHO", "False").lower() == "true",  # Only enable in development
+        poolclass=InstrumentedAsyncQueuePool,  # Records checkout latency for /metrics
+        pool_logging_name=pool_name,
+        pool_pre_ping=True,
+        pool_size=10,  # Increased pool size for better performance
+        max_overflow=20,
+        pool_recycle=3600,  # Recycle connections every hour
+        pool_timeout=30,  # Set connection timeout
+        pool_reset_on_return='commit',  # Reset connections on return
+        connect_args={
+            "application_name": application_name,
+            "connect_timeout": 10,  # Set connection timeout
+        }
+    )
+
+
+DATABASE_URL = _ensure_async_driver(raw_database_url)
+
+# Statements slower than this are logged with their parameter shape and route
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
 
 # Create async engine
 logger.info("Initializing database engine with URL: %s", DATABASE_URL.replace('@', '***@'))
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=os.getenv("DB_ECHO", "False").lower() == "true",  # Only enable in development
-    pool_pre_ping=True,
-    pool_size=10,  # Increased pool size for better performance
-    max_overflow=20,
-    pool_recycle=3600,  # Recycle connections every hour
-    pool_timeout=30,  # Set connection timeout
-    pool_reset_on_return='commit',  # Reset connections on return
-    connect_args={
-        "application_name": "taman-kehati-api",
-        "connect_timeout": 10,  # Set connection timeout
-    }
-)
+engine = create_async_engine(DATABASE_URL, **_engine_options("taman-kehati-api", "primary"))
+instrument_engine(engine, "primary", SLOW_QUERY_THRESHOLD_MS)
 logger.info("Database engine initialized successfully")
 
 # Create async session
@@ -68,6 +89,218 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+# Read replicas (optional). READ_REPLICA_URLS is a comma-separated list of
+# connection strings; when it is empty every read goes to the primary.
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "10"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "30"))
+
+READ_REPLICA_URLS = [
+    _ensure_async_driver(url.strip())
+    for url in os.getenv("READ_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+read_engines: List[AsyncEngine] = []
+for _index, _url in enumerate(READ_REPLICA_URLS):
+    logger.info("Initializing read replica engine with URL: %s", _url.replace('@', '***@'))
+    _replica = create_async_engine(_url, **_engine_options(f"taman-kehati-api-replica-{_index}", f"replica-{_index}"))
+    instrument_engine(_replica, f"replica-{_index}", SLOW_QUERY_THRESHOLD_MS)
+    read_engines.append(_replica)
+
+# Replication lag in seconds; 0 when the replica has replayed everything it received
+_REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    """
+    Choose a read replica for a new session.
+
+    Replica health and lag are re-checked in the background at most once per
+    REPLICA_HEALTH_CHECK_INTERVAL, so picking a replica never waits on the
+    database. A replica that is unreachable or lags more than
+    REPLICA_MAX_LAG_SECONDS is skipped until it recovers; with no usable
+    replica the caller falls back to the primary.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], max_lag_seconds: float, check_interval: float):
+        self.engines = engines
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._healthy: List[AsyncEngine] = []
+        self._checked_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._next = 0
+
+    async def _check(self, replica: AsyncEngine) -> bool:
+        try:
+            async with replica.connect() as conn:
+                lag = await asyncio.wait_for(conn.scalar(_REPLICA_LAG_QUERY), timeout=2)
+        except Exception as e:
+            logger.warning("Read replica %s is unavailable: %s", replica.url.host, str(e))
+            return False
+        if float(lag or 0) > self.max_lag_seconds:
+            logger.warning("Read replica %s lags %.1fs behind the primary", replica.url.host, float(lag))
+            return False
+        return True
+
+    async def _refresh(self):
+        results = await asyncio.gather(*(self._check(replica) for replica in self.engines))
+        self._healthy = [replica for replica, ok in zip(self.engines, results) if ok]
+        self._checked_at = time.monotonic()
+
+    def _schedule_refresh(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._refresh_task = asyncio.create_task(self._refresh())
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Return a healthy replica engine, or None to use the primary"""
+        if not self.engines:
+            return None
+        self._schedule_refresh()
+        if not self._healthy:
+            return None
+        self._next = (self._next + 1) % len(self._healthy)
+        return self._healthy[self._next]
+
+
+replica_router = ReplicaRouter(read_engines, REPLICA_MAX_LAG_SECONDS, REPLICA_HEALTH_CHECK_INTERVAL)
+
+
+def _is_write_statement(statement) -> bool:
+    """Whether a statement may modify data and therefore must run on the primary"""
+    if getattr(statement, "is_dml", False):
+        return True
+    if isinstance(statement, TextClause):
+        words = str(statement).split(None, 1)
+        return bool(words) and words[0].upper() not in ("SELECT", "WITH", "SHOW", "EXPLAIN", "VALUES")
+    return not getattr(statement, "is_select", False)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_session_writes(orm_execute_state):
+    if _is_write_statement(orm_execute_state.statement):
+        orm_execute_state.session.info["has_written"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_session_flush(session, flush_context):
+    session.info["has_written"] = True
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from the replica stored in ``info["replica_bind"]``.
+
+    Flushes and write statements always go to the primary, and once the
+    session has written anything it stays on the primary so it reads its
+    own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica_bind")
+        if replica is None or self.info.get("has_written"):
+            return engine.sync_engine
+        if self._flushing or (clause is not None and _is_write_statement(clause)):
+            self.info["has_written"] = True
+            return engine.sync_engine
+        return replica
+
+
+ReadSessionLocal = sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False
+)
+
+# Callers that wrote recently are pinned to the primary so they read their own
+# writes even when the replicas are a few seconds behind. The pin travels in a
+# cookie holding the wall-clock time it ends, so it holds whichever worker
+# serves the next read; clients that drop cookies are also remembered per
+# worker by their Authorization header.
+PRIMARY_PIN_COOKIE = "db_primary_until"
+_MAX_RECENT_WRITERS = 10000
+_recent_writers: "OrderedDict[str, float]" = OrderedDict()
+
+
+def _caller_key(request: Request) -> Optional[str]:
+    identity = request.headers.get("authorization")
+    if not identity:
+        return None
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+
+
+def _cookie_pin_active(request: Request) -> bool:
+    try:
+        until = float(request.cookies.get(PRIMARY_PIN_COOKIE, ""))
+    except ValueError:
+        return False
+    now = time.time()
+    # Pins longer than the server ever sets are ignored
+    return now < until <= now + REPLICA_STICKY_SECONDS + 1
+
+
+def mark_caller_wrote(request: Request):
+    """Pin the caller to the primary for REPLICA_STICKY_SECONDS"""
+    request.state.primary_until = time.time() + REPLICA_STICKY_SECONDS
+    key = _caller_key(request)
+    if key is None:
+        return
+    _recent_writers[key] = time.monotonic() + REPLICA_STICKY_SECONDS
+    _recent_writers.move_to_end(key)
+    while len(_recent_writers) > _MAX_RECENT_WRITERS:
+        _recent_writers.popitem(last=False)
+
+
+def caller_recently_wrote(request: Request) -> bool:
+    if _cookie_pin_active(request):
+        return True
+    key = _caller_key(request)
+    if key is None:
+        return False
+    expires_at = _recent_writers.get(key)
+    if expires_at is None:
+        return False
+    if expires_at < time.monotonic():
+        _recent_writers.pop(key, None)
+        return False
+    return True
+
+
+class PrimaryPinMiddleware:
+    """ASGI middleware sending the primary pin cookie with responses to requests that wrote"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not READ_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            # Dependencies with yield have exited by the time the response starts
+            until = scope.get("state", {}).get("primary_until")
+            if message["type"] == "http.response.start" and until:
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={math.ceil(until)}; Max-Age={math.ceil(REPLICA_STICKY_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+
 async def init_db():
     """Initialize database tables"""
     logger.info("Initializing database tables...")
@@ -77,7 +310,7 @@ async def init_db():
 
 
 # Dependency to get DB session
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     logger.debug("Creating new database session")
     async with AsyncSessionLocal() as session:
         try:
@@ -87,5 +320,26 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
+            if session.sync_session.info.get("has_written"):
+                mark_caller_wrote(request)
+            await session.close()
+            logger.debug("Database session closed")
+
+
+# Dependency for read-only endpoints: uses a healthy read replica when one is
+# configured, otherwise (or after the caller has written) the primary.
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    replica = None if caller_recently_wrote(request) else replica_router.choose()
+    logger.debug("Creating new read database session on %s", "replica" if replica else "primary")
+    async with ReadSessionLocal(info={"replica_bind": replica.sync_engine if replica else None}) as session:
+        try:
+            yield session
+        except Exception as e:
+            logger.error(f"Database session error: {e}")
+            await session.rollback()
+            raise
+        finally:
+            if session.sync_session.info.get("has_written"):
+                mark_caller_wrote(request)
             await session.close()
             logger.debug("Database session closed")
\ No newline at end of file
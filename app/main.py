@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routers import taman_kehati, koleksi_tumbuhan, users, auth, data_export
 from .api.routers import provinsi as geo_ref
@@ -10,9 +11,18 @@ from .api.routers import audit
 from .api.routers import meta
 from .api.routers import artikel
 from .utils.logging_config import get_logger
+from .utils.db_metrics import DbMetricsMiddleware
+from .utils.metrics import registry as metrics_registry
+from .settings import settings
+from .services.readiness import ReadinessProbe
+from .services.page_view_partitions import page_view_partitions
+from .services.query_log import query_log
+from .services.search_indexer import search_indexer
+from .services.suggestions import suggestion_service
+from .services.trending import trending_koleksi
+from .services.view_ingest import view_ingestor
 import os
-from .database import engine
-from sqlalchemy import text
+from .database import PrimaryPinMiddleware, engine
 
 # Setup logging for main application
 logger = get_logger(__name__)
@@ -32,6 +42,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route DB query counts, DB time and pool checkout latency for /metrics
+app.add_middleware(DbMetricsMiddleware)
+
+# Keeps callers that just wrote reading from the primary, across workers
+app.add_middleware(PrimaryPinMiddleware)
+
 
 
 logger.info("Taman Kehati API application initialized")
@@ -55,62 +71,93 @@ app.include_router(data_export.router, prefix="/api", tags=["data-export"])
 def read_root():
     return {"message": "Welcome to Taman Kehati API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(request: Request):
+    """Prometheus metrics (requires `Authorization: Bearer <METRICS_TOKEN>` when METRICS_TOKEN is set)"""
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+readiness = ReadinessProbe(
+    engine,
+    ttl_seconds=settings.READINESS_TTL_SECONDS,
+    saturation_threshold=settings.READINESS_POOL_SATURATION_THRESHOLD
+)
+
+# /health is what docker-compose and Render probe to decide on restarts, so it
+# stays a liveness check: restarting a busy instance would only add load
+@app.get("/livez")
 @app.get("/health")
-async def health_check():
-    """Health check endpoint that validates DB connection, PostGIS availability, and FTS readiness"""
-    try:
-        async with engine.connect() as conn:
-            # Test basic connection
-            db_status = await conn.scalar(text("select 1"))
-            
-            # Test PostGIS availability
-            postgis_status = await conn.scalar(text("SELECT PostGIS_version()"))
-            
-            # Test FTS (Full Text Search) availability
-            fts_status = await conn.scalar(text("SELECT to_tsvector('indonesian', 'test')"))
-            
-            return {
-                "status": "healthy",
-                "checks": {
-                    "database": "ok" if db_status == 1 else "failed",
-                    "postgis": "ok" if postgis_status else "failed",
-                    "fts_indonesian": "ok" if fts_status is not None else "failed"
-                }
-            }
-    except Exception as e:
-        logger.error("Health check failed: %s", str(e))
-        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+def liveness_check():
+    """Liveness probe: the process is up and serving requests (no DB access)"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readiness_check():
+    """
+    Readiness probe served from cached DB, PostGIS and FTS checks plus the
+    current pool saturation. Returns 503 when a check failed or the pool is
+    saturated so the load balancer can shed traffic.
+    """
+    snapshot = readiness.snapshot()
+    if snapshot["status"] != "healthy":
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=snapshot)
+    return snapshot
 
 @app.on_event("startup")
-async def _db_ping():
-    try:
-        async with engine.connect() as conn:
-            # Test basic connection
-            try:
-                val = await conn.scalar(text("select 1"))
-                logger.info("DB ping OK: %s", val)
-            except Exception as e:
-                logger.error("DB basic connection failed: %s", str(e))
-                raise
-
-            # Test PostGIS availability
-            try:
-                postgis_version = await conn.scalar(text("SELECT PostGIS_version()"))
-                logger.info("PostGIS available: %s", postgis_version)
-            except Exception as e:
-                logger.error("PostGIS check failed: %s", str(e))
-                logger.error("Please ensure the PostGIS extension is installed and enabled in your database.")
-                raise
-
-            # Test FTS (Full Text Search) availability
-            try:
-                fts_test = await conn.scalar(text("SELECT to_tsvector('indonesian', 'test')"))
-                logger.info("FTS (Indonesian) available: %s", fts_test is not None)
-            except Exception as e:
-                logger.error("FTS (Indonesian) check failed: %s", str(e))
-                logger.error("Please ensure the 'indonesian' FTS dictionary is installed in your database.")
-                raise
-
-    except Exception as e:
-        logger.error("DB ping failed: %s", str(e))
-        raise
\ No newline at end of file
+async def _start_readiness():
+    await readiness.start()
+
+@app.on_event("shutdown")
+async def _stop_readiness():
+    await readiness.stop()
+
+@app.on_event("startup")
+async def _start_page_view_partitions():
+    await page_view_partitions.start()
+
+@app.on_event("shutdown")
+async def _stop_page_view_partitions():
+    await page_view_partitions.stop()
+
+# Background services, registered in the order they are stopped; start()
+# only schedules their tasks, and the search indexer's final flush comes last
+@app.on_event("startup")
+async def _start_trending_koleksi():
+    trending_koleksi.start()
+
+@app.on_event("shutdown")
+async def _stop_trending_koleksi():
+    await trending_koleksi.stop()
+
+@app.on_event("startup")
+async def _start_view_ingestor():
+    view_ingestor.start()
+
+@app.on_event("shutdown")
+async def _stop_view_ingestor():
+    await view_ingestor.stop()
+
+@app.on_event("startup")
+async def _start_query_log():
+    query_log.start()
+
+@app.on_event("shutdown")
+async def _stop_query_log():
+    await query_log.stop()
+
+@app.on_event("startup")
+async def _start_suggestions():
+    suggestion_service.start()
+
+@app.on_event("shutdown")
+async def _stop_suggestions():
+    await suggestion_service.stop()
+
+@app.on_event("startup")
+async def _start_search_indexer():
+    search_indexer.start()
+
+@app.on_event("shutdown")
+async def _stop_search_indexer():
+    await search_indexer.stop()
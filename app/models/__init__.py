@@ -1,15 +1,24 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Date, DECIMAL, JSON
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, DateTime, Boolean, LargeBinary, ForeignKey, Enum, Date, DECIMAL, JSON, Computed, Index, DDL, event
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geometry
+
+from app.search.profile import search_vector_sql
 import enum
 from uuid import uuid4
 
 Base = declarative_base()
 
+# Trigram indexes (gin_trgm_ops) back substring and fuzzy name matching
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+def trigram_index(name: str, column: str) -> Index:
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+
 # Enums
 class TipeTamanEnum(enum.Enum):
     kehati_instansi = "kehati_instansi"
@@ -106,6 +115,7 @@ class User(Base):
     role = Column(Enum(UserRoleEnum), nullable=False, default=UserRoleEnum.viewer)
     is_active = Column(Boolean, default=True)
     taman_kehati_id = Column(Integer, ForeignKey("taman_kehati.id"))
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped to revoke issued tokens
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -253,6 +263,18 @@ class KoleksiTumbuhan(Base):
     asalProvinsi = relationship("Provinsi", foreign_keys=[asal_provinsi_id])
     createdByUser = relationship("User", foreign_keys=[created_by])
     updatedByUser = relationship("User", foreign_keys=[updated_by])
+    
+    # Every column the list endpoint's `q`/`genus`/`spesies` filters match,
+    # so ILIKE '%...%' and fuzzy matching never fall back to a seq scan
+    __table_args__ = (
+        trigram_index("ix_koleksi_tumbuhan_nama_ilmiah_trgm", "nama_ilmiah"),
+        trigram_index("ix_koleksi_tumbuhan_nama_umum_nasional_trgm", "nama_umum_nasional"),
+        trigram_index("ix_koleksi_tumbuhan_nama_lokal_daerah_trgm", "nama_lokal_daerah"),
+        trigram_index("ix_koleksi_tumbuhan_genus_trgm", "genus"),
+        trigram_index("ix_koleksi_tumbuhan_spesies_trgm", "spesies"),
+        trigram_index("ix_koleksi_tumbuhan_bentuk_pohon_trgm", "bentuk_pohon"),
+        trigram_index("ix_koleksi_tumbuhan_bentuk_daun_trgm", "bentuk_daun"),
+    )
 
 # Media model
 class Media(Base):
@@ -302,10 +324,13 @@ class Artikel(Base):
     author = relationship("User", foreign_keys=[author_id])
 
 # Page Views model
+# Range-partitioned by month on created_at; partitions are created and
+# retired by app/services/page_view_partitions.py
 class PageViews(Base):
     __tablename__ = "page_views"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # The partition key must be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     taman_kehati_id = Column(Integer, ForeignKey("taman_kehati.id"))
     koleksi_tumbuhan_id = Column(Integer, ForeignKey("koleksi_tumbuhan.id"))
     page_type = Column(String(50), nullable=False)
@@ -313,7 +338,66 @@ class PageViews(Base):
     user_agent = Column(Text)
     referrer = Column(Text)
     session_id = Column(String(100))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_page_views_taman_created", "taman_kehati_id", "created_at"),
+        Index("ix_page_views_koleksi_created", "koleksi_tumbuhan_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+# Page view rollups: views per entity and page_type, in UTC hour and day
+# buckets. Maintained with every page_views insert (app/services/view_rollups.py)
+class PageViewRollupHourly(Base):
+    __tablename__ = "page_view_rollup_hourly"
+    
+    entity_type = Column(String(20), primary_key=True)  # taman, koleksi, artikel
+    entity_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    page_type = Column(String(50), primary_key=True)
+    views = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_page_view_rollup_hourly_type_bucket", "entity_type", "bucket"),
+    )
+
+class PageViewRollupDaily(Base):
+    __tablename__ = "page_view_rollup_daily"
+    
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    page_type = Column(String(50), primary_key=True)
+    views = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_page_view_rollup_daily_type_bucket", "entity_type", "bucket"),
+    )
+
+# Unique visitors per entity and UTC day as a HyperLogLog sketch
+# (app/utils/hyperloglog.py), maintained by app/services/view_uniques.py
+class PageViewUniqueDaily(Base):
+    __tablename__ = "page_view_unique_daily"
+    
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    day = Column(DateTime(timezone=True), primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+# Per-worker Space-Saving counts of koleksi views per taman (0 = all) and
+# time slot, exchanged between workers by app/services/trending.py
+class TrendingSketch(Base):
+    __tablename__ = "trending_sketches"
+    
+    worker_id = Column(String(100), primary_key=True)
+    scope = Column(Integer, primary_key=True)
+    slot = Column(DateTime(timezone=True), primary_key=True)
+    counts = Column(JSONB, nullable=False)  # {koleksi id: views}
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_trending_sketches_updated_at", "updated_at"),
+    )
 
 # Audit Log model
 class AuditLog(Base):
@@ -335,8 +419,77 @@ class SearchIndex(Base):
     __tablename__ = "search_index"
     
     id = Column(Integer, primary_key=True, index=True)
-    taman_kehati_id = Column(Integer, ForeignKey("taman_kehati.id"))
-    koleksi_tumbuhan_id = Column(Integer, ForeignKey("koleksi_tumbuhan.id"))
-    searchable_text = Column(Text, nullable=False)
-    entity_type = Column(String(20), nullable=False)  # 'taman' or 'koleksi'
-    updated_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    # One row per entity; rows follow their entity out on delete
+    taman_kehati_id = Column(Integer, ForeignKey("taman_kehati.id", ondelete="CASCADE"))
+    koleksi_tumbuhan_id = Column(Integer, ForeignKey("koleksi_tumbuhan.id", ondelete="CASCADE"))
+    artikel_id = Column(Integer, ForeignKey("artikel.id", ondelete="CASCADE"))
+    title_text = Column(Text)  # nama_resmi / nama_ilmiah, weight A
+    subtitle_text = Column(Text)  # common names, address, weight B
+    searchable_text = Column(Text, nullable=False)  # descriptive text, weight C
+    entity_type = Column(String(20), nullable=False)  # 'taman', 'koleksi' or 'artikel'
+    is_published = Column(Boolean, nullable=False, default=False, server_default="false")
+    # Facet keys: the taman itself, or the taman a koleksi/artikel belongs to
+    facet_taman_id = Column(Integer)
+    status_endemik = Column(String(20))  # koleksi only
+    # taman koordinat / koleksi koordinat_taman, for spatial search; NULL for artikel
+    lokasi = Column(Geometry("POINT", srid=4326, spatial_index=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Maintained by PostgreSQL on every insert/update so searches never call
+    # to_tsvector per row; per-field configurations come from the search
+    # profile (app/search/profile.py)
+    search_vector = Column(TSVECTOR, Computed(search_vector_sql(), persisted=True))
+    
+    __table_args__ = (
+        Index("ix_search_index_search_vector", "search_vector", postgresql_using="gin"),
+        # Conflict targets for incremental upserts (app/search/indexing.py)
+        Index("uq_search_index_taman_kehati_id", "taman_kehati_id", unique=True),
+        Index("uq_search_index_koleksi_tumbuhan_id", "koleksi_tumbuhan_id", unique=True),
+        Index("uq_search_index_artikel_id", "artikel_id", unique=True),
+        # Fuzzy (mode=fuzzy) search on names
+        trigram_index("ix_search_index_title_text_trgm", "title_text"),
+        trigram_index("ix_search_index_subtitle_text_trgm", "subtitle_text"),
+    )
+
+# Single row counting search_index writes, so every worker's search cache can
+# tell when any worker changed the index (app/services/search_cache.py)
+class SearchIndexGeneration(Base):
+    __tablename__ = "search_index_generation"
+    
+    id = Column(Integer, primary_key=True)  # always 1
+    generation = Column(BigInteger, nullable=False)
+
+# Entities touched by each recent search_index generation, replayed by the
+# other workers' search indexers (entity_type '*': full reindex)
+class SearchIndexChange(Base):
+    __tablename__ = "search_index_changes"
+    
+    generation = Column(BigInteger, primary_key=True)
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+
+# Search query log, written in batches by app/services/query_log.py
+class SearchQueryLog(Base):
+    __tablename__ = "search_query_log"
+    
+    id = Column(BigInteger, primary_key=True)
+    endpoint = Column(String(10), nullable=False)  # 'search' or 'suggest'
+    query = Column(Text, nullable=False)  # normalized: lower case, single spaces
+    entity = Column(String(20))
+    result_count = Column(Integer, nullable=False)
+    latency_ms = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# Per-query aggregate of search_query_log over the recent window, rebuilt periodically
+class SearchQueryStats(Base):
+    __tablename__ = "search_query_stats"
+    
+    endpoint = Column(String(10), primary_key=True)
+    query = Column(Text, primary_key=True)
+    searches = Column(Integer, nullable=False)
+    zero_results = Column(Integer, nullable=False)
+    avg_latency_ms = Column(Float, nullable=False)
+    last_searched_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        Index("ix_search_query_stats_zero_results", "zero_results"),
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Union
+from typing import Dict, Optional, List, Union
 from datetime import datetime
 from enum import Enum
 
@@ -11,6 +11,11 @@ class SearchEntityEnum(str, Enum):
     taman = "taman"
 
 
+class SearchModeEnum(str, Enum):
+    fulltext = "fulltext"
+    fuzzy = "fuzzy"  # trigram similarity on names, tolerates misspellings
+
+
 class SearchBase(BaseModel):
     q: str
     entity: Optional[SearchEntityEnum] = None
@@ -23,6 +28,13 @@ class SearchResult(BaseModel):
     title: str
     snippet: str
     score: float
+    distance_m: Optional[float] = None  # lat/lng/radius_m searches only
+
+
+class FacetBucket(BaseModel):
+    value: str
+    label: Optional[str] = None  # taman / provinsi name
+    count: int
 
 
 class SearchResponse(BaseModel):
@@ -30,6 +42,9 @@ class SearchResponse(BaseModel):
     entity: Optional[SearchEntityEnum]
     total: int
     results: List[SearchResult]
+    next_cursor: Optional[str] = None  # pass as `cursor` to fetch the next page
+    facets: Optional[Dict[str, List[FacetBucket]]] = None  # only when `facets` is requested
+    facets_estimated: bool = False  # counts scaled up from a sample of the matches
 
 
 class SuggestBase(BaseModel):
@@ -37,4 +52,11 @@ class SuggestBase(BaseModel):
 
 
 class SuggestResponse(BaseModel):
-    suggestions: List[str]
\ No newline at end of file
+    suggestions: List[str]
+
+
+class ZeroResultQuery(BaseModel):
+    query: str
+    searches: int
+    zero_results: int
+    last_searched_at: datetime
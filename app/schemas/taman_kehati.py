@@ -165,4 +165,8 @@ class TamanKehatiStatsResponse(BaseModel):
     koleksi_count: int
     artikel_count: int
     views_7d: int
-    views_30d: int
\ No newline at end of file
+    views_30d: int
+
+
+class TamanKehatiBatchStatsResponse(TamanKehatiStatsResponse):
+    taman_kehati_id: int
@@ -1,23 +1,33 @@
 from enum import Enum
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
+# Largest value of an integer id column
+MAX_ID = 2**31 - 1
 
+
+# Limits match the page_views columns, so a queued event cannot fail the
+# batch INSERT it shares with other clients' views
 class ViewTrackBase(BaseModel):
-    page_type: str
-    taman_kehati_id: Optional[int] = None
-    koleksi_tumbuhan_id: Optional[int] = None
+    page_type: str = Field(..., min_length=1, max_length=50)
+    taman_kehati_id: Optional[int] = Field(None, ge=1, le=MAX_ID)
+    koleksi_tumbuhan_id: Optional[int] = Field(None, ge=1, le=MAX_ID)
     referrer: Optional[str] = None
     user_agent: Optional[str] = None
-    session_id: Optional[str] = None
-    ip_address: Optional[str] = None
+    session_id: Optional[str] = Field(None, max_length=100)
+    ip_address: Optional[str] = Field(None, max_length=45)
 
 
 class ViewTrackCreate(ViewTrackBase):
     pass
 
 
+class ViewTrackBatchResponse(BaseModel):
+    accepted: int
+    rejected: int  # invalid events and events dropped because the ingestion queue was full
+
+
 class ViewSeriesRangeEnum(str, Enum):
     d7 = "7d"
     d30 = "30d"
@@ -64,4 +74,10 @@ class TopView(BaseModel):
 
 
 class TopViewsResponse(BaseModel):
-    results: List[TopView]
\ No newline at end of file
+    results: List[TopView]
+
+
+class TrendingResponse(BaseModel):
+    results: List[TopView]
+    window_seconds: int
+    refreshed_at: Optional[datetime] = None
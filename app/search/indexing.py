@@ -0,0 +1,165 @@
+"""
+SQL that projects taman, koleksi and artikel rows into search_index.
+
+Each entity source names its table, the expressions indexed as title
+(weight A), subtitle (weight B) and descriptive text (weight C), and whether
+the row is publicly visible, plus the facet keys (owning taman, endemic
+status) used by faceted search and the point used by spatial search. The same
+projection serves incremental upserts of a few ids and full rebuilds, so both
+paths always index the same columns.
+"""
+from typing import Dict, Iterable, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ENTITY_SOURCES: Dict[str, Dict[str, str]] = {
+    "taman": {
+        "table": "taman_kehati",
+        "id_column": "taman_kehati_id",
+        "title": "nama_resmi",
+        "subtitle": "alamat",
+        "text": "COALESCE(deskripsi, '')",
+        "published": "status = 'published'",
+        "taman": "id",
+        "endemik": "NULL",
+        "location": "koordinat",
+    },
+    "koleksi": {
+        "table": "koleksi_tumbuhan",
+        "id_column": "koleksi_tumbuhan_id",
+        "title": "nama_ilmiah",
+        "subtitle": "CONCAT_WS(' ', nama_umum_nasional, nama_lokal_daerah)",
+        "text": """CONCAT_WS(' ',
+                COALESCE(bentuk_pohon, ''),
+                COALESCE(bentuk_daun, ''),
+                COALESCE(bentuk_bunga, ''),
+                COALESCE(bentuk_buah, '')
+            )""",
+        "published": "status = 'published'",
+        "taman": "taman_kehati_id",
+        "endemik": "CAST(status_endemik AS text)",
+        "location": "koordinat_taman",
+    },
+    "artikel": {
+        "table": "artikel",
+        "id_column": "artikel_id",
+        "title": "judul",
+        "subtitle": "ringkasan",
+        "text": "konten",
+        "published": "status = 'published'",
+        "taman": "taman_kehati_id",
+        "endemik": "NULL",
+        "location": "CAST(NULL AS geometry)",
+    },
+}
+
+INDEXED_COLUMNS = (
+    "title_text", "subtitle_text", "searchable_text", "is_published",
+    "facet_taman_id", "status_endemik", "lokasi", "entity_type", "updated_at"
+)
+
+
+def _projection_sql(entity_type: str) -> str:
+    source = ENTITY_SOURCES[entity_type]
+    return f"""
+        SELECT
+            id,
+            {source["title"]},
+            {source["subtitle"]},
+            {source["text"]},
+            {source["published"]},
+            {source["taman"]},
+            {source["endemik"]},
+            {source["location"]},
+            '{entity_type}',
+            now()
+        FROM {source["table"]}
+    """
+
+
+def upsert_sql(entity_type: str, where: str = "", table: str = "search_index") -> str:
+    """INSERT ... ON CONFLICT statement indexing the entity rows matched by ``where``"""
+    id_column = ENTITY_SOURCES[entity_type]["id_column"]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in INDEXED_COLUMNS)
+    return f"""
+        INSERT INTO {table} ({id_column}, {", ".join(INDEXED_COLUMNS)})
+        {_projection_sql(entity_type)}
+        {where}
+        ON CONFLICT ({id_column}) DO UPDATE SET {updates}
+    """
+
+
+def insert_chunk_sql(entity_type: str, table: str) -> str:
+    """Plain insert of the next :limit entities with id > :after_id, returning the ids copied"""
+    id_column = ENTITY_SOURCES[entity_type]["id_column"]
+    return f"""
+        INSERT INTO {table} ({id_column}, {", ".join(INDEXED_COLUMNS)})
+        {_projection_sql(entity_type)}
+        WHERE id > :after_id
+        ORDER BY id
+        LIMIT :limit
+        RETURNING {id_column}
+    """
+
+
+def delete_missing_sql(entity_type: str, table: str = "search_index", only_ids: bool = True) -> str:
+    """Remove index rows whose entity no longer exists, limited to :ids unless only_ids is False"""
+    source = ENTITY_SOURCES[entity_type]
+    id_filter = f"{source['id_column']} = ANY(:ids)" if only_ids else f"{source['id_column']} IS NOT NULL"
+    return f"""
+        DELETE FROM {table}
+        WHERE {id_filter}
+        AND NOT EXISTS (
+            SELECT 1 FROM {source["table"]} WHERE {source["table"]}.id = {table}.{source["id_column"]}
+        )
+    """
+
+
+# Every write to search_index bumps the generation and records the entities it
+# touched under it, so other workers can replay the change
+# (SearchIndexer.poll). A full reindex records ALL_ENTITIES.
+ALL_ENTITIES = "*"
+# Generations whose entity ids are kept for replay
+KEEP_CHANGE_GENERATIONS = 1000
+BUMP_GENERATION_SQL = """
+    INSERT INTO search_index_generation (id, generation) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE SET generation = search_index_generation.generation + 1
+    RETURNING generation
+"""
+INSERT_CHANGES_SQL = """
+    INSERT INTO search_index_changes (generation, entity_type, entity_id)
+    VALUES (:generation, :entity_type, :entity_id)
+"""
+PRUNE_CHANGES_SQL = "DELETE FROM search_index_changes WHERE generation <= :generation - :keep"
+GENERATION_SQL = "SELECT generation FROM search_index_generation WHERE id = 1"
+CHANGES_SQL = """
+    SELECT generation, entity_type, entity_id FROM search_index_changes
+    WHERE generation > :after AND generation <= :upto
+"""
+
+
+async def bump_generation(db, changes: Dict[str, Iterable[int]]) -> int:
+    """
+    Record a change to search_index and the (entity type -> ids) it touched,
+    in the caller's transaction; returns the new generation
+    """
+    generation = (await db.execute(text(BUMP_GENERATION_SQL))).scalar_one()
+    rows = [
+        {"generation": generation, "entity_type": entity_type, "entity_id": entity_id}
+        for entity_type, ids in changes.items() for entity_id in sorted(set(ids))
+    ]
+    if rows:
+        await db.execute(text(INSERT_CHANGES_SQL), rows)
+    await db.execute(text(PRUNE_CHANGES_SQL), {"generation": generation, "keep": KEEP_CHANGE_GENERATIONS})
+    return generation
+
+
+async def index_entities(db: AsyncSession, entity_type: str, ids: Iterable[int]) -> int:
+    """Upsert the given entities into search_index and drop the deleted ones; caller commits"""
+    ids: List[int] = sorted(set(ids))
+    if not ids:
+        return 0
+    await db.execute(text(upsert_sql(entity_type, "WHERE id = ANY(:ids)")), {"ids": ids})
+    await db.execute(text(delete_missing_sql(entity_type)), {"ids": ids})
+    return len(ids)
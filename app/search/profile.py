@@ -0,0 +1,53 @@
+"""
+Search profile: which text search configuration and weight each
+search_index field is indexed with.
+
+Scientific names are Latin and vernacular names come from regional
+languages, so the Indonesian stemmer mangles them ("oldhamii" becomes
+"oldhami"); descriptions are Indonesian and need it. Each field is therefore
+indexed with its own configuration, titles under both so Latin binomials and
+Indonesian park and article titles both match exactly. A query is parsed
+with every configuration in the profile and the results are ORed, so it
+matches whichever way a field was indexed.
+
+The profile generates the stored search_vector expression, so changing a
+field's configuration or label requires regenerating that column (see
+POST /api/search/reindex). Rank weights are applied at query time only.
+"""
+from typing import NamedTuple, Tuple
+
+
+class SearchField(NamedTuple):
+    column: str
+    config: str  # PostgreSQL text search configuration
+    label: str  # tsvector weight label, 'A' (highest) to 'D'
+
+
+SEARCH_PROFILE: Tuple[SearchField, ...] = (
+    SearchField("title_text", "simple", "A"),  # nama_ilmiah, nama_resmi, judul
+    SearchField("title_text", "indonesian", "A"),
+    SearchField("subtitle_text", "simple", "B"),  # vernacular names, address, ringkasan
+    SearchField("searchable_text", "indonesian", "C"),  # descriptions
+)
+
+# ts_rank weight of each label, {D, C, B, A}
+RANK_WEIGHTS = {"D": 0.1, "C": 0.2, "B": 0.4, "A": 1.0}
+
+
+def search_vector_sql(profile: Tuple[SearchField, ...] = SEARCH_PROFILE) -> str:
+    """Expression of the stored search_vector column"""
+    return " || ".join(
+        f"setweight(to_tsvector('{field.config}'::regconfig, coalesce({field.column}, '')), '{field.label}')"
+        for field in profile
+    )
+
+
+def tsquery_sql(param: str = ":query", profile: Tuple[SearchField, ...] = SEARCH_PROFILE) -> str:
+    """A websearch-syntax query parsed with every configuration of the profile, ORed"""
+    configs = dict.fromkeys(field.config for field in profile)
+    return "(" + " || ".join(f"websearch_to_tsquery('{config}', {param})" for config in configs) + ")"
+
+
+def rank_weights_sql() -> str:
+    """ts_rank weights array literal"""
+    return "'{" + ", ".join(str(RANK_WEIGHTS[label]) for label in "DCBA") + "}'::float4[]"
@@ -0,0 +1,352 @@
+"""
+Unified search over search_index.
+
+Taman, koleksi and artikel are ranked together in one statement, so scores
+are comparable across entity types. Pages are keyset-paginated on
+(score DESC, search_index.id ASC); the opaque cursor carries the last row's
+score and row id. Full-text queries are parsed and ranked per the search
+profile (app/search/profile.py).
+
+mode="fuzzy" matches names by trigram word similarity instead of full-text
+search, so misspelt scientific names ("Shorea leprosulla") still match.
+The score is then the best word_similarity against title or subtitle.
+
+Matching and ranking only carry row ids and scores; display columns and the
+optional ts_headline snippet are read for the returned page alone, so their
+cost does not grow with the number of matches.
+
+Facet counts are aggregated from the same match set with GROUPING SETS. When
+more rows match than the facet sample size, a random sample of them is
+aggregated and the counts are scaled up and flagged as estimated.
+
+Spatial filters (a radius around a point, or a bounding box) apply to
+search_index.lokasi. The GiST index narrows candidates with a bounding-box
+`&&` test, which the planner can combine with the text index; radius
+searches then check the exact distance on the spheroid and blend it into
+the score, so nearer matches rank higher.
+
+Callers who may not see exact locations get a ``precision_m``: their radius
+and bbox must be at least that large and are snapped to a grid of about that
+size, and the distance is rounded to it before it is blended into the score.
+Neither the score, the cursor nor the match set then reveal a location more
+precisely than the rounded distance_m does.
+"""
+import base64
+import json
+import math
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.search.profile import rank_weights_sql, tsquery_sql
+
+ENTITY_TYPES = ("taman", "koleksi", "artikel")
+SEARCH_MODES = ("fulltext", "fuzzy")
+
+# (source, filter, score) per mode. `%>` is pg_trgm's word-similarity
+# operator, served by the trigram indexes on title_text and subtitle_text.
+MODE_SQL = {
+    "fulltext": (
+        f"search_index CROSS JOIN (SELECT {tsquery_sql()} AS query) AS parsed",
+        "search_index.search_vector @@ query",
+        f"ts_rank({rank_weights_sql()}, search_index.search_vector, query)",
+    ),
+    "fuzzy": (
+        "search_index",
+        "(search_index.title_text %> :query OR search_index.subtitle_text %> :query)",
+        "GREATEST(word_similarity(:query, search_index.title_text), "
+        "word_similarity(:query, coalesce(search_index.subtitle_text, '')))",
+    ),
+}
+
+# Facet name -> (value column, label column) of the facet_rows CTE
+FACETS = {
+    "entity_type": ("entity_type", None),
+    "taman": ("taman", "taman_label"),
+    "provinsi": ("provinsi", "provinsi_label"),
+    "status_endemik": ("status_endemik", None),
+}
+# Buckets returned per facet, largest first
+FACET_MAX_BUCKETS = 20
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidFacet(ValueError):
+    pass
+
+
+class InvalidGeoFilter(ValueError):
+    pass
+
+
+class Near(NamedTuple):
+    lat: float
+    lng: float
+    radius_m: float
+
+
+class BBox(NamedTuple):
+    min_lng: float
+    min_lat: float
+    max_lng: float
+    max_lat: float
+
+
+# Largest radius accepted for spatial search
+MAX_RADIUS_M = 500_000
+# Share of the score given to proximity: a match at the edge of the radius
+# keeps 1 - DISTANCE_WEIGHT of its text score
+DISTANCE_WEIGHT = 0.5
+_M_PER_DEG = 111_320.0
+# Spatial precision for callers who may not see exact koleksi locations
+PUBLIC_DISTANCE_PRECISION_M = 1000
+POINT_SQL = "ST_SetSRID(ST_MakePoint(:near_lng, :near_lat), 4326)"
+
+
+def parse_geo_filter(
+    lat: Optional[float], lng: Optional[float], radius_m: Optional[float], bbox: Optional[str],
+    precision_m: float = 0
+) -> Union[Near, BBox, None]:
+    """
+    Validate the spatial query parameters; at most one of radius and bbox.
+    With ``precision_m`` the filter is coarsened as described above.
+    """
+    if lat is None and lng is None and radius_m is None:
+        if not bbox:
+            return None
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(part) for part in bbox.split(","))
+        except ValueError:
+            raise InvalidGeoFilter("bbox must be min_lng,min_lat,max_lng,max_lat")
+        if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+            raise InvalidGeoFilter("bbox is out of range or empty")
+        geo = BBox(min_lng, min_lat, max_lng, max_lat)
+        if precision_m:
+            lng_scale = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+            if min((max_lat - min_lat), (max_lng - min_lng) * lng_scale) * _M_PER_DEG < precision_m:
+                raise InvalidGeoFilter(f"bbox must span at least {precision_m:g} m each way")
+            return _coarsen(geo, precision_m)
+        return geo
+    if bbox:
+        raise InvalidGeoFilter("Use either lat/lng/radius_m or bbox, not both")
+    if lat is None or lng is None or radius_m is None:
+        raise InvalidGeoFilter("lat, lng and radius_m are required together")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise InvalidGeoFilter("lat/lng out of range")
+    if not 0 < radius_m <= MAX_RADIUS_M:
+        raise InvalidGeoFilter(f"radius_m must be between 0 and {MAX_RADIUS_M}")
+    if radius_m < precision_m:
+        raise InvalidGeoFilter(f"radius_m must be at least {precision_m:g}")
+    geo = Near(lat, lng, radius_m)
+    return _coarsen(geo, precision_m) if precision_m else geo
+
+
+def _coarsen(geo: Union[Near, BBox], precision_m: float) -> Union[Near, BBox]:
+    """Snap a spatial filter to a grid of about ``precision_m``; boxes only grow"""
+    step = precision_m / _M_PER_DEG
+    if isinstance(geo, Near):
+        return Near(
+            lat=max(-90.0, min(90.0, round(geo.lat / step) * step)),
+            lng=max(-180.0, min(180.0, round(geo.lng / step) * step)),
+            radius_m=min(math.ceil(geo.radius_m / precision_m) * precision_m, MAX_RADIUS_M),
+        )
+    return BBox(
+        min_lng=max(-180.0, math.floor(geo.min_lng / step) * step),
+        min_lat=max(-90.0, math.floor(geo.min_lat / step) * step),
+        max_lng=min(180.0, math.ceil(geo.max_lng / step) * step),
+        max_lat=min(90.0, math.ceil(geo.max_lat / step) * step),
+    )
+
+
+def encode_cursor(score: float, row_id: int) -> str:
+    payload = json.dumps([score, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(score), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid search cursor")
+
+
+def parse_facets(value: Optional[str]) -> Tuple[str, ...]:
+    """Comma-separated facet names from the ``facets`` query parameter"""
+    names = tuple(dict.fromkeys(name.strip() for name in (value or "").split(",") if name.strip()))
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise InvalidFacet(f"Unknown facets: {', '.join(unknown)}. Available: {', '.join(FACETS)}")
+    return names
+
+
+def _facet_sql(facets: Sequence[str]) -> str:
+    """CTEs sampling the match set and counting every requested facet in one GROUP BY"""
+    grouping_sets, facet_names, values, labels = [], [], [], []
+    for name in facets:
+        column, label = FACETS[name]
+        grouping_sets.append(f"({column}, {label})" if label else f"({column})")
+        facet_names.append(f"WHEN GROUPING({column}) = 0 THEN '{name}'")
+        values.append(f"WHEN GROUPING({column}) = 0 THEN CAST({column} AS text)")
+        labels.append(f"WHEN GROUPING({column}) = 0 THEN {label or 'NULL'}")
+    return f""",
+        facet_rows AS (
+            SELECT
+                matches.entity_type,
+                matches.facet_taman_id AS taman,
+                taman_kehati.nama_resmi AS taman_label,
+                taman_kehati.provinsi_id AS provinsi,
+                provinsi.nama AS provinsi_label,
+                matches.status_endemik
+            -- Uniform sample, via a top-N heap rather than a full sort
+            FROM (SELECT * FROM matches ORDER BY random() LIMIT :facet_sample_size) AS matches
+            LEFT JOIN taman_kehati ON taman_kehati.id = matches.facet_taman_id
+            LEFT JOIN provinsi ON provinsi.id = taman_kehati.provinsi_id
+        ),
+        facet_counts AS (
+            SELECT
+                CASE {" ".join(facet_names)} END AS facet,
+                CASE {" ".join(values)} END AS value,
+                CASE {" ".join(labels)} END AS label,
+                count(*) AS count
+            FROM facet_rows
+            GROUP BY GROUPING SETS ({", ".join(grouping_sets)}, ())
+        )"""
+
+
+def collect_facets(rows: Optional[List[Dict[str, Any]]], total: int) -> Tuple[Dict[str, List[Dict[str, Any]]], bool]:
+    """
+    Buckets per facet from the facet_counts rows, and whether the counts are
+    estimates scaled up from a sample of the matches.
+    """
+    rows = rows or []
+    sampled = next((row["count"] for row in rows if row["facet"] is None), total)
+    estimated = 0 < sampled < total
+    facets: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if row["facet"] is None or row["value"] is None:
+            continue
+        count = round(row["count"] * total / sampled) if estimated else row["count"]
+        facets.setdefault(row["facet"], []).append({"value": row["value"], "label": row["label"], "count": count})
+    for name, buckets in facets.items():
+        buckets.sort(key=lambda bucket: (-bucket["count"], bucket["value"]))
+        del buckets[FACET_MAX_BUCKETS:]
+    return facets, estimated
+
+
+# Highlighted snippets: at most two short fragments, computed over a bounded
+# prefix of the text so every returned row costs about the same
+HEADLINE_OPTIONS = (
+    "MaxFragments=2, MaxWords=15, MinWords=5, FragmentDelimiter=\" ... \", "
+    "StartSel=<mark>, StopSel=</mark>"
+)
+HEADLINE_MAX_CHARS = 5000
+# Stored text is HTML-escaped before <mark> tags are added around matches
+ESCAPED_TEXT_SQL = (
+    "replace(replace(replace(left(concat_ws(' ', source.subtitle_text, source.searchable_text), {max_chars}), "
+    "'&', '&amp;'), '<', '&lt;'), '>', '&gt;')"
+).format(max_chars=HEADLINE_MAX_CHARS)
+
+
+def build_search_query(
+    q: str, entity: str, limit: int, cursor: Optional[str] = None, mode: str = "fulltext",
+    highlight: bool = False, facets: Sequence[str] = (), facet_sample_size: int = 10000,
+    geo: Union[Near, BBox, None] = None, precision_m: float = 0
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL and parameters for one page of results. Every row carries the total
+    match count; an empty page comes back as a single row with NULL columns.
+    One row beyond ``limit`` is fetched to tell whether another page exists.
+    With ``highlight`` the snippet is a ts_headline excerpt marking the
+    matched terms with <mark>; otherwise the first 101 characters.
+    With ``facets`` the first row also carries the facet_counts rows as JSON
+    (see collect_facets). With a ``Near`` filter rows carry distance_m,
+    rounded to ``precision_m`` before it enters the score when that is set.
+    """
+    source, match_filter, score = MODE_SQL[mode]
+    params: Dict[str, Any] = {"query": q, "limit": limit + 1}
+    filters = [match_filter, "search_index.is_published"]
+    if entity in ENTITY_TYPES:
+        filters.append("search_index.entity_type = :entity")
+        params["entity"] = entity
+
+    distance_column = ""
+    if isinstance(geo, Near):
+        # Index-assisted box around the circle, widened for longitude at this latitude
+        params.update(near_lat=geo.lat, near_lng=geo.lng, radius_m=geo.radius_m)
+        params["expand_lat"] = geo.radius_m / _M_PER_DEG
+        params["expand_lng"] = geo.radius_m / (_M_PER_DEG * max(math.cos(math.radians(geo.lat)), 0.01))
+        filters.append(f"search_index.lokasi && ST_Expand({POINT_SQL}, :expand_lng, :expand_lat)")
+        point = f"CAST({POINT_SQL} AS geography)"
+        filters.append(f"ST_DWithin(CAST(search_index.lokasi AS geography), {point}, :radius_m)")
+        distance = f"ST_Distance(CAST(search_index.lokasi AS geography), {point})"
+        if precision_m:
+            params["distance_precision_m"] = precision_m
+            distance = f"(round({distance} / :distance_precision_m) * :distance_precision_m)"
+        score = f"({score}) * (1 - {DISTANCE_WEIGHT} * {distance} / :radius_m)"
+        distance_column = f", {distance} AS distance_m"
+    elif isinstance(geo, BBox):
+        params.update(geo._asdict())
+        filters.append("search_index.lokasi && ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)")
+
+    page_filter = ""
+    if cursor:
+        params["cursor_score"], params["cursor_id"] = decode_cursor(cursor)
+        page_filter = "WHERE score < :cursor_score OR (score = :cursor_score AND row_id > :cursor_id)"
+
+    if highlight:
+        params["headline_options"] = HEADLINE_OPTIONS
+        snippet = (
+            f"ts_headline('indonesian', {ESCAPED_TEXT_SQL}, {tsquery_sql()}, :headline_options)"
+        )
+    else:
+        snippet = "left(COALESCE(NULLIF(source.subtitle_text, ''), source.searchable_text), 101)"
+
+    facet_columns = facet_ctes = ""
+    facet_select = "NULL AS facets"
+    facet_join = ""
+    if facets:
+        params["facet_sample_size"] = facet_sample_size
+        facet_columns = ", search_index.entity_type, search_index.facet_taman_id, search_index.status_endemik"
+        facet_ctes = _facet_sql(facets)
+        # Sent once, on the first row, rather than repeated on every row
+        facet_select = (
+            "CASE WHEN row_number() OVER (ORDER BY page.score DESC, page.row_id) = 1 "
+            "THEN facet_json.facets END AS facets"
+        )
+        facet_join = "CROSS JOIN (SELECT json_agg(facet_counts) AS facets FROM facet_counts) AS facet_json"
+
+    sql = f"""
+        WITH matches AS (
+            SELECT search_index.id AS row_id, CAST({score} AS float8) AS score{distance_column}{facet_columns}
+            FROM {source}
+            WHERE {" AND ".join(filters)}
+        ),
+        totals AS (
+            SELECT count(*) AS total FROM matches
+        ){facet_ctes}
+        SELECT totals.total, {facet_select}, page.*
+        FROM totals
+        {facet_join}
+        LEFT JOIN LATERAL (
+            SELECT
+                top.row_id,
+                source.entity_type,
+                COALESCE(source.taman_kehati_id, source.koleksi_tumbuhan_id, source.artikel_id) AS id,
+                source.title_text AS title,
+                {snippet} AS snippet,
+                top.score{", top.distance_m" if distance_column else ""}
+            FROM (
+                SELECT row_id, score{", distance_m" if distance_column else ""}
+                FROM matches
+                {page_filter}
+                ORDER BY score DESC, row_id
+                LIMIT :limit
+            ) AS top
+            JOIN search_index AS source ON source.id = top.row_id
+        ) AS page ON true
+        ORDER BY page.score DESC, page.row_id
+    """
+    return sql, params
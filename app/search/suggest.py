@@ -0,0 +1,229 @@
+"""
+In-memory typeahead index over taman and koleksi names.
+
+Every name is stored once per word start in a sorted array, so both
+whole-name prefixes ("bambusa v") and word prefixes ("vulg" for "Bambusa
+vulgaris") are answered with a bisect. Infix queries ("ulgar") go through a
+trigram posting index. Matches rank by match kind, then popularity, then
+shorter names first.
+
+A SuggestIndex is immutable once built; SuggestEngine layers small
+incremental updates over it until the next full rebuild.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+MATCH_PREFIX = 0
+MATCH_WORD_PREFIX = 1
+MATCH_INFIX = 2
+
+# Upper bound on candidates examined per query
+MAX_CANDIDATES = 5000
+# Queries this short match too many names to scan per keystroke; their best
+# candidates are ranked once at build time instead
+SHORT_PREFIX_LENGTH = 2
+SHORT_PREFIX_KEEP = 50
+
+
+class Entry(NamedTuple):
+    text: str
+    entity_type: str
+    entity_id: int
+    popularity: float
+    # Column the name came from, e.g. "nama_ilmiah"
+    field: Optional[str] = None
+
+
+def normalize(value: str) -> str:
+    """Case- and accent-insensitive form used for matching"""
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", value.casefold()).strip()
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _word_starts(value: str) -> List[int]:
+    return [0] + [match.end() for match in re.finditer(r"[\s\-/(]+", value) if match.end() < len(value)]
+
+
+class SuggestIndex:
+    """Immutable sorted-array and trigram index over suggestion entries"""
+
+    def __init__(self, entries: Iterable[Entry]):
+        self.entries: List[Entry] = [entry for entry in entries if entry.text and entry.text.strip()]
+        self.normalized: List[str] = [normalize(entry.text) for entry in self.entries]
+
+        keyed: List[Tuple[str, int, int]] = []
+        for position, value in enumerate(self.normalized):
+            for start in _word_starts(value):
+                keyed.append((value[start:], position, MATCH_PREFIX if start == 0 else MATCH_WORD_PREFIX))
+        keyed.sort()
+        self._keys: List[str] = [key for key, _, _ in keyed]
+        self._key_entries: List[int] = [position for _, position, _ in keyed]
+        self._key_kinds: List[int] = [kind for _, _, kind in keyed]
+
+        short: Dict[str, Dict[int, int]] = {}
+        for key, position, kind in keyed:
+            for length in range(1, SHORT_PREFIX_LENGTH + 1):
+                if len(key) >= length:
+                    best = short.setdefault(key[:length], {})
+                    if kind < best.get(position, MATCH_INFIX + 1):
+                        best[position] = kind
+        self._short: Dict[str, Dict[int, int]] = {
+            prefix: dict(heapq.nsmallest(
+                SHORT_PREFIX_KEEP, found.items(), key=lambda item: (item[1],) + self._rank_key(item[0])
+            ))
+            for prefix, found in short.items()
+        }
+
+        postings: Dict[str, List[int]] = {}
+        for position, value in enumerate(self.normalized):
+            for trigram in _trigrams(value):
+                postings.setdefault(trigram, []).append(position)
+        self._trigrams: Dict[str, Tuple[int, ...]] = {trigram: tuple(ids) for trigram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _rank_key(self, position: int):
+        entry = self.entries[position]
+        return (-entry.popularity, len(entry.text), entry.text)
+
+    def candidates(self, query: str) -> Dict[int, int]:
+        """Entry position -> best match kind for a normalized query"""
+        if len(query) <= SHORT_PREFIX_LENGTH:
+            return self._short.get(query, {})
+        found: Dict[int, int] = {}
+        start = bisect_left(self._keys, query)
+        end = min(len(self._keys), start + MAX_CANDIDATES)
+        for index in range(start, end):
+            if not self._keys[index].startswith(query):
+                break
+            position = self._key_entries[index]
+            kind = self._key_kinds[index]
+            if kind < found.get(position, MATCH_INFIX + 1):
+                found[position] = kind
+
+        if len(query) >= 3:
+            postings = sorted((self._trigrams.get(trigram, ()) for trigram in _trigrams(query)), key=len)
+            if postings and postings[0]:
+                for position in postings[0][:MAX_CANDIDATES]:
+                    if position not in found and query in self.normalized[position]:
+                        found[position] = MATCH_INFIX
+        return found
+
+
+def match_kind(normalized_text: str, query: str) -> Optional[int]:
+    """Match kind of a single normalized name, for entries outside a SuggestIndex"""
+    for start in _word_starts(normalized_text):
+        if normalized_text.startswith(query, start):
+            return MATCH_PREFIX if start == 0 else MATCH_WORD_PREFIX
+    if len(query) >= 3 and query in normalized_text:
+        return MATCH_INFIX
+    return None
+
+
+def rank(matches: Iterable[Tuple[int, Entry, str]], limit: int) -> List[str]:
+    """Best ``limit`` distinct names from (match kind, entry, normalized text) triples"""
+    best = heapq.nsmallest(
+        limit * 4,
+        matches,
+        key=lambda item: (item[0], -item[1].popularity, len(item[1].text), item[1].text)
+    )
+    results: List[str] = []
+    seen: Set[str] = set()
+    for _, entry, key in best:
+        if key not in seen:
+            seen.add(key)
+            results.append(entry.text)
+            if len(results) == limit:
+                break
+    return results
+
+
+class SuggestEngine:
+    """
+    A SuggestIndex snapshot plus an overlay of entities changed since it was
+    built. Overlay entries replace every base entry of the same entity.
+    """
+
+    def __init__(self):
+        self.index: Optional[SuggestIndex] = None
+        self._overlay: Dict[Tuple[str, int], Tuple[int, List[Entry]]] = {}
+        self._version = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self._overlay)
+
+    @property
+    def version(self) -> int:
+        """Increases with every update_entity call"""
+        return self._version
+
+    def replace_index(self, index: SuggestIndex, built_from_version: Optional[int] = None):
+        """
+        Swap in a freshly built index. Overlay updates made after
+        ``built_from_version`` may be missing from it and are kept.
+        """
+        self.index = index
+        if built_from_version is None:
+            self._overlay = {}
+        else:
+            self._overlay = {
+                key: value for key, value in self._overlay.items() if value[0] > built_from_version
+            }
+
+    def update_entity(self, entity_type: str, entity_id: int, entries: Sequence[Entry]):
+        """Replace an entity's names; an empty sequence removes it"""
+        self._version += 1
+        self._overlay[(entity_type, entity_id)] = (self._version, list(entries))
+
+    def suggest(
+        self,
+        q: str,
+        limit: int = 10,
+        entity_types: Optional[Iterable[str]] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        query = normalize(q)
+        if not query or self.index is None:
+            return []
+        allowed_types = set(entity_types) if entity_types is not None else None
+        allowed_fields = set(fields) if fields is not None else None
+
+        def allowed(entry: Entry) -> bool:
+            return (
+                (allowed_types is None or entry.entity_type in allowed_types)
+                and (allowed_fields is None or entry.field in allowed_fields)
+            )
+
+        overlay = self._overlay
+
+        def matches():
+            for position, kind in self.index.candidates(query).items():
+                entry = self.index.entries[position]
+                if (entry.entity_type, entry.entity_id) in overlay:
+                    continue
+                if allowed(entry):
+                    yield kind, entry, self.index.normalized[position]
+            for _, entries in overlay.values():
+                for entry in entries:
+                    if not allowed(entry):
+                        continue
+                    normalized = normalize(entry.text)
+                    kind = match_kind(normalized, query)
+                    if kind is not None:
+                        yield kind, entry, normalized
+
+        return rank(matches(), limit)
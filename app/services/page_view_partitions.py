@@ -0,0 +1,178 @@
+"""
+Monthly partitions of page_views.
+
+page_views is range-partitioned on created_at, one partition per UTC month
+(page_views_pYYYYMM), so time-bounded queries only scan the months they
+cover and old data goes away by dropping whole partitions. The partition
+manager runs at startup and then every PAGE_VIEW_PARTITION_CHECK_SECONDS:
+it creates partitions from the current month to PAGE_VIEW_PARTITIONS_AHEAD
+months ahead, and detaches partitions older than
+PAGE_VIEW_RETENTION_MONTHS, dropping them or moving them to
+PAGE_VIEW_ARCHIVE_SCHEMA. Indexes declared on page_views are created on each
+new partition by PostgreSQL.
+
+The page-view rollups are not affected by retention, so dashboards keep
+their history after the raw views are gone.
+"""
+import asyncio
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal
+from app.settings import settings
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+PARENT_TABLE = "page_views"
+PARTITION_NAME = re.compile(r"^page_views_p(\d{4})(\d{2})$")
+# Advisory lock so only one worker manages partitions at a time
+PARTITION_LOCK_KEY = 7301003
+
+PARTITIONED_SQL = """
+    SELECT c.relkind = 'p'
+    FROM pg_class c
+    WHERE c.oid = to_regclass(:table)
+"""
+PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(:table)
+"""
+
+page_view_partitions_gauge = registry.gauge("page_view_partitions", "Monthly partitions attached to page_views")
+page_view_partitions_removed_total = registry.counter(
+    "page_view_partitions_removed_total", "page_views partitions removed by retention", ("action",)
+)
+
+
+def add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"page_views_p{year:04d}{month:02d}"
+
+
+def partition_ddl(year: int, month: int) -> str:
+    next_year, next_month = add_months(year, month, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(year, month)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{year:04d}-{month:02d}-01 00:00:00+00') TO ('{next_year:04d}-{next_month:02d}-01 00:00:00+00')"
+    )
+
+
+def expired_partitions(names: List[str], now: datetime, retention_months: int) -> List[str]:
+    """Partitions whose whole month lies more than ``retention_months`` before ``now``'s month"""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(now.year, now.month, -retention_months)
+    expired = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match and (int(match.group(1)), int(match.group(2))) < cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+def retention_start(now: datetime, retention_months: int) -> Optional[datetime]:
+    """Oldest moment page_views still holds under the retention policy, or None"""
+    if retention_months <= 0:
+        return None
+    year, month = add_months(now.year, now.month, -retention_months)
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+class PageViewPartitions:
+    """Creates upcoming page_views partitions and applies the retention policy"""
+
+    def __init__(
+        self,
+        session_factory,
+        months_ahead: int = 3,
+        retention_months: int = 24,
+        archive_schema: Optional[str] = None,
+        check_interval: float = 86400
+    ):
+        self.session_factory = session_factory
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.archive_schema = archive_schema
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def maintain(self, now: Optional[datetime] = None) -> bool:
+        """One maintenance pass; False if page_views is not partitioned or another worker holds the lock"""
+        now = now or datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            partitioned = await session.scalar(text(PARTITIONED_SQL), {"table": PARENT_TABLE})
+            if not partitioned:
+                logger.warning("page_views is not a partitioned table; skipping partition maintenance")
+                return False
+            locked = await session.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            if not locked:
+                return False
+
+            for offset in range(self.months_ahead + 1):
+                await session.execute(text(partition_ddl(*add_months(now.year, now.month, offset))))
+
+            names = (await session.execute(text(PARTITIONS_SQL), {"table": PARENT_TABLE})).scalars().all()
+            expired = expired_partitions(names, now, self.retention_months)
+            if expired and self.archive_schema:
+                await session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{self.archive_schema}"'))
+            for name in expired:
+                await session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                if self.archive_schema:
+                    await session.execute(text(f'ALTER TABLE {name} SET SCHEMA "{self.archive_schema}"'))
+                else:
+                    await session.execute(text(f"DROP TABLE {name}"))
+            await session.commit()
+
+        action = "archived" if self.archive_schema else "dropped"
+        for name in expired:
+            logger.info(f"page_views partition {name} {action} by retention")
+        if expired:
+            page_view_partitions_removed_total.inc(len(expired), action=action)
+        page_view_partitions_gauge.set(len(names) - len(expired))
+        return True
+
+    async def _maintain_forever(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"page_views partition maintenance failed: {str(e)}")
+
+    async def start(self):
+        """Ensure this month's partitions exist before views are written, then maintain in the background"""
+        try:
+            await self.maintain()
+        except Exception as e:
+            logger.error(f"page_views partition maintenance failed: {str(e)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintain_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+page_view_partitions = PageViewPartitions(
+    AsyncSessionLocal,
+    months_ahead=settings.PAGE_VIEW_PARTITIONS_AHEAD,
+    retention_months=settings.PAGE_VIEW_RETENTION_MONTHS,
+    archive_schema=settings.PAGE_VIEW_ARCHIVE_SCHEMA,
+    check_interval=settings.PAGE_VIEW_PARTITION_CHECK_SECONDS
+)
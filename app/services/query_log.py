@@ -0,0 +1,178 @@
+"""
+Search query log.
+
+Search and suggest requests append (normalized query, entity, result count,
+latency) to an in-memory ring buffer, which costs a deque append on the
+request path. A background task writes the buffer to search_query_log in one
+multi-row insert every SEARCH_QUERY_LOG_FLUSH_SECONDS, and periodically
+rebuilds search_query_stats from the recent log. The stats feed suggestion
+popularity and the zero-result report for curators.
+
+Logging is best effort: when the buffer is full the oldest entries are
+dropped, and a failed flush drops its batch; both are counted in /metrics.
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Optional, Tuple
+
+from sqlalchemy import insert, text
+
+from app.database import AsyncSessionLocal
+from app.models import SearchQueryLog
+from app.services.search_cache import normalize_query
+from app.settings import settings
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+# Window aggregated into search_query_stats
+STATS_WINDOW_DAYS = 30
+# Advisory lock so only one worker rebuilds search_query_stats at a time
+STATS_LOCK_KEY = 7301002
+
+REBUILD_STATS_SQL = (
+    "DELETE FROM search_query_stats",
+    """
+    INSERT INTO search_query_stats (endpoint, query, searches, zero_results, avg_latency_ms, last_searched_at)
+    SELECT
+        endpoint,
+        query,
+        count(*),
+        count(*) FILTER (WHERE result_count = 0),
+        avg(latency_ms),
+        max(created_at)
+    FROM search_query_log
+    WHERE created_at >= now() - make_interval(days => :window_days)
+    GROUP BY endpoint, query
+    """,
+    "DELETE FROM search_query_log WHERE created_at < now() - make_interval(days => :retention_days)",
+)
+
+search_query_log_rows_total = registry.counter(
+    "search_query_log_rows_total", "Search requests written to search_query_log"
+)
+search_query_log_dropped_total = registry.counter(
+    "search_query_log_dropped_total", "Search requests dropped from the query log (buffer full or flush failed)"
+)
+
+# (endpoint, query, entity, result_count, latency_ms, unix time)
+LogEntry = Tuple[str, str, Optional[str], int, float, float]
+
+
+class QueryLog:
+    """Ring buffer of search requests, flushed to search_query_log in batches"""
+
+    def __init__(
+        self,
+        session_factory,
+        capacity: int = 10000,
+        flush_interval: float = 5.0,
+        stats_interval: float = 300.0,
+        retention_days: int = 90
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.stats_interval = stats_interval
+        self.retention_days = retention_days
+        self._buffer: Deque[LogEntry] = deque(maxlen=capacity)
+        self._last_stats = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, endpoint: str, q: str, entity: Optional[str], result_count: int, started: float):
+        """Log a request that began at ``started`` (time.perf_counter())"""
+        latency_ms = (time.perf_counter() - started) * 1000
+        if len(self._buffer) == self._buffer.maxlen:
+            search_query_log_dropped_total.inc()
+        self._buffer.append((endpoint, normalize_query(q), entity, result_count, latency_ms, time.time()))
+
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        batch = []
+        while self._buffer:
+            batch.append(self._buffer.popleft())
+        if not batch:
+            return 0
+        rows = [
+            {
+                "endpoint": endpoint,
+                "query": query,
+                "entity": entity,
+                "result_count": result_count,
+                "latency_ms": latency_ms,
+                "created_at": datetime.fromtimestamp(logged_at, timezone.utc),
+            }
+            for endpoint, query, entity, result_count, latency_ms, logged_at in batch
+        ]
+        try:
+            async with self.session_factory() as session:
+                await session.execute(insert(SearchQueryLog), rows)
+                await session.commit()
+        except Exception:
+            search_query_log_dropped_total.inc(len(rows))
+            raise
+        search_query_log_rows_total.inc(len(rows))
+        return len(rows)
+
+    async def rebuild_stats(self) -> bool:
+        """Recompute search_query_stats and apply log retention; False if another worker holds the lock"""
+        params = {"window_days": STATS_WINDOW_DAYS, "retention_days": self.retention_days}
+        async with self.session_factory() as session:
+            locked = await session.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": STATS_LOCK_KEY})
+            if not locked:
+                return False
+            for statement in REBUILD_STATS_SQL:
+                await session.execute(text(statement), params)
+            await session.commit()
+        return True
+
+    async def _run_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Search query log flush failed: {str(e)}")
+            if time.monotonic() - self._last_stats >= self.stats_interval:
+                self._last_stats = time.monotonic()
+                try:
+                    if await self.rebuild_stats():
+                        logger.info("Search query stats rebuilt")
+                except Exception as e:
+                    logger.error(f"Search query stats rebuild failed: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background task and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final search query log flush failed: {str(e)}")
+
+
+query_log = QueryLog(
+    AsyncSessionLocal,
+    capacity=settings.SEARCH_QUERY_LOG_BUFFER_SIZE,
+    flush_interval=settings.SEARCH_QUERY_LOG_FLUSH_SECONDS,
+    stats_interval=settings.SEARCH_QUERY_STATS_INTERVAL_SECONDS,
+    retention_days=settings.SEARCH_QUERY_LOG_RETENTION_DAYS
+)
+
+registry.gauge("search_query_log_buffered", "Search requests waiting to be written to search_query_log").set_function(
+    query_log.buffered
+)
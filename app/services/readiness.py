@@ -0,0 +1,125 @@
+"""
+Readiness checks served from a cached result.
+
+The database, PostGIS, Indonesian FTS and pg_trgm checks run concurrently once at
+startup and are then re-validated in the background every
+READINESS_TTL_SECONDS, so /readyz never touches the database itself.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CHECKS = {
+    "database": ("select 1", "Database connection failed"),
+    "postgis": (
+        "SELECT PostGIS_version()",
+        "Please ensure the PostGIS extension is installed and enabled in your database."
+    ),
+    "fts_indonesian": (
+        "SELECT to_tsvector('indonesian', 'test')",
+        "Please ensure the 'indonesian' FTS dictionary is installed in your database."
+    ),
+    "pg_trgm": (
+        "SELECT similarity('test', 'test')",
+        "Please ensure the pg_trgm extension is installed and enabled in your database."
+    ),
+}
+
+
+class ReadinessProbe:
+    """Caches capability checks and reports pool saturation for load balancers"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl_seconds: float = 30,
+        saturation_threshold: float = 0.9,
+        check_timeout: float = 5
+    ):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.saturation_threshold = saturation_threshold
+        self.check_timeout = check_timeout
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_check(self, name: str, sql: str, hint: str) -> Dict[str, Any]:
+        try:
+            async with self.engine.connect() as conn:
+                value = await asyncio.wait_for(conn.scalar(text(sql)), timeout=self.check_timeout)
+            if value is None:
+                raise ValueError(f"{name} check returned no result")
+            return {"status": "ok"}
+        except Exception as e:
+            logger.error("Readiness check '%s' failed: %s", name, str(e))
+            logger.error(hint)
+            return {"status": "failed", "error": str(e).splitlines()[0] if str(e) else type(e).__name__}
+
+    async def refresh(self):
+        """Run all checks concurrently and replace the cached result"""
+        names = list(CHECKS)
+        results = await asyncio.gather(*(self._run_check(name, *CHECKS[name]) for name in names))
+        self.results = dict(zip(names, results))
+        self.checked_at = time.time()
+        logger.info("Readiness checks refreshed: %s", {name: r["status"] for name, r in self.results.items()})
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.ttl_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Readiness refresh failed: %s", str(e))
+
+    async def start(self):
+        """Compute the initial result and start background re-validation"""
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def pool_status(self) -> Dict[str, Any]:
+        pool = self.engine.sync_engine.pool
+        capacity = pool.size() + getattr(pool, "_max_overflow", 0)
+        checked_out = pool.checkedout()
+        saturation = checked_out / capacity if capacity else 0.0
+        return {
+            "checked_out": checked_out,
+            "capacity": capacity,
+            "saturation": round(saturation, 3),
+            "saturated": saturation >= self.saturation_threshold,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cached readiness plus the live pool status; never queries the database"""
+        pool = self.pool_status()
+        checks_ok = bool(self.results) and all(r["status"] == "ok" for r in self.results.values())
+        if not checks_ok:
+            status = "unhealthy"
+        elif pool["saturated"]:
+            status = "saturated"
+        else:
+            status = "healthy"
+        return {
+            "status": status,
+            "checks": {name: r["status"] for name, r in self.results.items()},
+            "errors": {name: r["error"] for name, r in self.results.items() if "error" in r},
+            "checked_at": self.checked_at,
+            "pool": pool,
+        }
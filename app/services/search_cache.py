@@ -0,0 +1,76 @@
+"""
+Result cache for GET /api/search and /api/search/suggest.
+
+Entries are keyed on the normalized query, request parameters and the
+caller's visibility class, and bounded by SEARCH_CACHE_MAX_BYTES with LRU
+eviction; lookups never touch the database. The cache is emptied whenever
+the search indexer reports a change to search_index, made by this worker or
+replayed from another within SEARCH_INDEX_POLL_MS, and on every typeahead
+rebuild. Reads served by a lagging replica can still cache slightly older
+results, so entries also expire after SEARCH_CACHE_TTL_SECONDS.
+"""
+import sys
+from typing import Any, Hashable, List
+
+from pydantic import BaseModel
+
+from app.services.search_indexer import search_indexer
+from app.settings import settings
+from app.utils.cache import SizedLRUCache
+from app.utils.metrics import registry
+
+STAFF_ROLES = ("super_admin", "admin_taman")
+
+search_cache_requests_total = registry.counter(
+    "search_cache_requests_total", "Search result cache lookups", ("endpoint", "result")
+)
+
+
+def normalize_query(q: str) -> str:
+    """Queries differing only in case or whitespace share a cache entry"""
+    return " ".join(q.split()).lower()
+
+
+def visibility_class(user) -> str:
+    """Callers whose results may differ are cached apart"""
+    return "staff" if user.role in STAFF_ROLES else "public"
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a cached value, in bytes"""
+    if isinstance(value, BaseModel):
+        return sys.getsizeof(value) + estimate_size(value.__dict__)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+search_cache = SizedLRUCache(
+    max_bytes=settings.SEARCH_CACHE_MAX_BYTES, sizeof=estimate_size, ttl=settings.SEARCH_CACHE_TTL_SECONDS
+)
+
+
+def lookup(endpoint: str, key: Hashable) -> Any:
+    value = search_cache.get(key)
+    search_cache_requests_total.inc(endpoint=endpoint, result="miss" if value is None else "hit")
+    return value
+
+
+async def _invalidate_on_index_update(entity_type: str, ids: List[int]):
+    search_cache.invalidate()
+
+
+search_indexer.add_listener(_invalidate_on_index_update)
+
+registry.gauge("search_cache_hit_ratio", "Fraction of search cache lookups served from the cache").set_function(
+    search_cache.hit_ratio
+)
+registry.gauge("search_cache_bytes", "Estimated memory held by the search cache").set_function(
+    lambda: search_cache.bytes
+)
+registry.gauge("search_cache_entries", "Entries in the search cache").set_function(lambda: len(search_cache))
+registry.gauge("search_cache_evictions", "Search cache entries evicted to stay within SEARCH_CACHE_MAX_BYTES").set_function(
+    lambda: search_cache.evictions
+)
@@ -0,0 +1,214 @@
+"""
+Incremental search_index maintenance.
+
+CRUD write paths call ``search_indexer.mark_dirty`` after committing. Dirty
+entity ids are coalesced in memory and re-projected into search_index by a
+background task in batches, so writes never wait on indexing. A deleted
+entity is marked like any other change; its index row is removed when the
+flush no longer finds it. Pending changes are lost if the process dies before
+the next flush; POST /api/search/reindex rebuilds everything from scratch.
+
+Listeners (``add_listener``) hear of every change to search_index, whichever
+worker made it: each flush records the entities it indexed under a new
+search_index generation, and every SEARCH_INDEX_POLL_MS each worker replays
+the generations committed by others. A full reindex, or a gap longer than
+the changes kept, is replayed as ``(ALL_ENTITIES, [])``.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal
+from app.search.indexing import ALL_ENTITIES, CHANGES_SQL, GENERATION_SQL, bump_generation, index_entities
+from app.settings import settings
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+search_index_flushes_total = registry.counter(
+    "search_index_flushes_total", "Batches of dirty entities written to search_index"
+)
+search_index_flush_failures_total = registry.counter(
+    "search_index_flush_failures_total", "search_index flushes that failed and were retried"
+)
+search_index_remote_changes_total = registry.counter(
+    "search_index_remote_changes_total", "search_index generations written by other workers and replayed here"
+)
+search_index_apply_lag_seconds = registry.histogram(
+    "search_index_apply_lag_seconds", "Time from a committed write to its search_index update", ("entity",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+
+class SearchIndexer:
+    """Coalesces dirty entity ids and flushes them to search_index in the background"""
+
+    def __init__(
+        self,
+        session_factory,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        retry_delay: float = 5.0,
+        poll_interval: float = 0.5
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        # Latest search_index generation whose changes the listeners have heard of
+        self.generation: Optional[int] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        # (entity_type, id) -> monotonic time of the first unflushed change
+        self._pending: Dict[Tuple[str, int], float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, List[int]], Awaitable[None]]] = []
+
+    def mark_dirty(self, entity_type: str, entity_id: int):
+        """Queue an entity for re-indexing; call after the write is committed"""
+        self._pending.setdefault((entity_type, int(entity_id)), time.monotonic())
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def add_listener(self, listener: Callable[[str, List[int]], Awaitable[None]]):
+        """Call ``await listener(entity_type, ids)`` after each committed change to search_index"""
+        self._listeners.append(listener)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def oldest_pending_age(self) -> float:
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - min(self._pending.values())
+
+    def _take_batch(self) -> Dict[Tuple[str, int], float]:
+        batch = {}
+        for key in list(self._pending)[:self.batch_size]:
+            batch[key] = self._pending.pop(key)
+        return batch
+
+    async def flush(self) -> int:
+        """Write one batch of pending changes; returns how many entities were indexed"""
+        batch = self._take_batch()
+        if not batch:
+            return 0
+
+        by_entity: Dict[str, List[int]] = defaultdict(list)
+        for entity_type, entity_id in batch:
+            by_entity[entity_type].append(entity_id)
+
+        try:
+            async with self.session_factory() as session:
+                for entity_type, ids in by_entity.items():
+                    await index_entities(session, entity_type, ids)
+                generation = await bump_generation(session, by_entity)
+                await session.commit()
+        except Exception:
+            # Put the batch back, keeping the earliest change time for lag
+            for key, marked_at in batch.items():
+                self._pending[key] = min(marked_at, self._pending.get(key, marked_at))
+            raise
+
+        now = time.monotonic()
+        for (entity_type, _), marked_at in batch.items():
+            search_index_apply_lag_seconds.observe(now - marked_at, entity=entity_type)
+        search_index_flushes_total.inc()
+        # Otherwise another worker's change came first; poll() replays both
+        if self.generation is not None and generation == self.generation + 1:
+            self.generation = generation
+        await self._notify(by_entity)
+        return len(batch)
+
+    async def poll(self):
+        """Replay to the listeners the search_index changes committed by other workers"""
+        async with self.session_factory() as session:
+            generation = (await session.execute(text(GENERATION_SQL))).scalar() or 0
+            if self.generation is None or generation <= self.generation:
+                self.generation = max(self.generation or 0, generation)
+                return
+            after = self.generation
+            rows = (await session.execute(text(CHANGES_SQL), {"after": after, "upto": generation})).all()
+
+        by_entity: Dict[str, List[int]] = defaultdict(list)
+        for row in rows:
+            by_entity[row.entity_type].append(row.entity_id)
+        # Changes pruned before we saw them count as a full reindex
+        if ALL_ENTITIES in by_entity or len({row.generation for row in rows}) < generation - after:
+            by_entity = {ALL_ENTITIES: []}
+        self.generation = max(self.generation, generation)
+        search_index_remote_changes_total.inc(generation - after)
+        await self._notify(by_entity)
+
+    async def _notify(self, by_entity: Dict[str, List[int]]):
+        for listener in self._listeners:
+            for entity_type, ids in by_entity.items():
+                try:
+                    await listener(entity_type, ids)
+                except Exception as e:
+                    logger.error(f"Search index listener {getattr(listener, '__qualname__', listener)} failed: {str(e)}")
+
+    async def _poll_forever(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Search index change poll failed: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _flush_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.flush() >= self.batch_size:
+                    pass
+            except Exception as e:
+                search_index_flush_failures_total.inc()
+                logger.error(f"Search index flush failed, {self.pending_count()} changes pending: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_forever())
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_forever())
+
+    async def stop(self):
+        """Stop the background tasks and flush whatever is still pending"""
+        for task in (self._task, self._poll_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._poll_task = None
+        try:
+            while await self.flush():
+                pass
+        except Exception as e:
+            logger.error(f"Final search index flush failed, {self.pending_count()} changes dropped: {str(e)}")
+
+
+search_indexer = SearchIndexer(
+    AsyncSessionLocal,
+    flush_interval=settings.SEARCH_INDEX_FLUSH_INTERVAL_SECONDS,
+    batch_size=settings.SEARCH_INDEX_BATCH_SIZE,
+    poll_interval=settings.SEARCH_INDEX_POLL_MS / 1000
+)
+
+registry.gauge(
+    "search_index_pending", "Entities changed but not yet written to search_index"
+).set_function(search_indexer.pending_count)
+registry.gauge(
+    "search_index_lag_seconds", "Age of the oldest change not yet written to search_index"
+).set_function(search_indexer.oldest_pending_age)
@@ -0,0 +1,326 @@
+"""
+Full search_index rebuild as a cancellable background job.
+
+The index is rebuilt into search_index_shadow while search keeps serving the
+live table:
+
+1. copy every entity into the shadow table in keyset-ordered chunks, one short
+   transaction per chunk;
+2. build the live table's indexes and foreign keys on the shadow table;
+3. re-project entities changed since the job started (incremental flushes
+   keep going to the live table meanwhile) and drop rows of deleted entities;
+4. swap the tables in one short transaction under ACCESS EXCLUSIVE lock.
+
+Only one rebuild runs per database: the job holds a session-level advisory
+lock for its whole lifetime. Job progress is kept in the worker that started it.
+"""
+import asyncio
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.database import engine
+from app.search.indexing import (
+    ALL_ENTITIES,
+    ENTITY_SOURCES,
+    bump_generation,
+    delete_missing_sql,
+    insert_chunk_sql,
+    upsert_sql,
+)
+from app.services.search_cache import search_cache
+from app.settings import settings
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LIVE_TABLE = "search_index"
+SHADOW_TABLE = "search_index_shadow"
+SHADOW_SUFFIX = "_shadow"
+# Arbitrary application-wide key for pg_try_advisory_lock
+REINDEX_LOCK_KEY = 7_301_001
+# Entities updated shortly before the job started may belong to transactions
+# that committed after the chunk copy passed them
+CATCH_UP_MARGIN = "interval '5 minutes'"
+SWAP_LOCK_TIMEOUT = "5s"
+SWAP_ATTEMPTS = 5
+KEEP_FINISHED_JOBS = 20
+
+
+class ReindexAlreadyRunning(Exception):
+    pass
+
+
+class ReindexCancelled(Exception):
+    pass
+
+
+class ReindexJob:
+    """State and progress of one rebuild"""
+
+    def __init__(self, requested_by: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.requested_by = requested_by
+        self.status = "pending"
+        self.phase = "pending"
+        self.rows_done = 0
+        self.rows_total = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.cancel_requested = False
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "running", "cancelling")
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise ReindexCancelled()
+
+    def progress(self) -> Dict[str, Any]:
+        elapsed = (self._finished or time.monotonic()) - self._started
+        rate = self.rows_done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.rows_total - self.rows_done, 0)
+        eta = remaining / rate if rate > 0 and self.active else None
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "phase": self.phase,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "percent": round(100.0 * self.rows_done / self.rows_total, 1) if self.rows_total else None,
+            "rows_per_second": round(rate, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "requested_by": self.requested_by,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+def _shadow_index_ddl(indexdef: str, name: str) -> str:
+    """Rewrite a pg_indexes definition of the live table to target the shadow table"""
+    return re.sub(
+        r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON (?:ONLY )?)(\S+)",
+        lambda m: f"{m.group(1)}{name}{SHADOW_SUFFIX}{m.group(3)}{SHADOW_TABLE}",
+        indexdef,
+        count=1
+    )
+
+
+class SearchReindexer:
+    """Starts, tracks and cancels shadow-table rebuilds of search_index"""
+
+    def __init__(self, async_engine, chunk_size: int = 1000):
+        self.engine = async_engine
+        self.chunk_size = chunk_size
+        self.jobs: Dict[str, ReindexJob] = {}
+
+    def current(self) -> Optional[ReindexJob]:
+        return next((job for job in self.jobs.values() if job.active), None)
+
+    def get(self, job_id: str) -> Optional[ReindexJob]:
+        return self.jobs.get(job_id)
+
+    async def start(self, requested_by: Optional[str] = None) -> ReindexJob:
+        if self.current() is not None:
+            raise ReindexAlreadyRunning()
+
+        # Held for the whole job so no other worker can rebuild concurrently
+        lock_conn = await self.engine.connect()
+        try:
+            acquired = await lock_conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": REINDEX_LOCK_KEY})
+            await lock_conn.commit()
+        except Exception:
+            await lock_conn.close()
+            raise
+        if not acquired:
+            await lock_conn.close()
+            raise ReindexAlreadyRunning()
+
+        job = ReindexJob(requested_by)
+        self.jobs[job.id] = job
+        while len(self.jobs) > KEEP_FINISHED_JOBS:
+            del self.jobs[next(iter(self.jobs))]
+        job._task = asyncio.create_task(self._run(job, lock_conn))
+        return job
+
+    def cancel(self, job_id: str) -> Optional[ReindexJob]:
+        job = self.jobs.get(job_id)
+        if job is not None and job.active:
+            job.cancel_requested = True
+            job.status = "cancelling"
+        return job
+
+    async def _run(self, job: ReindexJob, lock_conn):
+        job.status = "running"
+        try:
+            async with self.engine.connect() as conn:
+                started_at = await conn.scalar(text("SELECT now()"))
+            await self._prepare_shadow(job)
+            await self._copy_chunks(job)
+            foreign_keys = await self._build_shadow_indexes(job)
+            await self._catch_up(job, started_at, foreign_keys)
+            await self._swap(job, started_at)
+            search_cache.invalidate()
+            job.status = "completed"
+            logger.info(f"Search reindex {job.id} completed: {job.rows_done} rows")
+        except ReindexCancelled:
+            job.status = "cancelled"
+            logger.info(f"Search reindex {job.id} cancelled after {job.rows_done} rows")
+            await self._drop_shadow()
+        except asyncio.CancelledError:
+            # Task cancelled, e.g. on shutdown: clean up, then let it propagate
+            job.status = "cancelled"
+            logger.info(f"Search reindex {job.id} interrupted after {job.rows_done} rows")
+            await asyncio.shield(self._drop_shadow())
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+            logger.error(f"Search reindex {job.id} failed: {str(e)}")
+            await self._drop_shadow()
+        finally:
+            job.phase = job.status
+            job.finished_at = datetime.now(timezone.utc)
+            job._finished = time.monotonic()
+            try:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": REINDEX_LOCK_KEY})
+            finally:
+                await lock_conn.close()
+
+    async def _drop_shadow(self):
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        except Exception as e:
+            logger.error(f"Could not drop {SHADOW_TABLE}: {str(e)}")
+
+    async def _prepare_shadow(self, job: ReindexJob):
+        job.phase = "preparing"
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+            # Columns, defaults (the shared id sequence) and the generated
+            # search_vector; indexes are built after the bulk load
+            await conn.execute(text(
+                f"CREATE TABLE {SHADOW_TABLE} (LIKE {LIVE_TABLE} INCLUDING ALL EXCLUDING INDEXES)"
+            ))
+            counts = [
+                await conn.scalar(text(f"SELECT count(*) FROM {source['table']}"))
+                for source in ENTITY_SOURCES.values()
+            ]
+        job.rows_total = sum(counts)
+
+    async def _copy_chunks(self, job: ReindexJob):
+        job.phase = "copying"
+        for entity_type in ENTITY_SOURCES:
+            statement = text(insert_chunk_sql(entity_type, SHADOW_TABLE))
+            after_id = 0
+            while True:
+                job.check_cancelled()
+                async with self.engine.begin() as conn:
+                    copied = (await conn.execute(
+                        statement, {"after_id": after_id, "limit": self.chunk_size}
+                    )).scalars().all()
+                if not copied:
+                    break
+                job.rows_done += len(copied)
+                after_id = max(copied)
+                # Let request handlers and the incremental indexer run between chunks
+                await asyncio.sleep(0)
+
+    async def _build_shadow_indexes(self, job: ReindexJob) -> List[str]:
+        job.phase = "indexing"
+        async with self.engine.connect() as conn:
+            indexes = (await conn.execute(text("""
+                SELECT indexname, indexdef FROM pg_indexes
+                WHERE schemaname = current_schema() AND tablename = :table
+                AND indexname NOT IN (
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = CAST(:table AS regclass) AND contype IN ('p', 'u')
+                )
+            """), {"table": LIVE_TABLE})).all()
+            foreign_keys = (await conn.execute(text("""
+                SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+            """), {"table": LIVE_TABLE})).all()
+
+        async with self.engine.begin() as conn:
+            await conn.execute(text(
+                f"ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT {SHADOW_TABLE}_pkey PRIMARY KEY (id)"
+            ))
+        for name, indexdef in indexes:
+            job.check_cancelled()
+            async with self.engine.begin() as conn:
+                await conn.execute(text(_shadow_index_ddl(indexdef, name)))
+        # NOT VALID keeps the referenced tables writable while the constraint
+        # is added; cascades apply from here on and validation happens later
+        async with self.engine.begin() as conn:
+            for name, definition in foreign_keys:
+                await conn.execute(text(
+                    f"ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT {name} {definition} NOT VALID"
+                ))
+        return [name for name, _ in foreign_keys]
+
+    async def _catch_up(self, job: ReindexJob, started_at, foreign_keys: List[str]):
+        job.phase = "catching_up"
+        job.check_cancelled()
+        async with self.engine.begin() as conn:
+            for entity_type in ENTITY_SOURCES:
+                await conn.execute(text(delete_missing_sql(entity_type, SHADOW_TABLE, only_ids=False)))
+                await conn.execute(
+                    text(upsert_sql(entity_type, f"WHERE updated_at >= :since - {CATCH_UP_MARGIN}", SHADOW_TABLE)),
+                    {"since": started_at}
+                )
+        async with self.engine.begin() as conn:
+            for name in foreign_keys:
+                await conn.execute(text(f"ALTER TABLE {SHADOW_TABLE} VALIDATE CONSTRAINT {name}"))
+
+    async def _swap(self, job: ReindexJob, started_at):
+        job.phase = "swapping"
+        job.check_cancelled()
+        async with self.engine.connect() as conn:
+            renames: List[str] = (await conn.execute(text("""
+                SELECT indexname FROM pg_indexes
+                WHERE schemaname = current_schema() AND tablename = :table AND indexname LIKE :pattern
+            """), {"table": SHADOW_TABLE, "pattern": f"%{SHADOW_SUFFIX}"})).scalars().all()
+            sequence = await conn.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": LIVE_TABLE})
+
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                async with self.engine.begin() as conn:
+                    # Give up quickly rather than queueing every search behind a long reader
+                    await conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+                    await conn.execute(text(f"LOCK TABLE {LIVE_TABLE} IN ACCESS EXCLUSIVE MODE"))
+                    for entity_type in ENTITY_SOURCES:
+                        await conn.execute(
+                            text(upsert_sql(entity_type, f"WHERE updated_at >= :since - {CATCH_UP_MARGIN}", SHADOW_TABLE)),
+                            {"since": started_at}
+                        )
+                    if sequence:
+                        await conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {SHADOW_TABLE}.id"))
+                    await conn.execute(text(f"DROP TABLE {LIVE_TABLE}"))
+                    await conn.execute(text(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {LIVE_TABLE}"))
+                    await conn.execute(text(f"ALTER INDEX {SHADOW_TABLE}_pkey RENAME TO {LIVE_TABLE}_pkey"))
+                    for name in renames:
+                        await conn.execute(text(f"ALTER INDEX {name} RENAME TO {name[:-len(SHADOW_SUFFIX)]}"))
+                    await bump_generation(conn, {ALL_ENTITIES: [0]})
+                return
+            except DBAPIError as e:
+                if "lock timeout" not in str(e) or attempt == SWAP_ATTEMPTS:
+                    raise
+                logger.warning(f"Search reindex {job.id}: swap lock timed out, retrying ({attempt}/{SWAP_ATTEMPTS})")
+                job.check_cancelled()
+                await asyncio.sleep(attempt)
+
+
+search_reindexer = SearchReindexer(engine, chunk_size=settings.SEARCH_REINDEX_CHUNK_SIZE)
@@ -0,0 +1,160 @@
+"""
+Keeps the typeahead engine (app/search/suggest.py) loaded and current.
+
+The full index is built at startup and rebuilt in the background every
+SUGGEST_REBUILD_INTERVAL_SECONDS, which also refreshes popularity (page views
+and searches for the exact name over the last 30 days). Between rebuilds,
+entities re-indexed by any worker's search indexer are reloaded into the
+engine's overlay, and a full reindex triggers a rebuild.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal
+from app.search.indexing import ALL_ENTITIES
+from app.search.suggest import Entry, SuggestEngine, SuggestIndex
+from app.services.search_cache import search_cache
+from app.services.search_indexer import search_indexer
+from app.settings import settings
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+SUGGEST_ENTITY_TYPES = ("taman", "koleksi")
+# Rebuild early once this many entities are served from the overlay
+OVERLAY_REBUILD_THRESHOLD = 1000
+
+# Popularity: page views of the entity plus searches for exactly this name
+# (search_query_stats, same normalization as the query log) over 30 days
+SUGGESTION_NAMES_SQL = """
+    SELECT 'taman' AS entity_type, t.id, t.nama_resmi AS name, 'nama_resmi' AS field,
+        COALESCE(v.views, 0) + COALESCE(s.searches, 0) AS popularity
+    FROM taman_kehati t
+    LEFT JOIN (
+        SELECT taman_kehati_id, count(*) AS views
+        FROM page_views
+        WHERE created_at >= now() - interval '30 days' AND koleksi_tumbuhan_id IS NULL
+        GROUP BY taman_kehati_id
+    ) v ON v.taman_kehati_id = t.id
+    LEFT JOIN search_query_stats s
+        ON s.endpoint = 'search' AND s.query = lower(regexp_replace(btrim(t.nama_resmi), '\\s+', ' ', 'g'))
+    WHERE t.status = 'published' {taman_filter}
+    UNION ALL
+    SELECT 'koleksi' AS entity_type, k.id, names.name, names.field,
+        COALESCE(v.views, 0) + COALESCE(s.searches, 0) AS popularity
+    FROM koleksi_tumbuhan k
+    CROSS JOIN LATERAL unnest(
+        ARRAY[k.nama_ilmiah, k.nama_umum_nasional, k.nama_lokal_daerah],
+        ARRAY['nama_ilmiah', 'nama_umum_nasional', 'nama_lokal_daerah']
+    ) AS names(name, field)
+    LEFT JOIN (
+        SELECT koleksi_tumbuhan_id, count(*) AS views
+        FROM page_views
+        WHERE created_at >= now() - interval '30 days' AND koleksi_tumbuhan_id IS NOT NULL
+        GROUP BY koleksi_tumbuhan_id
+    ) v ON v.koleksi_tumbuhan_id = k.id
+    LEFT JOIN search_query_stats s
+        ON s.endpoint = 'search' AND s.query = lower(regexp_replace(btrim(names.name), '\\s+', ' ', 'g'))
+    WHERE k.status = 'published' AND names.name IS NOT NULL AND names.name <> '' {koleksi_filter}
+"""
+
+suggest_rebuilds_total = registry.counter("suggest_rebuilds_total", "Full rebuilds of the typeahead index")
+suggest_rebuild_seconds = registry.histogram(
+    "suggest_rebuild_seconds", "Time to load and build the typeahead index",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+
+class SuggestionService:
+    """Owns the SuggestEngine and its background rebuilds"""
+
+    def __init__(self, session_factory, rebuild_interval: float = 600):
+        self.session_factory = session_factory
+        self.rebuild_interval = rebuild_interval
+        self.engine = SuggestEngine()
+        self._rebuild_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _load(self, entity_type: Optional[str] = None, ids: Optional[List[int]] = None) -> List[Entry]:
+        params = {}
+        taman_filter = koleksi_filter = ""
+        if ids is not None:
+            params["ids"] = ids
+            taman_filter = "AND t.id = ANY(:ids)" if entity_type == "taman" else "AND false"
+            koleksi_filter = "AND k.id = ANY(:ids)" if entity_type == "koleksi" else "AND false"
+        sql = SUGGESTION_NAMES_SQL.format(taman_filter=taman_filter, koleksi_filter=koleksi_filter)
+        async with self.session_factory() as session:
+            rows = (await session.execute(text(sql), params)).all()
+        return [Entry(row.name, row.entity_type, row.id, float(row.popularity), row.field) for row in rows]
+
+    async def rebuild(self):
+        started = time.perf_counter()
+        version = self.engine.version
+        entries = await self._load()
+        # Sorting a large catalogue takes a while; keep it off the event loop
+        index = await asyncio.to_thread(SuggestIndex, entries)
+        self.engine.replace_index(index, built_from_version=version)
+        search_cache.invalidate()
+        elapsed = time.perf_counter() - started
+        suggest_rebuilds_total.inc()
+        suggest_rebuild_seconds.observe(elapsed)
+        logger.info(f"Suggestion index rebuilt with {len(index)} names in {elapsed:.2f}s")
+
+    async def on_entities_indexed(self, entity_type: str, ids: List[int]):
+        """search_indexer listener: reload the names of changed entities into the overlay"""
+        if entity_type == ALL_ENTITIES:
+            self._rebuild_requested.set()
+            return
+        if entity_type not in SUGGEST_ENTITY_TYPES or not self.engine.ready:
+            return
+        by_id: Dict[int, List[Entry]] = defaultdict(list)
+        for entry in await self._load(entity_type, ids):
+            by_id[entry.entity_id].append(entry)
+        for entity_id in ids:
+            self.engine.update_entity(entity_type, entity_id, by_id.get(entity_id, []))
+        search_cache.invalidate()
+        if self.engine.overlay_size >= OVERLAY_REBUILD_THRESHOLD:
+            self._rebuild_requested.set()
+
+    async def _rebuild_forever(self):
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Suggestion index rebuild failed: {str(e)}")
+            # Retry soon while requests are still served by the SQL fallback
+            timeout = self.rebuild_interval if self.engine.ready else min(self.rebuild_interval, 30)
+            try:
+                await asyncio.wait_for(self._rebuild_requested.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._rebuild_requested.clear()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._rebuild_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+suggestion_service = SuggestionService(AsyncSessionLocal, rebuild_interval=settings.SUGGEST_REBUILD_INTERVAL_SECONDS)
+search_indexer.add_listener(suggestion_service.on_entities_indexed)
+
+registry.gauge("suggest_index_names", "Names held in the typeahead index").set_function(
+    lambda: len(suggestion_service.engine.index) if suggestion_service.engine.ready else 0
+)
+registry.gauge("suggest_overlay_entities", "Entities updated since the last typeahead rebuild").set_function(
+    lambda: suggestion_service.engine.overlay_size
+)
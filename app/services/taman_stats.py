@@ -0,0 +1,111 @@
+"""
+Taman statistics: koleksi and artikel counts plus page views over the last
+7 and 30 UTC days (today included), for any number of taman in one query.
+
+Views come from the daily page-view rollup, which the view ingestor keeps
+current for today. Results are cached per taman for up to
+TAMAN_STATS_CACHE_TTL_SECONDS, which bounds how far view counts lag. A
+taman's entry is dropped at once when this worker creates, moves or deletes
+one of its koleksi or artikel, or updates or deletes the taman itself, and
+the whole cache after a rollup rebuild; writes handled by other workers are
+picked up when entries expire. Cached stats must be read from the primary:
+a lagging replica would cache counts from before the write that invalidated
+them.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.schemas.taman_kehati import TamanKehatiStatsResponse
+from app.services.search_indexer import search_indexer
+from app.services.view_rollups import floor_day
+from app.settings import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry
+
+# Most taman per batch request
+MAX_STATS_BATCH = 100
+
+TAMAN_STATS_SQL = """
+    SELECT
+        t.id,
+        (SELECT count(*) FROM koleksi_tumbuhan k WHERE k.taman_kehati_id = t.id) AS koleksi_count,
+        (SELECT count(*) FROM artikel a WHERE a.taman_kehati_id = t.id) AS artikel_count,
+        COALESCE(v.views_7d, 0) AS views_7d,
+        COALESCE(v.views_30d, 0) AS views_30d
+    FROM taman_kehati t
+    LEFT JOIN LATERAL (
+        SELECT
+            sum(r.views) FILTER (WHERE r.bucket >= :start_7d) AS views_7d,
+            sum(r.views) AS views_30d
+        FROM page_view_rollup_daily r
+        WHERE r.entity_type = 'taman' AND r.entity_id = t.id AND r.bucket >= :start_30d
+    ) v ON true
+    WHERE t.id = ANY(:ids)
+"""
+
+taman_stats_cache = TTLCache(maxsize=settings.TAMAN_STATS_CACHE_SIZE, ttl=settings.TAMAN_STATS_CACHE_TTL_SECONDS)
+# Bumped on every invalidation, so stats computed before it are not cached
+_generations: Counter = Counter()
+_global_generation = 0
+
+
+def invalidate_taman_stats(*taman_ids: Optional[int]):
+    for taman_id in taman_ids:
+        if taman_id is None:
+            continue
+        _generations[taman_id] += 1
+        taman_stats_cache.pop(taman_id)
+
+
+def invalidate_all_taman_stats():
+    global _global_generation
+    _global_generation += 1
+    taman_stats_cache.clear()
+
+
+async def get_taman_stats(db, taman_ids: List[int]) -> Dict[int, TamanKehatiStatsResponse]:
+    """Stats of the existing taman among ``taman_ids``; ``db`` must be a primary session"""
+    stats: Dict[int, TamanKehatiStatsResponse] = {}
+    missing = []
+    for taman_id in dict.fromkeys(taman_ids):
+        cached = taman_stats_cache.get(taman_id)
+        if cached is None:
+            missing.append(taman_id)
+        else:
+            stats[taman_id] = cached
+    if not missing:
+        return stats
+
+    generations = {taman_id: _generations[taman_id] for taman_id in missing}
+    global_generation = _global_generation
+    today = floor_day(datetime.now(timezone.utc))
+    rows = await db.execute(text(TAMAN_STATS_SQL), {
+        "ids": missing,
+        "start_7d": today - timedelta(days=6),
+        "start_30d": today - timedelta(days=29),
+    })
+    for row in rows:
+        stats[row.id] = TamanKehatiStatsResponse(
+            koleksi_count=row.koleksi_count,
+            artikel_count=row.artikel_count,
+            views_7d=row.views_7d,
+            views_30d=row.views_30d
+        )
+        if _generations[row.id] == generations[row.id] and _global_generation == global_generation:
+            taman_stats_cache.set(row.id, stats[row.id])
+    return stats
+
+
+async def _invalidate_on_index_update(entity_type: str, ids: List[int]):
+    if entity_type == "taman":
+        invalidate_taman_stats(*ids)
+
+
+search_indexer.add_listener(_invalidate_on_index_update)
+
+registry.gauge("taman_stats_cache_hit_ratio", "Fraction of taman stats served from the cache").set_function(
+    taman_stats_cache.hit_ratio
+)
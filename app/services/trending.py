@@ -0,0 +1,229 @@
+"""
+Trending koleksi over the last TRENDING_WINDOW_SECONDS.
+
+Every worker counts the koleksi views it accepts in Space-Saving sketches
+(app/utils/space_saving.py), one per taman plus one across all taman (scope
+0), per TRENDING_SLOT_SECONDS time slot. Every TRENDING_SYNC_SECONDS it
+writes the slots changed since the last sync to trending_sketches and reads
+the slots other workers changed, so each worker sees every worker's views.
+The merged top lists, with titles of published koleksi, are recomputed at
+the same time; GET /api/views/trending only reads them from memory.
+
+The per-taman scope of a view comes from the client, so record() only
+counts it for taman known at the last sync, and a taman's list keeps only
+koleksi that belong to it.
+
+The window moves one slot at a time, so it spans between
+WINDOW - SLOT and WINDOW seconds. Counts are Space-Saving estimates.
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import AsyncSessionLocal
+from app.models import TrendingSketch
+from app.schemas.views import TopView
+from app.settings import settings
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+from app.utils.space_saving import SpaceSaving
+
+logger = get_logger(__name__)
+
+ALL_TAMAN = 0
+# Longest list served by /views/trending
+MAX_TRENDING = 50
+
+# (scope, slot start)
+SlotKey = Tuple[int, datetime]
+
+REMOTE_SKETCHES_SQL = """
+    SELECT worker_id, scope, slot, counts
+    FROM trending_sketches
+    WHERE worker_id <> :worker_id AND slot >= :window_start AND updated_at >= :since
+"""
+TITLES_SQL = """
+    SELECT id, nama_ilmiah, taman_kehati_id FROM koleksi_tumbuhan
+    WHERE id = ANY(:ids) AND status = 'published'
+"""
+TAMAN_IDS_SQL = "SELECT id FROM taman_kehati"
+
+trending_sync_seconds = registry.histogram(
+    "trending_sync_seconds", "Time to exchange trending sketches with other workers",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+trending_sync_failures_total = registry.counter(
+    "trending_sync_failures_total", "Failed trending sketch exchanges"
+)
+
+
+class TrendingKoleksi:
+    """Sliding-window heavy hitters of koleksi views, shared between workers through the database"""
+
+    def __init__(
+        self,
+        session_factory,
+        window_seconds: int = 3600,
+        slot_seconds: int = 300,
+        sync_interval: float = 5.0,
+        capacity: int = 200
+    ):
+        self.session_factory = session_factory
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._local: Dict[SlotKey, SpaceSaving] = {}
+        self._remote: Dict[Tuple[str, int, datetime], SpaceSaving] = {}
+        self._dirty: Set[SlotKey] = set()
+        self._since: Optional[datetime] = None
+        self._trending: Dict[int, List[TopView]] = {}
+        # Taman that get a scope of their own, loaded at every sync
+        self._taman_ids: Set[int] = set()
+        self.refreshed_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _slot(self, moment: datetime) -> datetime:
+        seconds = int(moment.timestamp()) // self.slot_seconds * self.slot_seconds
+        return datetime.fromtimestamp(seconds, timezone.utc)
+
+    def _window_start(self, now: datetime) -> datetime:
+        return self._slot(now) - timedelta(seconds=self.window_seconds - self.slot_seconds)
+
+    def record(self, view: Dict[str, Any]):
+        """Count a koleksi view accepted by POST /track; other views are ignored"""
+        koleksi_id = view.get("koleksi_tumbuhan_id")
+        if not koleksi_id:
+            return
+        slot = self._slot(view.get("created_at") or datetime.now(timezone.utc))
+        taman_kehati_id = view.get("taman_kehati_id")
+        scopes = (ALL_TAMAN, taman_kehati_id) if taman_kehati_id in self._taman_ids else (ALL_TAMAN,)
+        for scope in scopes:
+            key = (scope, slot)
+            sketch = self._local.get(key)
+            if sketch is None:
+                sketch = self._local[key] = SpaceSaving(self.capacity)
+            sketch.offer(koleksi_id)
+            self._dirty.add(key)
+
+    def top(self, taman_kehati_id: Optional[int] = None, limit: int = 10) -> List[TopView]:
+        return self._trending.get(taman_kehati_id or ALL_TAMAN, [])[:limit]
+
+    def _expire(self, window_start: datetime):
+        self._local = {key: sketch for key, sketch in self._local.items() if key[1] >= window_start}
+        self._remote = {key: sketch for key, sketch in self._remote.items() if key[2] >= window_start}
+        self._dirty = {key for key in self._dirty if key[1] >= window_start}
+
+    async def sync(self, now: Optional[datetime] = None):
+        """Publish changed local slots, fetch other workers' changes and recompute the top lists"""
+        now = now or datetime.now(timezone.utc)
+        window_start = self._window_start(now)
+        self._expire(window_start)
+        dirty, self._dirty = self._dirty, set()
+        try:
+            async with self.session_factory() as session:
+                db_now = await session.scalar(text("SELECT now()"))
+                if dirty:
+                    statement = insert(TrendingSketch)
+                    await session.execute(
+                        statement.on_conflict_do_update(
+                            index_elements=["worker_id", "scope", "slot"],
+                            set_={"counts": statement.excluded.counts, "updated_at": statement.excluded.updated_at}
+                        ),
+                        [
+                            {
+                                "worker_id": self.worker_id,
+                                "scope": scope,
+                                "slot": slot,
+                                "counts": {str(item): count for item, count in self._local[(scope, slot)].counts.items()},
+                                "updated_at": db_now,
+                            }
+                            for scope, slot in sorted(dirty)
+                        ]
+                    )
+                await session.execute(
+                    text("DELETE FROM trending_sketches WHERE slot < :window_start"), {"window_start": window_start}
+                )
+                # Rows committed just before our previous read may carry an
+                # older updated_at, so read back one extra interval
+                since = self._since - timedelta(seconds=self.sync_interval) if self._since else window_start
+                rows = (await session.execute(text(REMOTE_SKETCHES_SQL), {
+                    "worker_id": self.worker_id, "window_start": window_start, "since": since
+                })).all()
+                await session.commit()
+                for row in rows:
+                    counts = {int(item): count for item, count in row.counts.items()}
+                    self._remote[(row.worker_id, row.scope, row.slot)] = SpaceSaving(self.capacity, counts)
+                self._since = db_now
+                await self._refresh(session)
+        except Exception:
+            self._dirty |= dirty
+            trending_sync_failures_total.inc()
+            raise
+
+    async def _refresh(self, session):
+        self._taman_ids = {row.id for row in await session.execute(text(TAMAN_IDS_SQL))}
+        by_scope: Dict[int, List[SpaceSaving]] = {}
+        for (scope, _), sketch in self._local.items():
+            by_scope.setdefault(scope, []).append(sketch)
+        for (_, scope, _), sketch in self._remote.items():
+            by_scope.setdefault(scope, []).append(sketch)
+        tops = {
+            scope: SpaceSaving.merged(sketches, self.capacity).top(MAX_TRENDING * 2)
+            for scope, sketches in by_scope.items()
+        }
+        ids = sorted({item for top in tops.values() for item, _ in top})
+        koleksi = {}
+        if ids:
+            koleksi = {row.id: row for row in await session.execute(text(TITLES_SQL), {"ids": ids})}
+        # Unpublished koleksi, and views counted under a taman the koleksi
+        # does not belong to, are left out
+        self._trending = {
+            scope: [
+                TopView(id=item, title=koleksi[item].nama_ilmiah, view_count=count, entity_type="koleksi")
+                for item, count in top
+                if item in koleksi and scope in (ALL_TAMAN, koleksi[item].taman_kehati_id)
+            ][:MAX_TRENDING]
+            for scope, top in tops.items()
+        }
+        self.refreshed_at = datetime.now(timezone.utc)
+
+    async def _sync_forever(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            started = time.perf_counter()
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Trending sketch sync failed: {str(e)}")
+            trending_sync_seconds.observe(time.perf_counter() - started)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+trending_koleksi = TrendingKoleksi(
+    AsyncSessionLocal,
+    window_seconds=settings.TRENDING_WINDOW_SECONDS,
+    slot_seconds=settings.TRENDING_SLOT_SECONDS,
+    sync_interval=settings.TRENDING_SYNC_SECONDS,
+    capacity=settings.TRENDING_CAPACITY
+)
@@ -0,0 +1,220 @@
+"""
+Buffered ingestion of page views.
+
+POST /api/views/track validates the event and puts it on a bounded in-memory
+queue, then returns 202 without touching the database. A background task
+writes queued views to page_views in one multi-row INSERT per batch, as soon
+as VIEW_INGEST_BATCH_SIZE views are queued or VIEW_INGEST_FLUSH_MS after the
+first view of the batch arrived, and drains the queue on graceful shutdown.
+The same transaction adds the batch to the page-view rollups
+(app/services/view_rollups.py) and unique-visitor sketches
+(app/services/view_uniques.py).
+
+Ingestion is best effort: when the queue is full new views are dropped, and
+a write failing for other reasons than the rows themselves (e.g. the database
+being unreachable) drops its batch. Views naming a taman or koleksi that does
+not exist are dropped before the INSERT, and a batch rejected by a constraint
+is retried in halves, so one bad view never costs other clients theirs. All
+drops are counted in /metrics by reason.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.database import AsyncSessionLocal
+from app.models import KoleksiTumbuhan, PageViews, TamanKehati
+from app.services.view_rollups import upsert_rollups
+from app.services.view_uniques import upsert_unique_sketches
+from app.settings import settings
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+page_views_written_total = registry.counter("page_views_written_total", "Page views written to page_views")
+page_views_dropped_total = registry.counter(
+    "page_views_dropped_total", "Page views dropped before reaching page_views", ("reason",)
+)
+page_view_batch_size = registry.histogram(
+    "page_view_batch_size", "Page views written per INSERT",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+
+
+class ViewIngestor:
+    """Bounded queue of page views, written to page_views in batches"""
+
+    def __init__(self, session_factory, capacity: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=capacity)
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = []
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        """Call ``await listener(views)`` after each committed batch"""
+        self._listeners.append(listener)
+
+    def submit(self, view: Dict[str, Any]) -> bool:
+        """Queue a page_views row; False if it was dropped because the queue is full"""
+        view.setdefault("created_at", datetime.now(timezone.utc))
+        try:
+            self._queue.put_nowait(view)
+        except asyncio.QueueFull:
+            page_views_dropped_total.inc(reason="queue_full")
+            return False
+        return True
+
+    def submit_many(self, views: List[Dict[str, Any]]) -> int:
+        """
+        Queue several rows at once; they are written by the same INSERT unless
+        they straddle a batch boundary. Returns the number accepted.
+        """
+        created_at = datetime.now(timezone.utc)
+        free = self._queue.maxsize - self._queue.qsize()
+        for view in views[:free]:
+            view.setdefault("created_at", created_at)
+            self._queue.put_nowait(view)
+        if len(views) > free:
+            page_views_dropped_total.inc(len(views) - free, reason="queue_full")
+        return min(len(views), free)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def write(self, views: List[Dict[str, Any]]) -> int:
+        """
+        Insert ``views``, in one statement unless a constraint rejects the
+        batch; views that cannot be written are counted as dropped
+        """
+        if not views:
+            return 0
+        written: List[Dict[str, Any]] = []
+        try:
+            known = await self._drop_unknown_entities(views)
+            await self._write(known, written)
+        except Exception:
+            page_views_dropped_total.inc(len(views) - len(written), reason="write_failed")
+            raise
+        finally:
+            if written:
+                page_views_written_total.inc(len(written))
+                page_view_batch_size.observe(len(written))
+        for listener in self._listeners:
+            try:
+                await listener(written)
+            except Exception as e:
+                logger.error(f"Page view listener {getattr(listener, '__qualname__', listener)} failed: {str(e)}")
+        return len(written)
+
+    async def _drop_unknown_entities(self, views: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``views`` without those naming a taman or koleksi that does not exist"""
+        taman_ids = {view["taman_kehati_id"] for view in views if view.get("taman_kehati_id")}
+        koleksi_ids = {view["koleksi_tumbuhan_id"] for view in views if view.get("koleksi_tumbuhan_id")}
+        async with self.session_factory() as session:
+            if taman_ids:
+                result = await session.execute(select(TamanKehati.id).where(TamanKehati.id.in_(taman_ids)))
+                taman_ids = {row[0] for row in result}
+            if koleksi_ids:
+                result = await session.execute(select(KoleksiTumbuhan.id).where(KoleksiTumbuhan.id.in_(koleksi_ids)))
+                koleksi_ids = {row[0] for row in result}
+        known = [
+            view for view in views
+            if (not view.get("taman_kehati_id") or view["taman_kehati_id"] in taman_ids)
+            and (not view.get("koleksi_tumbuhan_id") or view["koleksi_tumbuhan_id"] in koleksi_ids)
+        ]
+        if len(known) < len(views):
+            page_views_dropped_total.inc(len(views) - len(known), reason="unknown_entity")
+        return known
+
+    async def _write(self, views: List[Dict[str, Any]], written: List[Dict[str, Any]]):
+        """Write ``views`` in one transaction, or in halves if a row breaks a constraint"""
+        if not views:
+            return
+        try:
+            async with self.session_factory() as session:
+                await session.execute(insert(PageViews), views)
+                await upsert_rollups(session, views)
+                await upsert_unique_sketches(session, views)
+                await session.commit()
+        except (DataError, IntegrityError) as e:
+            if len(views) == 1:
+                page_views_dropped_total.inc(reason="rejected")
+                logger.warning(f"Page view rejected by the database: {str(e).splitlines()[0]}")
+                return
+            middle = len(views) // 2
+            await self._write(views[:middle], written)
+            await self._write(views[middle:], written)
+            return
+        written.extend(views)
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Up to batch_size views, waiting at most flush_interval after the first one"""
+        batch: List[Dict[str, Any]] = []
+        while not batch:
+            if self._closing and self._queue.empty():
+                return batch
+            view = await self._queue.get()
+            if view is not None:
+                batch.append(view)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0 or self._closing:
+                    break
+                try:
+                    view = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                view = self._queue.get_nowait()
+            if view is not None:
+                batch.append(view)
+        return batch
+
+    async def _run_forever(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.write(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} page views: {str(e)}")
+            if self._closing and self._queue.empty():
+                return
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Write everything still queued, then stop the background task"""
+        if self._task is None:
+            return
+        self._closing = True
+        try:
+            # Wake the task if it is waiting for the first view of a batch
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+        await self._task
+        self._task = None
+
+
+view_ingestor = ViewIngestor(
+    AsyncSessionLocal,
+    capacity=settings.VIEW_INGEST_QUEUE_SIZE,
+    batch_size=settings.VIEW_INGEST_BATCH_SIZE,
+    flush_interval=settings.VIEW_INGEST_FLUSH_MS / 1000
+)
+
+registry.gauge("page_view_queue_depth", "Page views waiting to be written to page_views").set_function(
+    view_ingestor.pending
+)
@@ -0,0 +1,165 @@
+"""
+Page-view rollups.
+
+Every view counts towards each entity it concerns: its taman, its koleksi,
+and the artikel encoded in an ``artikel-<id>`` page_type. page_view_rollup_hourly
+and page_view_rollup_daily hold the number of views per (entity type, entity
+id, page_type) and UTC hour or day. The view ingestor upserts both in the
+same transaction as the raw page_views insert, so dashboards never read
+page_views itself.
+
+page_views stays the source of truth: rebuild_rollups() recomputes a range
+of days from it, for views that reached the table some other way (imports,
+backfills, the rollups being introduced after the fact).
+"""
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import PageViewRollupDaily, PageViewRollupHourly
+
+ROLLUP_ENTITY_TYPES = ("taman", "koleksi", "artikel")
+ARTIKEL_PAGE_TYPE = re.compile(r"^artikel-(\d{1,9})$")
+
+REBUILD_ROLLUPS_SQL = (
+    # Hold off concurrent ingestion so its views are counted exactly once
+    "LOCK TABLE page_view_rollup_hourly, page_view_rollup_daily IN EXCLUSIVE MODE",
+    "DELETE FROM page_view_rollup_hourly WHERE bucket >= :start AND bucket < :end",
+    "DELETE FROM page_view_rollup_daily WHERE bucket >= :start AND bucket < :end",
+    """
+    INSERT INTO page_view_rollup_hourly (entity_type, entity_id, bucket, page_type, views)
+    SELECT e.entity_type, e.entity_id,
+        date_trunc('hour', pv.created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        pv.page_type, count(*)
+    FROM page_views pv
+    CROSS JOIN LATERAL (VALUES
+        ('taman', pv.taman_kehati_id),
+        ('koleksi', pv.koleksi_tumbuhan_id),
+        ('artikel', CASE WHEN pv.page_type ~ '^artikel-[0-9]{1,9}$' THEN substr(pv.page_type, 9)::integer END)
+    ) AS e(entity_type, entity_id)
+    WHERE e.entity_id IS NOT NULL AND pv.created_at >= :start AND pv.created_at < :end
+    GROUP BY 1, 2, 3, 4
+    """,
+    """
+    INSERT INTO page_view_rollup_daily (entity_type, entity_id, bucket, page_type, views)
+    SELECT entity_type, entity_id, date_trunc('day', bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', page_type, sum(views)
+    FROM page_view_rollup_hourly
+    WHERE bucket >= :start AND bucket < :end
+    GROUP BY 1, 2, 3, 4
+    """,
+)
+
+
+def view_entities(view: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """The (entity type, id) pairs a page_views row counts towards"""
+    entities = []
+    if view.get("taman_kehati_id"):
+        entities.append(("taman", view["taman_kehati_id"]))
+    if view.get("koleksi_tumbuhan_id"):
+        entities.append(("koleksi", view["koleksi_tumbuhan_id"]))
+    match = ARTIKEL_PAGE_TYPE.match(view.get("page_type") or "")
+    if match:
+        entities.append(("artikel", int(match.group(1))))
+    return entities
+
+
+def _utc(moment: datetime) -> datetime:
+    """Naive datetimes (datetime.utcnow()) are taken to be UTC"""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return _utc(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment: datetime) -> datetime:
+    return floor_hour(moment).replace(hour=0)
+
+
+def _ceil(moment: datetime, floor, step: timedelta) -> datetime:
+    floored = floor(moment)
+    return floored if floored == _utc(moment) else floored + step
+
+
+def rollup_counts(views: Iterable[Dict[str, Any]]) -> Tuple[Counter, Counter]:
+    """Hourly and daily view counts of a batch of page_views rows"""
+    hourly: Counter = Counter()
+    for view in views:
+        bucket = floor_hour(view["created_at"])
+        for entity_type, entity_id in view_entities(view):
+            hourly[(entity_type, entity_id, bucket, view["page_type"])] += 1
+    daily: Counter = Counter()
+    for (entity_type, entity_id, bucket, page_type), count in hourly.items():
+        daily[(entity_type, entity_id, bucket.replace(hour=0), page_type)] += count
+    return hourly, daily
+
+
+async def upsert_rollups(session, views: List[Dict[str, Any]]):
+    """Add a batch of page_views rows to the rollups, within the caller's transaction"""
+    for model, counts in zip((PageViewRollupHourly, PageViewRollupDaily), rollup_counts(views)):
+        if not counts:
+            continue
+        # Sorted so concurrent writers lock rollup rows in the same order
+        rows = [
+            {"entity_type": key[0], "entity_id": key[1], "bucket": key[2], "page_type": key[3], "views": count}
+            for key, count in sorted(counts.items())
+        ]
+        statement = insert(model)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["entity_type", "entity_id", "bucket", "page_type"],
+                set_={"views": model.views + statement.excluded.views}
+            ),
+            rows
+        )
+
+
+async def rebuild_rollups(session, start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """Recompute the rollups of the whole UTC days covering [start, end) from page_views"""
+    params = {"start": floor_day(start), "end": _ceil(end, floor_day, timedelta(days=1))}
+    for statement in REBUILD_ROLLUPS_SQL:
+        await session.execute(text(statement), params)
+    await session.commit()
+    return params["start"], params["end"]
+
+
+def rollup_source_sql(entity_id: bool = True) -> str:
+    """
+    Subquery of (entity_id, bucket, views) rows covering :rollup_start to
+    :rollup_end for :entity_type (and :entity_id): whole days from the daily
+    rollup, the partial days at either end from the hourly one.
+    """
+    entity_filter = "entity_type = :entity_type" + (" AND entity_id = :entity_id" if entity_id else "")
+    return f"""(
+        SELECT entity_id, bucket, views FROM page_view_rollup_daily
+        WHERE {entity_filter} AND bucket >= :rollup_day_start AND bucket < :rollup_day_end
+        UNION ALL
+        SELECT entity_id, bucket, views FROM page_view_rollup_hourly
+        WHERE {entity_filter} AND (
+            (bucket >= :rollup_start AND bucket < :rollup_day_start)
+            OR (bucket >= :rollup_day_end AND bucket < :rollup_end)
+        )
+    )"""
+
+
+def rollup_params(start: datetime, end: datetime) -> Dict[str, datetime]:
+    """Parameters of rollup_source_sql; the range is widened to whole hours"""
+    rollup_start = floor_hour(start)
+    rollup_end = _ceil(end, floor_hour, timedelta(hours=1))
+    day_start = _ceil(rollup_start, floor_day, timedelta(days=1))
+    day_end = floor_day(rollup_end)
+    if day_start >= day_end:
+        # No whole day in range: everything comes from the hourly rollup
+        day_start = day_end = rollup_end
+    return {
+        "rollup_start": rollup_start,
+        "rollup_end": rollup_end,
+        "rollup_day_start": day_start,
+        "rollup_day_end": day_end,
+    }
@@ -0,0 +1,140 @@
+"""
+Unique visitors per entity and day.
+
+page_view_unique_daily holds one HyperLogLog sketch (app/utils/hyperloglog.py)
+of the visitors of each entity per UTC day, next to the view rollups. A
+visitor is identified by session_id, or by ip_address and user_agent when
+the client sent no session; views with neither are not counted. The view
+ingestor merges each batch into the sketches in the same transaction as the
+raw insert, and /views/series?metric=unique merges the daily sketches of an
+interval, so weekly and monthly figures count a returning visitor once.
+Estimates are within about 2.3% (one standard error) of the exact count.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import PageViewUniqueDaily
+from app.services.view_rollups import floor_day, view_entities
+from app.utils.hyperloglog import HyperLogLog
+
+SketchKey = Tuple[str, int, datetime]
+
+# page_views rows fetched at a time while rebuilding
+REBUILD_FETCH_SIZE = 5000
+
+UNIQUE_SERIES_SQL = """
+    SELECT DATE_TRUNC(:interval, day) AS date, sketch
+    FROM page_view_unique_daily
+    WHERE entity_type = :entity_type AND entity_id = :entity_id AND day >= :start AND day < :end
+    ORDER BY day
+"""
+REBUILD_VIEWS_SQL = """
+    SELECT taman_kehati_id, koleksi_tumbuhan_id, page_type, session_id, ip_address, user_agent, created_at
+    FROM page_views
+    WHERE created_at >= :start AND created_at < :end
+"""
+
+
+def visitor_key(view: Dict[str, Any]) -> Optional[str]:
+    if view.get("session_id"):
+        return f"s:{view['session_id']}"
+    if view.get("ip_address"):
+        return f"a:{view['ip_address']}|{view.get('user_agent') or ''}"
+    return None
+
+
+def add_views(sketches: Dict[SketchKey, HyperLogLog], views: Iterable[Dict[str, Any]]):
+    """Add the visitors in ``views`` to a defaultdict of sketches per (entity type, entity id, day)"""
+    for view in views:
+        visitor = visitor_key(view)
+        if visitor is None:
+            continue
+        day = floor_day(view["created_at"])
+        for entity_type, entity_id in view_entities(view):
+            sketches[(entity_type, entity_id, day)].add(visitor)
+
+
+def build_sketches(views: Iterable[Dict[str, Any]]) -> Dict[SketchKey, HyperLogLog]:
+    """Sketches of the visitors in ``views`` per (entity type, entity id, day)"""
+    sketches: Dict[SketchKey, HyperLogLog] = defaultdict(HyperLogLog)
+    add_views(sketches, views)
+    return sketches
+
+
+def _rows(sketches: Dict[SketchKey, HyperLogLog]) -> List[Dict[str, Any]]:
+    return [
+        {"entity_type": key[0], "entity_id": key[1], "day": key[2], "sketch": sketch.to_bytes()}
+        for key, sketch in sorted(sketches.items())
+    ]
+
+
+async def upsert_unique_sketches(session, views: List[Dict[str, Any]]):
+    """Merge a batch of page_views rows into the daily sketches, within the caller's transaction"""
+    sketches = build_sketches(views)
+    if not sketches:
+        return
+    keys = sorted(sketches)
+    # Make sure every row exists, then lock them in key order so concurrent
+    # writers neither lose each other's visitors nor deadlock
+    empty = HyperLogLog().to_bytes()
+    await session.execute(
+        insert(PageViewUniqueDaily).on_conflict_do_nothing(),
+        [{"entity_type": t, "entity_id": i, "day": d, "sketch": empty} for t, i, d in keys]
+    )
+    stored = await session.execute(
+        select(PageViewUniqueDaily.entity_type, PageViewUniqueDaily.entity_id, PageViewUniqueDaily.day, PageViewUniqueDaily.sketch)
+        .where(tuple_(PageViewUniqueDaily.entity_type, PageViewUniqueDaily.entity_id, PageViewUniqueDaily.day).in_(keys))
+        .order_by(PageViewUniqueDaily.entity_type, PageViewUniqueDaily.entity_id, PageViewUniqueDaily.day)
+        .with_for_update()
+    )
+    for entity_type, entity_id, day, sketch in stored:
+        sketches[(entity_type, entity_id, day)].merge(HyperLogLog.from_bytes(sketch))
+    await session.execute(update(PageViewUniqueDaily), _rows(sketches))
+
+
+async def rebuild_unique_sketches(session, start: datetime, end: datetime):
+    """
+    Recompute the sketches of the UTC days in [start, end) from page_views;
+    both must be day boundaries. Each day is streamed into its sketches and
+    committed on its own, so memory is bounded by one day's sketches.
+    """
+    day = start
+    while day < end:
+        params = {"start": day, "end": day + timedelta(days=1)}
+        await session.execute(text("LOCK TABLE page_view_unique_daily IN EXCLUSIVE MODE"))
+        await session.execute(text("DELETE FROM page_view_unique_daily WHERE day >= :start AND day < :end"), params)
+        sketches: Dict[SketchKey, HyperLogLog] = defaultdict(HyperLogLog)
+        result = await session.stream(text(REBUILD_VIEWS_SQL), params)
+        async for views in result.mappings().partitions(REBUILD_FETCH_SIZE):
+            add_views(sketches, views)
+        if sketches:
+            await session.execute(insert(PageViewUniqueDaily), _rows(sketches))
+        await session.commit()
+        day = params["end"]
+
+
+async def unique_series(
+    session, entity_type: str, entity_id: int, start: datetime, end: datetime, interval: str
+) -> Tuple[List[Tuple[datetime, int]], int]:
+    """
+    Estimated unique visitors per ``interval`` over the UTC days touching
+    [start, end), and over the whole range
+    """
+    rows = await session.execute(text(UNIQUE_SERIES_SQL), {
+        "interval": interval,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "start": floor_day(start),
+        "end": end,
+    })
+    merged: Dict[datetime, HyperLogLog] = {}
+    total = HyperLogLog()
+    for date, sketch in rows:
+        sketch = HyperLogLog.from_bytes(sketch)
+        merged.setdefault(date, HyperLogLog()).merge(sketch)
+        total.merge(sketch)
+    return [(date, sketch.count()) for date, sketch in merged.items()], total.count() if merged else 0
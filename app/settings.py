@@ -9,12 +9,86 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Sign role, taman_kehati_id and is_active into access tokens so requests
+    # are authorized without a users lookup. Revocation is enforced on refresh
+    # (token_version) and by an in-process revocation set, so keep
+    # ACCESS_TOKEN_EXPIRE_MINUTES short when enabling this.
+    AUTH_SELF_CONTAINED_TOKENS: bool = False
+
+    # get_current_user cache; bounds how long a deactivated user keeps access
+    # through another worker
+    USER_CACHE_MAXSIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 30
+
+    # bcrypt runs on a dedicated thread pool; once this many hashes are
+    # running or queued, further logins are rejected with 429
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     DATABASE_URL: str
     ASYNC_DATABASE_URL: Optional[str] = None   # <-- tambahkan ini
 
     CORS_ORIGINS: List[str] | str = []
 
+    # Dirty entities are written to search_index every interval, or as soon as
+    # a full batch is pending
+    SEARCH_INDEX_FLUSH_INTERVAL_SECONDS: float = 1.0
+    SEARCH_INDEX_BATCH_SIZE: int = 500
+    # How often each worker checks for search_index changes made by others
+    SEARCH_INDEX_POLL_MS: int = 500
+    # Entities copied per transaction by the background full reindex
+    SEARCH_REINDEX_CHUNK_SIZE: int = 1000
+
+    # Full rebuild interval of the in-memory typeahead index; CRUD changes are
+    # applied incrementally in between
+    SUGGEST_REBUILD_INTERVAL_SECONDS: float = 600
+    # Facet counts of searches matching more rows than this are estimated
+    # from a random sample of this size
+    SEARCH_FACET_SAMPLE_SIZE: int = 10000
+    # Memory budget of the search/suggest result cache; 0 disables it
+    SEARCH_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    SEARCH_CACHE_TTL_SECONDS: float = 60
+
+    # Search requests are buffered in memory (oldest dropped beyond the buffer
+    # size) and written to search_query_log every flush interval;
+    # search_query_stats is rebuilt from the log every stats interval
+    SEARCH_QUERY_LOG_BUFFER_SIZE: int = 10000
+    SEARCH_QUERY_LOG_FLUSH_SECONDS: float = 5.0
+    SEARCH_QUERY_STATS_INTERVAL_SECONDS: float = 300
+    SEARCH_QUERY_LOG_RETENTION_DAYS: int = 90
+    # Tracked page views are queued (at most QUEUE_SIZE) and written in
+    # batches of up to BATCH_SIZE, at the latest FLUSH_MS after arriving
+    VIEW_INGEST_QUEUE_SIZE: int = 10000
+    VIEW_INGEST_BATCH_SIZE: int = 500
+    VIEW_INGEST_FLUSH_MS: int = 1000
+    # Limits of POST /api/views/track/batch (sendBeacon caps bodies at 64 KiB)
+    VIEW_BATCH_MAX_EVENTS: int = 200
+    VIEW_BATCH_MAX_BYTES: int = 65536
+    # Monthly page_views partitions: how many months to create ahead, how many
+    # past months to keep (0 keeps everything), and where to move expired
+    # partitions instead of dropping them
+    PAGE_VIEW_PARTITIONS_AHEAD: int = 3
+    PAGE_VIEW_RETENTION_MONTHS: int = 24
+    PAGE_VIEW_ARCHIVE_SCHEMA: Optional[str] = None
+    PAGE_VIEW_PARTITION_CHECK_SECONDS: float = 86400
+    # Trending koleksi: window length, slot granularity, how often workers
+    # exchange their counts, and items kept per Space-Saving sketch
+    TRENDING_WINDOW_SECONDS: int = 3600
+    TRENDING_SLOT_SECONDS: int = 300
+    TRENDING_SYNC_SECONDS: float = 5.0
+    TRENDING_CAPACITY: int = 200
+    # Per-taman cache of /taman-kehati stats
+    TAMAN_STATS_CACHE_SIZE: int = 2000
+    TAMAN_STATS_CACHE_TTL_SECONDS: float = 300
+
+    # Optional bearer token protecting /metrics
+    METRICS_TOKEN: Optional[str] = None
+
+    # /readyz re-validates DB capabilities in the background at this interval
+    READINESS_TTL_SECONDS: float = 30
+    # Report not-ready once this fraction of pool_size + max_overflow is checked out
+    READINESS_POOL_SATURATION_THRESHOLD: float = 0.9
+
     @field_validator("CORS_ORIGINS", mode="after")
     @classmethod
     def ensure_list(cls, v):
@@ -0,0 +1,140 @@
+"""
+Small in-process caches
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire ``ttl`` seconds after being set.
+
+    When ``maxsize`` entries are stored the least recently used one is evicted.
+    Thread-safe; ``hits`` and ``misses`` are kept for metrics.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= self.timer():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and entry[0] > self.timer()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SizedLRUCache:
+    """
+    LRU cache bounded by the total estimated size of its values, with
+    generation-based invalidation and, with ``ttl``, entries expiring ``ttl``
+    seconds after being set.
+
+    ``invalidate()`` empties the cache and bumps ``generation``. Callers read
+    the generation before computing a value and pass it to ``set``; a value
+    computed from data that changed meanwhile is then discarded instead of
+    being cached. Not thread-safe; meant for use from the event loop.
+    """
+
+    def __init__(
+        self, max_bytes: int, sizeof: Callable[[Any], int], ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.timer = timer
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING and entry[2] is not None and entry[2] <= self.timer():
+            del self._data[key]
+            self.bytes -= entry[0]
+            entry = _MISSING
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation:
+            return
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        previous = self._data.pop(key, _MISSING)
+        if previous is not _MISSING:
+            self.bytes -= previous[0]
+        expires_at = None if self.ttl is None else self.timer() + self.ttl
+        self._data[key] = (size, value, expires_at)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (evicted_size, _, _) = self._data.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self):
+        self.generation += 1
+        self._data.clear()
+        self.bytes = 0
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._data)
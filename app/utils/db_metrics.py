@@ -0,0 +1,177 @@
+"""
+Database instrumentation: per-route query counts and DB time, pool checkout
+latency and overflow usage, and a slow-query log.
+
+Request-scoped counters live in a context variable set by DbMetricsMiddleware,
+so SQLAlchemy event hooks can attribute each query to the route being served.
+"""
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.utils.logging_config import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+NO_ROUTE = "none"
+
+db_queries_total = registry.counter(
+    "db_queries_total", "Number of SQL statements executed", ("route",)
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+db_time_per_request = registry.histogram(
+    "db_time_per_request_seconds", "Total time spent in SQL statements per HTTP request", ("route",)
+)
+db_pool_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection", ("pool", "route")
+)
+db_pool_checkout_timeouts_total = registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up because the pool was exhausted", ("pool",)
+)
+db_pool_overflow_checkouts_total = registry.counter(
+    "db_pool_overflow_checkouts_total", "Checkouts served by an overflow connection", ("pool",)
+)
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ("pool",)
+)
+db_pool_overflow = registry.gauge(
+    "db_pool_overflow", "Overflow connections currently open beyond pool_size", ("pool",)
+)
+db_pool_capacity = registry.gauge(
+    "db_pool_capacity", "pool_size + max_overflow", ("pool",)
+)
+db_slow_queries_total = registry.counter(
+    "db_slow_queries_total", "SQL statements slower than the slow-query threshold", ("route",)
+)
+
+
+class RequestDbStats:
+    """DB usage accumulated while serving one HTTP request"""
+
+    __slots__ = ("scope", "queries", "db_time")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+_request_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_route() -> str:
+    stats = _request_stats.get()
+    return stats.route if stats is not None else NO_ROUTE
+
+
+class DbMetricsMiddleware:
+    """ASGI middleware that records per-route DB statistics for each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats(scope)
+        token = _request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_stats.reset(token)
+            route = stats.route
+            db_queries_per_request.observe(stats.queries, route=route)
+            db_time_per_request.observe(stats.db_time, route=route)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        name = self.logging_name or "primary"
+        overflow_before = self.overflow()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            db_pool_checkout_timeouts_total.inc(pool=name)
+            raise
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - started, pool=name, route=current_route())
+        # overflow() counts up from -pool_size; a positive increase means a
+        # connection beyond pool_size was opened for this checkout
+        if self.overflow() > max(overflow_before, 0):
+            db_pool_overflow_checkouts_total.inc(pool=name)
+        return connection
+
+
+def _parameter_shape(parameters: Any) -> str:
+    """Describe bound parameters by name and type, never by value"""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"{len(parameters)} x {_parameter_shape(parameters[0])}"
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _compact_statement(statement: str, limit: int = 1000) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def instrument_engine(async_engine, name: str, slow_query_threshold_ms: float):
+    """Attach query timing, slow-query logging and pool gauges to an async engine"""
+    sync_engine = async_engine.sync_engine
+    pool = sync_engine.pool
+    threshold = slow_query_threshold_ms / 1000.0
+
+    db_pool_checked_out.set_function(lambda: sync_engine.pool.checkedout(), pool=name)
+    db_pool_overflow.set_function(lambda: max(sync_engine.pool.overflow(), 0), pool=name)
+    if hasattr(pool, "size") and hasattr(pool, "_max_overflow"):
+        db_pool_capacity.set(pool.size() + pool._max_overflow, pool=name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        stats = _request_stats.get()
+        route = stats.route if stats is not None else NO_ROUTE
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+        db_queries_total.inc(route=route)
+
+        if elapsed >= threshold:
+            db_slow_queries_total.inc(route=route)
+            logger.warning(
+                "Slow query (%.1f ms) on %s route=%s params=%s statement=%s",
+                elapsed * 1000, name, route, _parameter_shape(parameters), _compact_statement(statement)
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
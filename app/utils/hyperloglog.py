@@ -0,0 +1,64 @@
+"""
+HyperLogLog cardinality sketch
+"""
+import hashlib
+import math
+import zlib
+from typing import Iterable, Optional
+
+DEFAULT_PRECISION = 11
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count estimator using 2**precision one-byte registers.
+
+    The relative standard error is about 1.04 / sqrt(2**precision): 2.3% at
+    the default precision of 11 (2048 registers), so 95% of estimates fall
+    within 4.6% of the true count. Small cardinalities use linear counting
+    and are close to exact. Sketches of the same precision merge losslessly:
+    the merge of two sketches estimates the size of the union.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value: str):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remainder_bits = 64 - self.precision
+        remainder = hashed & ((1 << remainder_bits) - 1)
+        rank = remainder_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        """Compact serialized form: the precision followed by the zlib-compressed registers"""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(data[0], zlib.decompress(data[1:]))
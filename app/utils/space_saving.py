@@ -0,0 +1,46 @@
+"""
+Space-Saving heavy-hitters sketch
+"""
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+class SpaceSaving:
+    """
+    Approximate top-k counter keeping at most ``capacity`` items.
+
+    When a new item arrives and the sketch is full, it replaces the item with
+    the smallest count and inherits that count, so counts may overestimate by
+    at most the smallest count in the sketch. Any item seen more than
+    total / capacity times is guaranteed to be present.
+    """
+
+    def __init__(self, capacity: int = 100, counts: Dict[Hashable, int] = None):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = dict(counts or {})
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def offer(self, item: Hashable, count: int = 1):
+        if item in self.counts or len(self.counts) < self.capacity:
+            self.counts[item] = self.counts.get(item, 0) + count
+            return
+        smallest = min(self.counts, key=self.counts.get)
+        self.counts[item] = self.counts.pop(smallest) + count
+
+    def merge(self, other: "SpaceSaving"):
+        """Add another sketch's counts, keeping the ``capacity`` largest"""
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, 0) + count
+        if len(self.counts) > self.capacity:
+            self.counts = dict(self.top(self.capacity))
+
+    def top(self, k: int) -> List[Tuple[Hashable, int]]:
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    @classmethod
+    def merged(cls, sketches: Iterable["SpaceSaving"], capacity: int) -> "SpaceSaving":
+        result = cls(capacity)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
@@ -0,0 +1,38 @@
+from typing import Any, Callable, List, Optional
+
+import pytest
+
+
+class FakeSession:
+    """
+    Stand-in for an AsyncSession and its ``async with`` context.
+
+    Every ``execute`` is appended to ``log`` as (statement, params). ``on_execute``,
+    when given, is called with the same arguments first; it may raise to
+    simulate a database error, and what it returns is the statement's result.
+    """
+
+    def __init__(self, log: Optional[List[tuple]] = None, on_execute: Optional[Callable[[Any, Any], Any]] = None):
+        self.log = [] if log is None else log
+        self.on_execute = on_execute
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        result = self.on_execute(statement, params) if self.on_execute else None
+        self.log.append((statement, params))
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def fake_session():
+    """The FakeSession class, for services taking a session or session factory"""
+    return FakeSession
@@ -0,0 +1,88 @@
+from app.utils.cache import SizedLRUCache, TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    """Entries are served until their TTL elapses."""
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    cache.set("admin@example.com", "user")
+
+    timer.now = 29
+    assert cache.get("admin@example.com") == "user"
+
+    timer.now = 30
+    assert cache.get("admin@example.com") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    """When full, the least recently used entry is evicted."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_pop_invalidates_entry():
+    """pop removes an entry so the next lookup misses."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.get("a") is None
+
+
+def test_sized_cache_evicts_least_recently_used_to_fit_budget():
+    """Entries are evicted oldest-first once their total size exceeds max_bytes."""
+    cache = SizedLRUCache(max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.get("a")
+    cache.set("c", "xxxx")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx"
+    assert cache.get("c") == "xxxx"
+    assert cache.bytes == 8
+    assert cache.evictions == 1
+
+
+def test_sized_cache_discards_values_from_an_older_generation():
+    """A value computed before invalidate() is not cached."""
+    cache = SizedLRUCache(max_bytes=100, sizeof=len)
+    cache.set("a", "old")
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("b", "stale", generation)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.bytes == 0
+
+
+def test_sized_cache_entries_expire_after_ttl():
+    """With a ttl, entries are dropped, and their size released, once it elapses."""
+    timer = FakeTimer()
+    cache = SizedLRUCache(max_bytes=100, sizeof=len, ttl=60, timer=timer)
+    cache.set("a", "xxxx")
+
+    timer.now = 59
+    assert cache.get("a") == "xxxx"
+
+    timer.now = 60
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+    assert len(cache) == 0
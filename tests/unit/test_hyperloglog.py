@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from app.utils.hyperloglog import HyperLogLog
+
+# Three standard errors at the default precision (1.04 / sqrt(2048))
+TOLERANCE = 3 * 1.04 / 2048 ** 0.5
+
+
+@pytest.mark.parametrize("cardinality", [50, 1000, 20000, 200000])
+def test_estimate_is_within_error_bound_of_exact_count(cardinality):
+    rng = random.Random(cardinality)
+    visitors = [f"session-{rng.getrandbits(64)}" for _ in range(cardinality)]
+    sketch = HyperLogLog()
+    # Repeat visits must not be counted twice
+    sketch.update(visitors + rng.sample(visitors, cardinality // 2))
+
+    exact = len(set(visitors))
+    assert abs(sketch.count() - exact) <= TOLERANCE * exact
+
+
+def test_merge_estimates_the_union_and_survives_serialization():
+    monday, tuesday = HyperLogLog(), HyperLogLog()
+    monday.update(f"visitor-{i}" for i in range(0, 6000))
+    tuesday.update(f"visitor-{i}" for i in range(4000, 10000))
+
+    week = HyperLogLog.from_bytes(monday.to_bytes())
+    week.merge(HyperLogLog.from_bytes(tuesday.to_bytes()))
+    assert abs(week.count() - 10000) <= TOLERANCE * 10000
+    assert len(monday.to_bytes()) < monday.m
+
+
+def test_precision_mismatch_cannot_merge():
+    with pytest.raises(ValueError):
+        HyperLogLog(11).merge(HyperLogLog(12))
@@ -0,0 +1,44 @@
+from app.utils.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_in_prometheus_format():
+    """Counters and gauges render HELP/TYPE headers and labelled samples."""
+    registry = MetricsRegistry()
+    queries = registry.counter("db_queries_total", "Queries", ("route",))
+    queries.inc(route="/api/taman/")
+    queries.inc(2, route="/api/taman/")
+    registry.gauge("db_pool_checked_out", "Checked out", ("pool",)).set_function(lambda: 4, pool="primary")
+
+    output = registry.render()
+
+    assert "# TYPE db_queries_total counter" in output
+    assert 'db_queries_total{route="/api/taman/"} 3' in output
+    assert 'db_pool_checked_out{pool="primary"} 4' in output
+
+
+def test_histogram_buckets_are_cumulative():
+    """Histogram buckets are cumulative and end with +Inf, _sum and _count."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("db_time_seconds", "DB time", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route="/x")
+
+    output = registry.render()
+
+    assert 'db_time_seconds_bucket{route="/x",le="0.1"} 1' in output
+    assert 'db_time_seconds_bucket{route="/x",le="1"} 2' in output
+    assert 'db_time_seconds_bucket{route="/x",le="+Inf"} 3' in output
+    assert 'db_time_seconds_count{route="/x"} 3' in output
+
+
+def test_registry_returns_existing_metric_for_same_name():
+    """Registering the same name twice returns the same metric object."""
+    registry = MetricsRegistry()
+    assert registry.counter("hits_total", "Hits") is registry.counter("hits_total", "Hits")
+
+
+def test_label_values_are_escaped():
+    """Quotes in label values are escaped."""
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests", ("route",)).inc(route='/a"b')
+    assert 'requests_total{route="/a\\"b"} 1' in registry.render()
@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+
+from app.services.page_view_partitions import expired_partitions, partition_ddl, retention_start
+
+
+def test_partition_bounds_cover_one_utc_month():
+    ddl = partition_ddl(2024, 12)
+    assert "page_views_p202412 PARTITION OF page_views" in ddl
+    assert "FROM ('2024-12-01 00:00:00+00') TO ('2025-01-01 00:00:00+00')" in ddl
+
+
+def test_retention_expires_whole_months_only():
+    now = datetime(2025, 6, 15, tzinfo=timezone.utc)
+    names = ["page_views_p202502", "page_views_p202503", "page_views_p202506", "page_views_default"]
+    assert expired_partitions(names, now, retention_months=3) == ["page_views_p202502"]
+    assert expired_partitions(names, now, retention_months=0) == []
+    assert retention_start(now, 3) == datetime(2025, 3, 1, tzinfo=timezone.utc)
@@ -0,0 +1,51 @@
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import database
+from app.database import PRIMARY_PIN_COOKIE, PrimaryPinMiddleware, caller_recently_wrote, mark_caller_wrote
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(PrimaryPinMiddleware)
+
+    @app.post("/write")
+    def write(request: Request):
+        mark_caller_wrote(request)
+        return {}
+
+    @app.get("/read")
+    def read(request: Request):
+        return {"primary": caller_recently_wrote(request)}
+
+    return TestClient(app)
+
+
+def test_write_pins_the_caller_to_the_primary_through_a_cookie(monkeypatch):
+    monkeypatch.setattr(database, "READ_REPLICA_URLS", ["postgresql://replica/db"])
+    client = make_client()
+    assert client.get("/read").json() == {"primary": False}
+
+    response = client.post("/write")
+    assert int(response.cookies[PRIMARY_PIN_COOKIE]) > time.time()
+    # A fresh client carrying only the cookie, as if served by another worker
+    other = make_client()
+    other.cookies.set(PRIMARY_PIN_COOKIE, response.cookies[PRIMARY_PIN_COOKIE])
+    assert other.get("/read").json() == {"primary": True}
+
+
+def test_anonymous_callers_are_not_pinned_by_address(monkeypatch):
+    monkeypatch.setattr(database, "READ_REPLICA_URLS", ["postgresql://replica/db"])
+    client = make_client()
+    client.post("/write")
+    client.cookies.clear()
+    assert client.get("/read").json() == {"primary": False}
+
+
+def test_pins_longer_than_the_server_sets_are_ignored(monkeypatch):
+    monkeypatch.setattr(database, "READ_REPLICA_URLS", ["postgresql://replica/db"])
+    client = make_client()
+    client.cookies.set(PRIMARY_PIN_COOKIE, str(int(time.time() + 86400)))
+    assert client.get("/read").json() == {"primary": False}
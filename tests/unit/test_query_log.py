@@ -0,0 +1,22 @@
+import time
+
+import pytest
+
+from app.services.query_log import QueryLog, search_query_log_dropped_total
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_drops_oldest_and_flush_writes_one_batch(fake_session):
+    log = []
+    query_log = QueryLog(lambda: fake_session(log), capacity=2)
+    dropped = search_query_log_dropped_total.value()
+    for q in ("Bambu", "Rafflesia  Arnoldii", "jati"):
+        query_log.record("search", q, "all", 0, time.perf_counter())
+
+    assert query_log.buffered() == 2
+    assert search_query_log_dropped_total.value() == dropped + 1
+    assert await query_log.flush() == 2
+    (statement, rows), = log
+    assert statement.table.name == "search_query_log"
+    assert [row["query"] for row in rows] == ["rafflesia arnoldii", "jati"]
+    assert await query_log.flush() == 0
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from geoalchemy2 import Geometry
+from sqlalchemy import Column, Computed, Index, MetaData, Table, create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.models import KoleksiTumbuhan, SearchIndex
+from app.search.profile import search_vector_sql, tsquery_sql
+
+
+def test_search_vector_is_stored_generated_column():
+    ddl = str(CreateTable(SearchIndex.__table__).compile(dialect=postgresql.dialect()))
+    assert "search_vector TSVECTOR GENERATED ALWAYS AS" in ddl
+    assert "STORED" in ddl
+    assert "to_tsvector('simple'::regconfig, coalesce(title_text, '')), 'A')" in ddl
+    assert "to_tsvector('simple'::regconfig, coalesce(subtitle_text, '')), 'B')" in ddl
+    assert "to_tsvector('indonesian'::regconfig, coalesce(searchable_text, '')), 'C')" in ddl
+
+
+def test_search_vector_has_gin_index():
+    index = next(i for i in SearchIndex.__table__.indexes if i.name == "ix_search_index_search_vector")
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "USING gin (search_vector)" in ddl
+
+
+@pytest.mark.parametrize("table, column", [
+    (KoleksiTumbuhan.__table__, "nama_ilmiah"),
+    (KoleksiTumbuhan.__table__, "genus"),
+    (KoleksiTumbuhan.__table__, "spesies"),
+    (SearchIndex.__table__, "title_text"),
+])
+def test_names_have_trigram_indexes(table, column):
+    index = next(i for i in table.indexes if i.name == f"ix_{table.name}_{column}_trgm")
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert f"USING gin ({column} gin_trgm_ops)" in ddl
+
+
+def _standalone_search_index(metadata):
+    """
+    Copy of search_index without foreign keys, trigram indexes or the PostGIS
+    column, so it can be created on its own
+    """
+    columns = []
+    for column in SearchIndex.__table__.columns:
+        if isinstance(column.type, Geometry):
+            continue
+        args = [Computed(column.computed.sqltext, persisted=True)] if column.computed is not None else []
+        columns.append(Column(column.name, column.type, *args, primary_key=column.primary_key))
+    table = Table("search_index", metadata, *columns)
+    for index in SearchIndex.__table__.indexes:
+        if index.name.endswith("_trgm") or any(isinstance(c.type, Geometry) for c in index.columns):
+            continue  # needs pg_trgm / PostGIS, irrelevant to the tsvector plan
+        Index(index.name, *(table.c[c.name] for c in index.columns), **index.dialect_kwargs)
+    return table
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_search_query_uses_gin_index():
+    url = os.environ["TEST_DATABASE_URL"].replace("postgresql://", "postgresql+psycopg://", 1)
+    engine = create_engine(url)
+    metadata = MetaData(schema="search_index_explain_test")
+    table = _standalone_search_index(metadata)
+    with engine.connect() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS search_index_explain_test CASCADE"))
+        conn.execute(text("CREATE SCHEMA search_index_explain_test"))
+        try:
+            metadata.create_all(conn)
+            conn.execute(table.insert(), [
+                {
+                    "title_text": f"Tanaman {i}",
+                    "subtitle_text": "pohon bambu" if i % 100 == 0 else "pohon jati",
+                    "searchable_text": "daun hijau lebat",
+                    "entity_type": "koleksi",
+                }
+                for i in range(2000)
+            ])
+            conn.execute(text("ANALYZE search_index_explain_test.search_index"))
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = "\n".join(conn.execute(text(f"""
+                EXPLAIN
+                SELECT search_index.id, ts_rank(search_index.search_vector, query) AS score
+                FROM search_index_explain_test.search_index
+                CROSS JOIN (SELECT {tsquery_sql()} AS query) AS parsed
+                WHERE search_index.search_vector @@ query
+                ORDER BY score DESC
+                LIMIT 20
+            """), {"query": "bambu"}).scalars())
+        finally:
+            conn.rollback()
+            conn.execute(text("DROP SCHEMA IF EXISTS search_index_explain_test CASCADE"))
+            conn.commit()
+    engine.dispose()
+    assert "ix_search_index_search_vector" in plan
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_profile_matches_latin_names_unstemmed():
+    url = os.environ["TEST_DATABASE_URL"].replace("postgresql://", "postgresql+psycopg://", 1)
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        vector = text(f"SELECT {search_vector_sql()} FROM (SELECT :title AS title_text, "
+                      "CAST(NULL AS text) AS subtitle_text, :body AS searchable_text) AS row")
+        query = text(f"SELECT CAST({tsquery_sql()} AS text)")
+        latin = conn.scalar(vector, {"title": "Bambusa oldhamii", "body": "bambu raksasa"})
+        matches = conn.scalar(text("SELECT CAST(:vector AS tsvector) @@ CAST(:query AS tsquery)"), {
+            "vector": latin, "query": conn.scalar(query, {"query": "oldhamii"})
+        })
+    engine.dispose()
+    assert "'oldhamii':2A" in latin
+    assert matches
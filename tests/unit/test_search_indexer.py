@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.search.indexing import ALL_ENTITIES
+from app.services.search_indexer import SearchIndexer
+
+
+class Result:
+    def __init__(self, value=None, rows=()):
+        self.value = value
+        self.rows = list(rows)
+
+    def scalar(self):
+        return self.value
+
+    scalar_one = scalar
+
+    def all(self):
+        return self.rows
+
+
+def generations(current, changes=()):
+    """Answer generation reads with ``current`` and change reads with ``changes``"""
+    def on_execute(statement, params):
+        sql = str(statement)
+        if "RETURNING generation" in sql or sql.startswith("SELECT generation FROM search_index_generation"):
+            return Result(current)
+        if "FROM search_index_changes" in sql and sql.lstrip().startswith("SELECT"):
+            return Result(rows=[
+                SimpleNamespace(generation=g, entity_type=t, entity_id=i) for g, t, i in changes
+            ])
+        return Result()
+    return on_execute
+
+
+def fail(statement, params):
+    raise RuntimeError("database unavailable")
+
+
+def recorder(heard):
+    async def listener(entity_type, ids):
+        heard.append((entity_type, sorted(ids)))
+    return listener
+
+
+@pytest.mark.asyncio
+async def test_dirty_ids_are_coalesced_and_batched(fake_session):
+    log = []
+    indexer = SearchIndexer(lambda: fake_session(log, generations(1)), batch_size=2)
+    for entity_id in (1, 1, 2, 3):
+        indexer.mark_dirty("taman", entity_id)
+    assert indexer.pending_count() == 3
+
+    assert await indexer.flush() == 2
+    upsert, delete, bump, changes, prune = log
+    assert "ON CONFLICT (taman_kehati_id)" in str(upsert[0])
+    assert upsert[1] == {"ids": [1, 2]}
+    assert "NOT EXISTS" in str(delete[0])
+    assert "search_index_generation.generation + 1" in str(bump[0])
+    assert changes[1] == [
+        {"generation": 1, "entity_type": "taman", "entity_id": 1},
+        {"generation": 1, "entity_type": "taman", "entity_id": 2},
+    ]
+    assert "DELETE FROM search_index_changes" in str(prune[0])
+    assert await indexer.flush() == 1
+    assert await indexer.flush() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_changes_pending(fake_session):
+    indexer = SearchIndexer(lambda: fake_session(on_execute=fail))
+    indexer.mark_dirty("koleksi", 7)
+    with pytest.raises(RuntimeError):
+        await indexer.flush()
+    assert indexer.pending_count() == 1
+    assert indexer.oldest_pending_age() > 0
+
+
+@pytest.mark.asyncio
+async def test_poll_replays_changes_from_other_workers(fake_session):
+    heard = []
+    indexer = SearchIndexer(lambda: fake_session(on_execute=generations(5)))
+    indexer.add_listener(recorder(heard))
+    await indexer.poll()
+    assert indexer.generation == 5 and heard == []
+
+    changes = [(6, "taman", 3), (7, "koleksi", 9), (7, "koleksi", 4)]
+    indexer.session_factory = lambda: fake_session(on_execute=generations(7, changes))
+    await indexer.poll()
+    assert indexer.generation == 7
+    assert sorted(heard) == [("koleksi", [4, 9]), ("taman", [3])]
+
+
+@pytest.mark.asyncio
+async def test_poll_treats_reindex_or_pruned_changes_as_everything(fake_session):
+    heard = []
+    indexer = SearchIndexer(lambda: fake_session(on_execute=generations(5)))
+    indexer.add_listener(recorder(heard))
+    await indexer.poll()
+
+    # Generation 6 was pruned before this worker saw it
+    indexer.session_factory = lambda: fake_session(on_execute=generations(7, [(7, "taman", 1)]))
+    await indexer.poll()
+    assert heard == [(ALL_ENTITIES, [])]
+
+    indexer.session_factory = lambda: fake_session(on_execute=generations(8, [(8, ALL_ENTITIES, 0)]))
+    await indexer.poll()
+    assert heard[1:] == [(ALL_ENTITIES, [])]
+
+
+@pytest.mark.asyncio
+async def test_own_flush_advances_generation_without_replay(fake_session):
+    heard = []
+    indexer = SearchIndexer(lambda: fake_session(on_execute=generations(5)))
+    indexer.add_listener(recorder(heard))
+    await indexer.poll()
+
+    indexer.session_factory = lambda: fake_session(on_execute=generations(6, [(6, "taman", 2)]))
+    indexer.mark_dirty("taman", 2)
+    await indexer.flush()
+    assert indexer.generation == 6
+    await indexer.poll()
+    assert heard == [("taman", [2])]
@@ -0,0 +1,132 @@
+import pytest
+
+from app.search.query import (
+    InvalidCursor,
+    InvalidFacet,
+    InvalidGeoFilter,
+    Near,
+    build_search_query,
+    collect_facets,
+    decode_cursor,
+    encode_cursor,
+    parse_facets,
+    parse_geo_filter,
+)
+
+
+def test_cursor_round_trips_exact_score():
+    score = 0.0607927106320858
+    assert decode_cursor(encode_cursor(score, 42)) == (score, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "W10", "eyJhIjoxfQ"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_query_filters_entity_and_pages_after_cursor():
+    sql, params = build_search_query("bambu", "artikel", 20, encode_cursor(0.5, 7))
+    assert "search_index.entity_type = :entity" in sql
+    assert "score < :cursor_score OR (score = :cursor_score AND row_id > :cursor_id)" in sql
+    assert params == {"query": "bambu", "limit": 21, "entity": "artikel", "cursor_score": 0.5, "cursor_id": 7}
+
+
+def test_query_for_all_entities_has_no_entity_filter():
+    sql, params = build_search_query("bambu", "all", 20)
+    assert ":entity" not in sql
+    assert ":cursor_score" not in sql
+
+
+def test_fuzzy_query_uses_trigram_word_similarity():
+    sql, params = build_search_query("Shorea leprosulla", "koleksi", 20, mode="fuzzy")
+    assert "search_index.title_text %> :query OR search_index.subtitle_text %> :query" in sql
+    assert "word_similarity(:query, search_index.title_text)" in sql
+    assert "websearch_to_tsquery" not in sql
+    assert params == {"query": "Shorea leprosulla", "limit": 21, "entity": "koleksi"}
+
+
+def test_highlight_runs_ts_headline_on_the_page_only():
+    sql, params = build_search_query("bambu", "all", 20, highlight=True)
+    matches, page = sql.split("SELECT totals.total", 1)
+    assert "ts_headline" not in matches
+    assert "ts_headline('indonesian'" in page
+    assert params["headline_options"].startswith("MaxFragments=2")
+
+
+def test_facets_are_counted_in_one_grouping_sets_pass():
+    sql, params = build_search_query("bambu", "all", 20, facets=parse_facets("taman,entity_type"))
+    assert "GROUP BY GROUPING SETS ((taman, taman_label), (entity_type), ())" in sql
+    assert sql.count("search_vector @@ query") == 1
+    assert params["facet_sample_size"] == 10000
+
+
+def test_unknown_facet_is_rejected():
+    with pytest.raises(InvalidFacet):
+        parse_facets("entity_type,warna")
+
+
+def test_sampled_facet_counts_are_scaled_and_flagged():
+    rows = [
+        {"facet": None, "value": None, "label": None, "count": 100},
+        {"facet": "entity_type", "value": "koleksi", "label": None, "count": 60},
+        {"facet": "entity_type", "value": "taman", "label": None, "count": 40},
+        {"facet": "status_endemik", "value": None, "label": None, "count": 40},
+    ]
+    facets, estimated = collect_facets(rows, total=1000)
+    assert estimated
+    assert facets == {"entity_type": [
+        {"value": "koleksi", "label": None, "count": 600},
+        {"value": "taman", "label": None, "count": 400},
+    ]}
+
+
+def test_radius_search_is_index_assisted_and_blends_distance():
+    sql, params = build_search_query("rafflesia", "all", 20, geo=Near(lat=0.0, lng=100.0, radius_m=50000))
+    assert "search_index.lokasi && ST_Expand(" in sql
+    assert "ST_DWithin(CAST(search_index.lokasi AS geography)" in sql
+    assert "* (1 - 0.5 * ST_Distance(" in sql
+    assert "top.distance_m" in sql
+    assert params["expand_lat"] == pytest.approx(50000 / 111320)
+
+
+@pytest.mark.parametrize("lat, lng, radius_m, bbox", [
+    (1.0, None, 1000, None),
+    (1.0, 2.0, 1000, "0,0,1,1"),
+    (1.0, 2.0, 0, None),
+    (None, None, None, "1,1,0,0"),
+    (None, None, None, "a,b,c,d"),
+])
+def test_invalid_geo_filters_are_rejected(lat, lng, radius_m, bbox):
+    with pytest.raises(InvalidGeoFilter):
+        parse_geo_filter(lat, lng, radius_m, bbox)
+
+
+def test_public_spatial_filters_are_coarsened():
+    near = parse_geo_filter(-6.123456, 106.654321, 1234, None, precision_m=1000)
+    step = 1000 / 111320
+    assert near.radius_m == 2000
+    assert near.lat == pytest.approx(round(-6.123456 / step) * step)
+    assert near.lng == pytest.approx(round(106.654321 / step) * step)
+
+    box = parse_geo_filter(None, None, None, "106.60,-6.20,106.70,-6.10", precision_m=1000)
+    assert box.min_lng <= 106.60 and box.min_lat <= -6.20 and box.max_lng >= 106.70 and box.max_lat >= -6.10
+
+
+@pytest.mark.parametrize("lat, lng, radius_m, bbox", [
+    (1.0, 2.0, 999, None),
+    (None, None, None, "106.600,-6.200,106.605,-6.100"),
+])
+def test_public_spatial_filters_have_a_minimum_size(lat, lng, radius_m, bbox):
+    parse_geo_filter(lat, lng, radius_m, bbox)
+    with pytest.raises(InvalidGeoFilter):
+        parse_geo_filter(lat, lng, radius_m, bbox, precision_m=1000)
+
+
+def test_public_radius_search_blends_rounded_distance():
+    sql, params = build_search_query(
+        "rafflesia", "all", 20, geo=Near(lat=0.0, lng=100.0, radius_m=50000), precision_m=1000
+    )
+    assert "* (1 - 0.5 * (round(ST_Distance(" in sql
+    assert "/ :distance_precision_m) * :distance_precision_m) AS distance_m" in sql
+    assert params["distance_precision_m"] == 1000
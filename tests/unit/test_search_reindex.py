@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.services.search_reindex import ReindexJob, SearchReindexer, _shadow_index_ddl
+
+
+class FakeConnection:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, statement, params=None):
+        return None
+
+    async def execute(self, statement, params=None):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeEngine:
+    def connect(self):
+        return FakeConnection()
+
+
+def test_shadow_index_ddl_targets_shadow_table():
+    ddl = _shadow_index_ddl(
+        "CREATE UNIQUE INDEX uq_search_index_artikel_id ON public.search_index USING btree (artikel_id)",
+        "uq_search_index_artikel_id"
+    )
+    assert ddl == (
+        "CREATE UNIQUE INDEX uq_search_index_artikel_id_shadow ON search_index_shadow USING btree (artikel_id)"
+    )
+
+
+def test_progress_reports_rate_and_eta():
+    job = ReindexJob("admin@example.com")
+    job.status = "running"
+    job.rows_total = 1000
+    job.rows_done = 250
+    job._started -= 5
+
+    progress = job.progress()
+    assert progress["percent"] == 25.0
+    assert 45 <= progress["rows_per_second"] <= 50
+    assert 14 <= progress["eta_seconds"] <= 16
+
+
+def test_finished_job_has_no_eta():
+    job = ReindexJob()
+    job.status = "completed"
+    job.rows_total = job.rows_done = 10
+    assert job.progress()["eta_seconds"] is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_task_drops_shadow_and_propagates():
+    reindexer = SearchReindexer(FakeEngine())
+    started, dropped = asyncio.Event(), []
+
+    async def prepare_shadow(job):
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def drop_shadow():
+        dropped.append(True)
+
+    reindexer._prepare_shadow = prepare_shadow
+    reindexer._drop_shadow = drop_shadow
+    job = ReindexJob()
+    task = asyncio.create_task(reindexer._run(job, FakeConnection()))
+    await started.wait()
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert dropped == [True]
+    assert job.status == "cancelled"
+    assert job.finished_at is not None
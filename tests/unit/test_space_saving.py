@@ -0,0 +1,31 @@
+import random
+from collections import Counter
+
+from app.utils.space_saving import SpaceSaving
+
+
+def test_heavy_hitters_survive_a_long_tail():
+    rng = random.Random(7)
+    stream = [1] * 500 + [2] * 300 + [3] * 200 + [rng.randint(100, 5000) for _ in range(3000)]
+    rng.shuffle(stream)
+    sketch = SpaceSaving(capacity=50)
+    for item in stream:
+        sketch.offer(item)
+
+    exact = Counter(stream)
+    assert [item for item, _ in sketch.top(3)] == [1, 2, 3]
+    # Counts never underestimate, and overestimate by at most total / capacity
+    for item, count in sketch.top(3):
+        assert exact[item] <= count <= exact[item] + len(stream) / 50
+
+
+def test_merge_adds_counts_and_keeps_capacity():
+    first, second = SpaceSaving(capacity=3), SpaceSaving(capacity=3)
+    for item in (1, 1, 2, 3):
+        first.offer(item)
+    for item in (2, 2, 4, 5):
+        second.offer(item)
+
+    merged = SpaceSaving.merged([first, second], capacity=3)
+    assert len(merged) == 3
+    assert merged.top(2) == [(2, 3), (1, 2)]
@@ -0,0 +1,62 @@
+from app.search.suggest import Entry, SuggestEngine, SuggestIndex
+
+
+def build_engine():
+    engine = SuggestEngine()
+    engine.replace_index(SuggestIndex([
+        Entry("Bambusa vulgaris", "koleksi", 1, 5, "nama_ilmiah"),
+        Entry("Bambu kuning", "koleksi", 1, 5, "nama_umum_nasional"),
+        Entry("Bambusa oldhamii", "koleksi", 2, 50, "nama_ilmiah"),
+        Entry("Tectona grandis", "koleksi", 3, 1, "nama_ilmiah"),
+        Entry("Taman Bambu Nusantara", "taman", 10, 20, "nama_resmi"),
+        Entry("Taman Kehati Sumedang", "taman", 11, 0, "nama_resmi"),
+    ]))
+    return engine
+
+
+def test_prefix_ranks_by_popularity_then_length():
+    assert build_engine().suggest("bambu") == ["Bambusa oldhamii", "Bambu kuning", "Bambusa vulgaris", "Taman Bambu Nusantara"]
+
+
+def test_word_prefix_and_infix_matches():
+    engine = build_engine()
+    assert engine.suggest("vulg") == ["Bambusa vulgaris"]
+    assert engine.suggest("randi") == ["Tectona grandis"]
+    assert engine.suggest("medang") == ["Taman Kehati Sumedang"]
+
+
+def test_matching_ignores_case_and_accents():
+    assert build_engine().suggest("TÉCTONA") == ["Tectona grandis"]
+
+
+def test_entity_type_filter():
+    assert build_engine().suggest("bambu", entity_types=("taman",)) == ["Taman Bambu Nusantara"]
+
+
+def test_field_filter_applies_to_overlay_too():
+    engine = build_engine()
+    engine.update_entity("koleksi", 3, [
+        Entry("Tectona bambusoides", "koleksi", 3, 1, "nama_ilmiah"),
+        Entry("Jati bambu", "koleksi", 3, 1, "nama_lokal_daerah"),
+    ])
+    assert engine.suggest("bambu", entity_types=("koleksi",), fields=("nama_ilmiah",)) == [
+        "Bambusa oldhamii", "Bambusa vulgaris", "Tectona bambusoides"
+    ]
+
+
+def test_overlay_replaces_and_removes_entities():
+    engine = build_engine()
+    engine.update_entity("koleksi", 2, [Entry("Bambusa blumeana", "koleksi", 2, 50)])
+    engine.update_entity("taman", 10, [])
+    assert engine.suggest("bambusa") == ["Bambusa blumeana", "Bambusa vulgaris"]
+    assert engine.suggest("nusantara") == []
+
+
+def test_rebuild_keeps_overlay_updates_made_while_loading():
+    engine = build_engine()
+    engine.update_entity("koleksi", 3, [])
+    version = engine.version
+    engine.update_entity("koleksi", 2, [Entry("Bambusa blumeana", "koleksi", 2, 50)])
+    engine.replace_index(SuggestIndex([Entry("Bambusa oldhamii", "koleksi", 2, 50)]), built_from_version=version)
+    assert engine.overlay_size == 1
+    assert engine.suggest("bambusa") == ["Bambusa blumeana"]
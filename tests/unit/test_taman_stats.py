@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import taman_stats
+
+
+def stats_rows(during_query=None):
+    def on_execute(statement, params):
+        if during_query:
+            during_query()
+        return [
+            SimpleNamespace(id=taman_id, koleksi_count=3, artikel_count=1, views_7d=10, views_30d=40)
+            for taman_id in params["ids"]
+        ]
+    return on_execute
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    taman_stats.taman_stats_cache.clear()
+    yield
+    taman_stats.taman_stats_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_stats_are_fetched_once_and_cached_per_taman(fake_session):
+    session = fake_session(on_execute=stats_rows())
+    stats = await taman_stats.get_taman_stats(session, [1, 2, 1])
+    assert sorted(stats) == [1, 2]
+    assert stats[1].views_30d == 40
+
+    await taman_stats.get_taman_stats(session, [1, 2])
+    assert len(session.log) == 1
+
+    taman_stats.invalidate_taman_stats(2)
+    await taman_stats.get_taman_stats(session, [1, 2])
+    assert len(session.log) == 2
+
+
+@pytest.mark.asyncio
+async def test_stats_invalidated_while_computing_are_not_cached(fake_session):
+    session = fake_session(on_execute=stats_rows(during_query=lambda: taman_stats.invalidate_taman_stats(5)))
+    await taman_stats.get_taman_stats(session, [5])
+    assert 5 not in taman_stats.taman_stats_cache
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.trending import ALL_TAMAN, TrendingKoleksi
+
+NOW = datetime(2026, 1, 5, 12, 0, tzinfo=timezone.utc)
+
+# koleksi id -> taman id, all published
+KOLEKSI = {1: 10, 2: 10, 3: 20}
+
+
+def database(statement, params):
+    sql = str(statement)
+    if "FROM taman_kehati" in sql:
+        return [SimpleNamespace(id=taman_id) for taman_id in (10, 20)]
+    return [
+        SimpleNamespace(id=item, nama_ilmiah=f"Koleksi {item}", taman_kehati_id=KOLEKSI[item])
+        for item in params["ids"] if item in KOLEKSI
+    ]
+
+
+def view(koleksi_id, taman_kehati_id):
+    return {"koleksi_tumbuhan_id": koleksi_id, "taman_kehati_id": taman_kehati_id, "created_at": NOW}
+
+
+@pytest.mark.asyncio
+async def test_taman_scope_only_counts_known_taman_and_their_koleksi(fake_session):
+    trending = TrendingKoleksi(None)
+    session = fake_session(on_execute=database)
+    await trending._refresh(session)
+
+    for koleksi_id, taman_id in [(1, 10), (1, 10), (2, 10), (3, 10), (3, 10), (3, 10), (2, 999)]:
+        trending.record(view(koleksi_id, taman_id))
+    # Unknown taman get no sketch of their own
+    assert {scope for scope, _ in trending._local} == {ALL_TAMAN, 10}
+
+    await trending._refresh(session)
+    assert [item.id for item in trending.top(10)] == [1, 2]
+    assert [item.id for item in trending.top()] == [3, 1, 2]
+    assert trending.top(999) == []
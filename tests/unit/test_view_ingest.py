@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+
+from app.services.view_ingest import ViewIngestor, page_views_dropped_total
+
+
+def existing_ids(*ids):
+    """on_execute hook answering id lookups with ``ids`` (every id below 100 by default)"""
+    ids = ids or range(100)
+
+    def on_execute(statement, params):
+        if isinstance(statement, Select):
+            return [(entity_id,) for entity_id in ids]
+    return on_execute
+
+
+def view(taman_id):
+    return {"page_type": "taman", "taman_kehati_id": taman_id, "created_at": datetime.now(timezone.utc)}
+
+
+def inserts(log):
+    return [
+        (statement, rows) for statement, rows in log
+        if getattr(getattr(statement, "table", None), "name", None) == "page_views"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_views_are_written_in_batches_and_drained_on_stop(fake_session):
+    log = []
+    ingestor = ViewIngestor(lambda: fake_session(log, existing_ids()), capacity=10, batch_size=3, flush_interval=60)
+    for taman_id in range(5):
+        assert ingestor.submit(view(taman_id))
+    ingestor.start()
+    await asyncio.sleep(0.01)
+    # A full batch is written at once; the remainder waits for the interval
+    assert [len(rows) for _, rows in inserts(log)] == [3]
+
+    await ingestor.stop()
+    assert [len(rows) for _, rows in inserts(log)] == [3, 2]
+    statement, rows = inserts(log)[0]
+    assert [row["taman_kehati_id"] for row in rows] == [0, 1, 2]
+    assert all(row["created_at"] is not None for row in rows)
+    assert ingestor.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_new_views(fake_session):
+    ingestor = ViewIngestor(fake_session, capacity=1)
+    dropped = page_views_dropped_total.value(reason="queue_full")
+    assert ingestor.submit(view(1))
+    assert not ingestor.submit(view(2))
+    assert page_views_dropped_total.value(reason="queue_full") == dropped + 1
+    assert ingestor.pending() == 1
+
+
+@pytest.mark.asyncio
+async def test_submit_many_accepts_what_fits(fake_session):
+    ingestor = ViewIngestor(fake_session, capacity=3)
+    assert ingestor.submit(view(1))
+    assert ingestor.submit_many([view(2), view(3), view(4)]) == 2
+    assert ingestor.pending() == 3
+
+
+@pytest.mark.asyncio
+async def test_views_of_unknown_entities_are_dropped_before_the_insert(fake_session):
+    log = []
+    ingestor = ViewIngestor(lambda: fake_session(log, existing_ids(1, 2)))
+    dropped = page_views_dropped_total.value(reason="unknown_entity")
+
+    assert await ingestor.write([view(1), view(404), view(2)]) == 2
+    (_, rows), = inserts(log)
+    assert [row["taman_kehati_id"] for row in rows] == [1, 2]
+    assert page_views_dropped_total.value(reason="unknown_entity") == dropped + 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_batch_is_split_so_only_the_bad_view_is_lost(fake_session):
+    def reject_taman_3(statement, params):
+        if isinstance(statement, Select):
+            return [(entity_id,) for entity_id in range(100)]
+        if isinstance(params, list) and any(row.get("taman_kehati_id") == 3 for row in params):
+            raise IntegrityError("INSERT INTO page_views", params, Exception("violates foreign key constraint"))
+
+    log = []
+    ingestor = ViewIngestor(lambda: fake_session(log, reject_taman_3))
+    rejected = page_views_dropped_total.value(reason="rejected")
+    written = []
+
+    async def listener(views):
+        written.extend(views)
+    ingestor.add_listener(listener)
+
+    assert await ingestor.write([view(taman_id) for taman_id in range(1, 6)]) == 4
+    assert sorted(row["taman_kehati_id"] for _, rows in inserts(log) for row in rows) == [1, 2, 4, 5]
+    assert [row["taman_kehati_id"] for row in written] == [1, 2, 4, 5]
+    assert page_views_dropped_total.value(reason="rejected") == rejected + 1
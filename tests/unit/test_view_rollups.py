@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from app.services.view_rollups import rollup_counts, rollup_params
+
+
+def test_views_count_towards_each_entity_they_concern():
+    at = datetime(2025, 3, 1, 10, 30, tzinfo=timezone.utc)
+    hourly, daily = rollup_counts([
+        {"page_type": "koleksi", "taman_kehati_id": 1, "koleksi_tumbuhan_id": 7, "created_at": at},
+        {"page_type": "artikel-12", "taman_kehati_id": 1, "koleksi_tumbuhan_id": None, "created_at": at},
+        {"page_type": "koleksi", "taman_kehati_id": 1, "koleksi_tumbuhan_id": 7, "created_at": at.replace(hour=11)},
+    ])
+    hour = at.replace(minute=0)
+    day = hour.replace(hour=0)
+    assert hourly[("taman", 1, hour, "koleksi")] == 1
+    assert hourly[("koleksi", 7, hour, "koleksi")] == 1
+    assert hourly[("artikel", 12, hour, "artikel-12")] == 1
+    assert daily[("koleksi", 7, day, "koleksi")] == 2
+    assert daily[("taman", 1, day, "artikel-12")] == 1
+
+
+def test_rollup_params_split_whole_days_from_partial_ones():
+    params = rollup_params(datetime(2025, 3, 1, 10, 30), datetime(2025, 3, 4, 8, 15))
+    assert params == {
+        "rollup_start": datetime(2025, 3, 1, 10, tzinfo=timezone.utc),
+        "rollup_end": datetime(2025, 3, 4, 9, tzinfo=timezone.utc),
+        "rollup_day_start": datetime(2025, 3, 2, tzinfo=timezone.utc),
+        "rollup_day_end": datetime(2025, 3, 4, tzinfo=timezone.utc),
+    }
+
+    within_a_day = rollup_params(datetime(2025, 3, 1, 10, 30), datetime(2025, 3, 1, 18, 0))
+    assert within_a_day["rollup_day_start"] == within_a_day["rollup_day_end"] == within_a_day["rollup_end"]